@@ -0,0 +1,430 @@
+import os
+import sys
+
+# --- One Fast-Starting Command Line for Every Day ---
+# Each day's script is started as its own `python dayN/...` process and imports openai,
+# pydantic, dotenv and termcolor before doing anything. For short cron/serverless jobs,
+# that start-up is most of the run time. This CLI fixes both:
+#
+# 1. One entry point, with a subcommand per system:
+#      python cli.py scrape [URL ...]          python cli.py orchestrate "goal"
+#      python cli.py extract "text"            python cli.py self-correct "task"
+#      python cli.py route "query" [...]       python cli.py blackboard "goal" --mode parallel
+#      python cli.py batch route queries.jsonl (a resumable bulk job, see common/jobs.py)
+# 2. Lazy imports: this module only imports os and sys (and argparse). A subcommand imports
+#    its day's module, and with it the heavy libraries, only when it runs.
+#    `--help` never touches openai or pydantic (test_cli.py keeps it that way).
+# 3. A warm daemon: `python cli.py daemon` imports everything once and waits on a Unix socket.
+#    Later invocations see the socket and attach: the daemon forks a child (already warm),
+#    which runs the command on the caller's own stdin/stdout/stderr (passed over the socket).
+#    Use `--local` to run in-process anyway. POSIX only (fork + Unix sockets).
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+UID = getattr(os, "getuid", lambda: 0)()
+# In a directory only we can use: the runtime dir, or a 0700 directory of our own under /tmp
+SOCKET_PATH = os.getenv("MULTI_AGENT_SOCKET") or os.path.join(
+    os.getenv("XDG_RUNTIME_DIR") or f"/tmp/multi-agent-{UID}", "multi-agent.sock")
+EXIT_MARKER = b"\0exit="  # Sent by the daemon's child when the command is done
+HEADER_DIGITS = 10        # The request header is sent as its length (10 digits) + JSON
+
+def load(day: str, module: str):
+    """Imports dayN/<module>.py. Day modules import their siblings by bare name, so their folder goes on sys.path."""
+    import importlib
+    for path in (ROOT, os.path.join(ROOT, day)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+def llm_backend(mock, force_mock: bool = False):
+    """The real API when OPENAI_API_KEY is set (and --mock isn't), else the mock (or MOCK_LLM_URL's server)."""
+    from common.llm import openai_backend, mock_backend
+    api_key = os.getenv("OPENAI_API_KEY")
+    if api_key and not force_mock:
+        return openai_backend(api_key)
+    return mock_backend(mock)
+
+def mock_server_url():
+    """MOCK_LLM_URL, or a mock server started for this command: (url, server to stop or None)."""
+    if os.getenv("MOCK_LLM_URL"):
+        return os.getenv("MOCK_LLM_URL"), None
+    from common.mock_server import MockLLMServer, DEFAULT_RULES
+    server = MockLLMServer(rules=DEFAULT_RULES).start()
+    return server.url, server
+
+def print_metrics():
+    from common.metrics import METRICS
+    if METRICS.report():
+        print("\n[Metrics] LLM spend by component:")
+        print(METRICS.summary())
+
+# --- Subcommands ---
+def cmd_scrape(args) -> int:
+    import asyncio
+    scraper = load("day1", "async_scraper")
+    asyncio.run(scraper.main(args.urls, args.concurrency))
+    return 0
+
+def cmd_extract(args) -> int:
+    extractor = load("day2", "structured_extractor")
+    text = sys.stdin.read() if args.text == "-" else args.text
+    if os.getenv("OPENAI_API_KEY") and not args.mock:
+        event = extractor.extract_event_details(text) # Builds the real client from OPENAI_API_KEY
+    else:
+        # Day 2 has no in-process mock for structured output: use MOCK_LLM_URL's server, or start one
+        from common.llm import shared_client, openai_backend
+        url, server = mock_server_url()
+        try:
+            client = shared_client(openai_backend("mock", base_url=url)).with_priority("background", caller="extractor")
+            event = extractor.extract_event_details(text, client)
+        finally:
+            if server:
+                server.stop()
+    if event is None:
+        return 1
+    print(event.model_dump_json(indent=2))
+    print_metrics()
+    return 0
+
+def cmd_route(args) -> int:
+    router = load("day4", "router")
+    from common.llm import shared_client
+    client = shared_client(llm_backend(router.MockRouterClient(), args.mock))
+    client = client.with_priority("interactive", caller="router", deadline=10.0).with_hedging()
+    speculator = router.make_speculator() if args.speculate else None
+    for query in args.queries:
+        print(f"  -> Output: {router.handle_request(client, query, speculator)}\n")
+    if speculator:
+        speculator.shutdown()
+        print(f"[Speculation] {speculator.report()}")
+    print_metrics()
+    return 0
+
+def cmd_orchestrate(args) -> int:
+    orchestrator = load("day5", "orchestrator")
+    from common.llm import shared_client
+    client = shared_client(llm_backend(orchestrator.MockOrchestratorClient(), args.mock))
+    client = client.with_priority("planning", caller="planner", deadline=60.0).with_hedging()
+    executor = orchestrator.make_executor(args.backend)
+    try:
+        manager = orchestrator.Orchestrator(client, plan_cache=orchestrator.PlanCache(), executor=executor,
+                                            streaming=args.stream)
+        plan = manager.create_plan(args.goal)
+        if not plan.steps:
+            print("Failed to generate plan.")
+            return 1
+        manager.execute_plan(plan)
+    finally:
+        executor.shutdown()
+    print_metrics()
+    return 0
+
+def cmd_self_correct(args) -> int:
+    coder = load("day6", "self_correction")
+    from common.llm import shared_client
+    client = shared_client(llm_backend(coder.MockCoderClient(), args.mock)).with_priority("background", caller="coder")
+    cache = coder.ResultCache(os.path.join(ROOT, "day6", ".result_cache.jsonl"))
+    with coder.SandboxPool(workers=args.workers) as pool:
+        code = coder.run_coding_task(client, args.task, pool, candidates=args.candidates, cache=cache)
+    print_metrics()
+    return 0 if code else 1
+
+def cmd_blackboard(args) -> int:
+    topics = [topic.strip() for topic in args.topics.split(",") if topic.strip()]
+    if args.mode == "multiprocess":
+        load("day7", "shm_board").run_multiprocess(args.goal, topics)
+    elif args.mode == "durable":
+        load("day7", "persistence").run_durable(args.goal, topics, os.path.join(ROOT, "day7", ".journal"))
+    else:
+        shared_state = load("day7", "shared_state")
+        if args.mode == "parallel":
+            shared_state.run_parallel_research(args.goal, topics)
+        elif args.mode == "reactive":
+            shared_state.run_reactive(args.goal, topics)
+        else:
+            shared_state.run_system(args.goal)
+    return 0
+
+# Bulk jobs: job -> (day, module, request builder, output model, in-process mock or None, input field)
+BATCH_JOBS = {
+    "extract": ("day2", "structured_extractor", "extraction_request", "CalendarEvent", None, "text"),
+    "route": ("day4", "router", "routing_request", "Route", "MockRouterClient", "query"),
+}
+
+def cmd_batch(args) -> int:
+    from common.jobs import JobRunner, llm_task, write_batch, batch_result_task
+    day, module_name, builder, model, mock, field = BATCH_JOBS[args.job]
+    module = load(day, module_name)
+    if args.export:
+        count = write_batch(args.input, args.export, getattr(module, builder), field)
+        print(f"Wrote {count} requests to {args.export}")
+        print(f"Process it locally with: python common/mock_server.py --batch {args.export}")
+        return 0
+
+    output_dir = args.out or args.input.rsplit(".jsonl", 1)[0] + ".out"
+    server = None
+    if args.collect: # The input is a batch output file: validate its answers
+        task, id_field = batch_result_task(getattr(module, model)), "custom_id"
+    else:
+        from common.llm import shared_client, openai_backend
+        if mock:
+            backend = llm_backend(getattr(module, mock)(), args.mock)
+        elif os.getenv("OPENAI_API_KEY") and not args.mock:
+            backend = openai_backend(os.getenv("OPENAI_API_KEY"))
+        else:
+            url, server = mock_server_url()
+            backend = openai_backend("mock", base_url=url)
+        client = shared_client(backend, rpm=args.rpm, max_connections=args.concurrency)
+        task, id_field = llm_task(client.with_priority("background", caller=f"batch-{args.job}"), getattr(module, builder), field), "id"
+    try:
+        runner = JobRunner(args.job, task, output_dir, shards=args.shards, concurrency=args.concurrency,
+                           checkpoint_every=args.checkpoint_every, id_field=id_field)
+        report = runner.run(args.input, field)
+    finally:
+        if server:
+            server.stop()
+    print(f"[Batch] {report['done']} items in {report['seconds']:.2f}s = {report['items_per_sec']:.1f} items/s "
+          f"({report['results']} results, {report['errors']} errors, {report['resumed']} already done) -> {output_dir}")
+    print_metrics()
+    return 0 if report["errors"] == 0 else 1
+
+# What the daemon imports up front: every day module a subcommand uses (and through them openai, pydantic...)
+WARM_MODULES = [("day2", "structured_extractor"), ("day4", "router"), ("day5", "orchestrator"),
+                ("day6", "self_correction"), ("day7", "shared_state"), ("day7", "shm_board"),
+                ("day7", "persistence"), ("day1", "async_scraper")]
+WARM_LIBRARIES = ["openai", "httpx"] # Only imported by openai_backend(), on the first real API call
+
+def parser():
+    import argparse
+    cli = argparse.ArgumentParser(prog="cli.py", description="Run any day's multi-agent system.")
+    cli.add_argument("--local", action="store_true", help="run in this process even if a warm daemon is up")
+    commands = cli.add_subparsers(dest="command", required=True)
+
+    scrape = commands.add_parser("scrape", help="fetch pages concurrently (day 1)")
+    scrape.add_argument("urls", nargs="*", help="defaults to a few well-known sites")
+    scrape.add_argument("--concurrency", type=int, default=2)
+    scrape.set_defaults(run=cmd_scrape)
+
+    extract = commands.add_parser("extract", help="extract a calendar event from text (day 2)")
+    extract.add_argument("text", help='the text, or "-" to read it from stdin')
+    extract.set_defaults(run=cmd_extract)
+
+    route = commands.add_parser("route", help="route queries to the right agent (day 4)")
+    route.add_argument("queries", nargs="+")
+    route.add_argument("--speculate", action="store_true", help="start the likely agent while the router decides")
+    route.set_defaults(run=cmd_route)
+
+    orchestrate = commands.add_parser("orchestrate", help="plan and execute a goal (day 5)")
+    orchestrate.add_argument("goal")
+    orchestrate.add_argument("--backend", choices=["inprocess", "process", "socket"], default="inprocess")
+    orchestrate.add_argument("--stream", action="store_true", help="pipeline the writer and reviewer")
+    orchestrate.set_defaults(run=cmd_orchestrate)
+
+    self_correct = commands.add_parser("self-correct", help="write code until its tests pass (day 6)")
+    self_correct.add_argument("task", nargs="?", default="Write a function 'calculate_average(numbers)' that returns the average of a list of numbers.")
+    self_correct.add_argument("--candidates", type=int, default=3)
+    self_correct.add_argument("--workers", type=int, default=3)
+    self_correct.set_defaults(run=cmd_self_correct)
+
+    blackboard = commands.add_parser("blackboard", help="agents sharing a blackboard (day 7)")
+    blackboard.add_argument("goal")
+    blackboard.add_argument("--topics", default="syntax,typing,asyncio,packaging", help="comma-separated")
+    blackboard.add_argument("--mode", choices=["system", "parallel", "reactive", "multiprocess", "durable"], default="system")
+    blackboard.set_defaults(run=cmd_blackboard)
+
+    batch = commands.add_parser("batch", help="run extraction or routing over a JSONL file, resumably")
+    batch.add_argument("job", choices=sorted(BATCH_JOBS))
+    batch.add_argument("input", help='JSONL: one {"id": ..., "text"/"query": ...} object (or plain string) per line')
+    batch.add_argument("--out", help="output directory for the shards and checkpoint (default: <input>.out)")
+    batch.add_argument("--concurrency", type=int, default=16)
+    batch.add_argument("--shards", type=int, default=4)
+    batch.add_argument("--checkpoint-every", type=int, default=100)
+    batch.add_argument("--rpm", type=int, default=500, help="requests-per-minute limit of the shared client")
+    batch.add_argument("--export", metavar="FILE", help="write an OpenAI Batch API file instead of calling the API")
+    batch.add_argument("--collect", action="store_true", help="the input is a batch output file: collect its answers")
+    batch.set_defaults(run=cmd_batch)
+
+    daemon = commands.add_parser("daemon", help="start a warm daemon that later invocations attach to")
+    daemon.add_argument("--stop", action="store_true", help="stop the running daemon")
+    daemon.set_defaults(run=cmd_daemon)
+
+    for command in (extract, route, orchestrate, self_correct, batch):
+        command.add_argument("--mock", action="store_true", help="use the mock LLM even if OPENAI_API_KEY is set")
+    return cli
+
+# --- Warm Daemon ---
+def cmd_daemon(args) -> int:
+    import socket
+    if args.stop:
+        try:
+            if not owned_by_us(SOCKET_PATH + ".pid"):
+                raise ValueError("not our pid file")
+            os.kill(int(open(SOCKET_PATH + ".pid").read()), 15)
+        except (OSError, ValueError):
+            print("No daemon running.")
+            return 1
+        return 0
+
+    import time
+    import signal
+    directory = os.path.dirname(SOCKET_PATH)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not owned_by_us(directory):
+        print(f"[Daemon] {directory} belongs to another user; refusing to listen there.")
+        return 1
+    if daemon_running():
+        print(f"[Daemon] Already running on {SOCKET_PATH}; stop it first (daemon --stop).")
+        return 1
+    start = time.perf_counter()
+    import importlib
+    for day, module in WARM_MODULES + [(None, library) for library in WARM_LIBRARIES]:
+        try:
+            load(day, module) if day else importlib.import_module(module)
+        except ImportError as e: # e.g. aiohttp not installed: that subcommand just warms up on first use
+            print(f"[Daemon] Not preloading {module}: {e}")
+    print(f"[Daemon] Warm in {(time.perf_counter() - start) * 1000:.0f}ms, listening on {SOCKET_PATH}")
+
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH) # Stale: daemon_running() found nobody behind it
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177) # The socket is created 0600: only we may connect
+    try:
+        server.bind(SOCKET_PATH)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    with open(SOCKET_PATH + ".pid", "w") as f:
+        f.write(str(os.getpid()))
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN) # Children are reaped automatically
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while True:
+            conn, _ = server.accept()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                server.close()
+                serve_one(conn) # Never returns
+            conn.close()
+    except (KeyboardInterrupt, SystemExit):
+        return 0
+    finally:
+        server.close()
+        for path in (SOCKET_PATH, SOCKET_PATH + ".pid"):
+            if os.path.exists(path):
+                os.unlink(path)
+
+def serve_one(conn):
+    """In a forked child: run one request with the caller's own stdin/stdout/stderr (passed over the socket)."""
+    import json
+    import socket
+    import signal
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL) # Subcommands wait on their own workers
+    code = 1
+    try:
+        request = json.loads(recv_exactly(conn, int(recv_exactly(conn, HEADER_DIGITS))))
+        _, fds, _, _ = socket.recv_fds(conn, 1, 3)
+        if len(fds) != 3:
+            raise ConnectionError("caller did not send its stdin/stdout/stderr")
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        for target, fd in enumerate(fds): # The caller's own files: `> out.json` and `2> err.log` work as usual
+            os.dup2(fd, target)
+            os.close(fd)
+        code = run(request["argv"])
+    except ConnectionError:
+        pass # The caller hung up (or only probed whether we are alive)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(EXIT_MARKER + str(code).encode() + b"\n")
+        finally:
+            os._exit(code)
+
+def recv_exactly(conn, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("caller hung up")
+        data += chunk
+    return data
+
+def owned_by_us(path: str) -> bool:
+    try:
+        return os.stat(path).st_uid == UID
+    except OSError:
+        return False
+
+def daemon_running() -> bool:
+    """Whether a daemon is alive behind SOCKET_PATH: its pid file names a live process, or the socket answers."""
+    import socket
+    try:
+        if owned_by_us(SOCKET_PATH + ".pid"):
+            os.kill(int(open(SOCKET_PATH + ".pid").read()), 0)
+            return True
+    except (OSError, ValueError):
+        pass # No such process: a stale pid file
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(SOCKET_PATH)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+def attach(argv) -> int:
+    """Runs the command in the warm daemon. Returns None if there is no daemon to attach to."""
+    import json
+    import socket
+    # We send our environment (API keys included): never to a socket another user could have planted
+    if not owned_by_us(SOCKET_PATH):
+        print(f"[cli] Not attaching: {SOCKET_PATH} is not owned by this user.", file=sys.stderr)
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(SOCKET_PATH)
+    except OSError:
+        return None # A stale socket file: run locally
+    header = json.dumps({"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}).encode()
+    conn.sendall(b"%0*d" % (HEADER_DIGITS, len(header)) + header)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Our stdin, stdout and stderr themselves (SCM_RIGHTS): the child reads and writes them directly,
+    # so stderr stays stderr, redirections and pipes behave as in a direct run
+    socket.send_fds(conn, [b"\0"], [0, 1, 2])
+
+    trailer = b""
+    while True: # Only the exit code comes back over the socket
+        chunk = conn.recv(64)
+        if not chunk:
+            break
+        trailer += chunk
+    conn.close()
+    if trailer.startswith(EXIT_MARKER):
+        return int(trailer[len(EXIT_MARKER):].strip() or 1)
+    return 1 # The child died without telling us how
+
+def run(argv) -> int:
+    args = parser().parse_args(argv)
+    return args.run(args) or 0
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    local = "--local" in argv or "-h" in argv or "--help" in argv
+    if command not in (None, "daemon") and not local and os.path.exists(SOCKET_PATH):
+        code = attach(argv)
+        if code is not None:
+            return code
+    return run(argv)
+
+if __name__ == "__main__":
+    sys.exit(main())
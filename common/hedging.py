@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from common.scheduling import percentile
+
+# --- Hedged Requests (Cutting the Slow Tail) ---
+# Most LLM calls return in about the same time, but a few are much slower (a busy replica,
+# a lost packet...). With one blocking call per turn, that one slow response IS the turn's latency.
+#
+# Hedging: if a call hasn't returned by the time 95% of calls from the same call site
+# usually have (its p95), send an identical second request and use whichever answers
+# first. The loser is cancelled.
+# - Latencies are tracked per call site ("router", "planner", ...): they differ a lot.
+# - A hedge budget caps the extra load: every call earns `budget` hedge tokens (5% by default),
+#   and a hedge costs one. When the upstream is slow for everybody, hedging stops by itself
+#   instead of doubling the load.
+# - Until a site has `min_samples` latencies, its calls are not hedged.
+
+class HedgePolicy:
+    def __init__(self, budget: float = 0.05, min_samples: int = 20, max_tokens: float = 10.0, window: int = 200):
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens # Short bursts of hedges are fine; sustained ones are not
+        self.tokens = 1.0
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "hedges": 0, "hedge_wins": 0})
+
+    def delay(self, site: str) -> Optional[float]:
+        """How long to wait before hedging a call from `site` (None: don't hedge)."""
+        samples = self.latencies[site]
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, 0.95)
+
+    def record(self, site: str, seconds: float):
+        self.latencies[site].append(seconds)
+
+    def allow(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def run(self, site: str, attempt: Callable[[], Awaitable]):
+        """Runs `attempt()`, and a duplicate of it if the first one is slower than the site's p95."""
+        stats = self.stats[site]
+        stats["calls"] += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.budget)
+
+        start = time.monotonic()
+        primary = asyncio.ensure_future(attempt())
+        delay = self.delay(site)
+        tasks = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.allow():
+                    stats["hedges"] += 1
+                    tasks.add(asyncio.ensure_future(attempt()))
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner or not pending:
+                    break
+                tasks = pending # One copy failed: keep waiting for the other
+            if winner is None:
+                raise next(iter(done)).exception()
+            if winner is not primary:
+                stats["hedge_wins"] += 1
+            self.record(site, time.monotonic() - start)
+            return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel() # The slower copy (or both, if we were cancelled)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            site: {**stats, "p95": self.delay(site) or 0.0,
+                   "win_rate": stats["hedge_wins"] / stats["hedges"] if stats["hedges"] else 0.0}
+            for site, stats in self.stats.items()
+        }
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, Tuple
+from common.metrics import METRICS
+
+# --- Offline Bulk Jobs (Backfills That Survive a Crash) ---
+# Running `extract_event_details` over an archive, or a historical query log through
+# `route_request`, used to be a for-loop over sync calls: one item at a time, and a crash
+# at item 90,000 meant starting again from item 1.
+#
+# JobRunner runs a task over every line of an input JSONL file:
+# 1. Fan-out: items go through a pool of `concurrency` workers. At most a few windows of
+#    items are read ahead, so the input can be far bigger than memory.
+#    (Rate limits, retries and backoff are the shared LLMClient's job, as everywhere else.)
+# 2. Sharded output: results go to results-NNNNN.jsonl, failures to errors-NNNNN.jsonl
+#    (item's line number % shards). One bad item is an error line, never a crashed job.
+# 3. Checkpoint: every `checkpoint_every` items the shards are flushed to disk and
+#    checkpoint.json records their sizes plus exactly which input lines are done.
+#    Resuming truncates each shard back to its checkpointed size (dropping anything written
+#    after it) and skips the done lines: every item ends up in the output exactly once.
+#
+# Batch files: instead of calling the API item by item, `write_batch` turns the input into an
+# OpenAI Batch API file (one request per line, half price, done within 24h). The provider,
+# or `python common/mock_server.py --batch FILE` locally, answers it into an output file.
+# The same runner then collects that file (`batch_result_task`, items keyed by "custom_id").
+
+CHECKPOINT = "checkpoint.json"
+
+def read_items(path: str, field: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, item) for each non-empty input line. A line is a JSON object, or a bare string for `field`."""
+    with open(path) as f:
+        for number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = line # Plain text lines are fine too
+            if not isinstance(item, dict):
+                item = {field: item}
+            yield number, item
+
+def llm_task(client, request_of: Callable[[str], Dict[str, Any]], field: str) -> Callable[[Dict[str, Any]], Any]:
+    """A task making one structured call per item (`request_of(item[field])` gives the `parse` arguments)."""
+    def run(item: Dict[str, Any]) -> Any:
+        completion = client.beta.chat.completions.parse(**request_of(item[field]))
+        parsed = completion.choices[0].message.parsed
+        if parsed is None:
+            raise ValueError(f"No parsed output: {getattr(completion.choices[0].message, 'refusal', None)}")
+        return parsed.model_dump(mode="json")
+    return run
+
+class JobRunner:
+    def __init__(self, name: str, task: Callable[[Dict[str, Any]], Any], output_dir: str, shards: int = 4,
+                 concurrency: int = 16, checkpoint_every: int = 100, id_field: str = "id"):
+        self.name = name
+        self.task = task
+        self.output_dir = output_dir
+        self.shards = shards
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+        self.id_field = id_field
+        self.files: Dict[str, Any] = {}
+        self.stats = {"done": 0, "results": 0, "errors": 0, "resumed": 0, "seconds": 0.0, "items_per_sec": 0.0}
+
+    # --- Running ---
+    def run(self, input_path: str, field: str = "text") -> Dict[str, float]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        state = self._resume(input_path)
+        done_below, done = state["done_below"], set(state["done"])
+        if done_below or done:
+            self.stats["resumed"] = len(done) + sum(1 for number, _ in read_items(input_path, field) if number < done_below)
+        self._open(state["offsets"])
+
+        pending: Dict[Any, int] = {} # Future -> input line number
+        next_line = done_below # One past the last line read
+        finished = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix=f"job-{self.name}") as pool:
+            items = read_items(input_path, field)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.concurrency * 2: # Bounded read-ahead
+                    entry = next(items, None)
+                    if entry is None:
+                        exhausted = True
+                        continue
+                    next_line = max(next_line, entry[0] + 1)
+                    if entry[0] >= done_below and entry[0] not in done:
+                        pending[pool.submit(self._run_one, *entry)] = entry[0]
+                if not pending:
+                    break
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in sorted(completed, key=pending.get): # In input order: keeps done_below moving
+                    number = pending.pop(future)
+                    self._write(number, *future.result())
+                    done.add(number)
+                    finished += 1
+                    if finished % self.checkpoint_every == 0:
+                        # Everything below the oldest item still running is done
+                        done_below = min(pending.values(), default=next_line)
+                        done = {n for n in done if n >= done_below}
+                        self._checkpoint(input_path, done_below, done, start)
+        self._checkpoint(input_path, next_line, set(), start, complete=True)
+        self._close()
+        return self.report()
+
+    def _run_one(self, number: int, item: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        record = {"id": item.get(self.id_field, number), "line": number}
+        try:
+            record["result"] = self.task(item)
+            outcome = "results"
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            outcome = "errors"
+        METRICS.inc("job_items_total", job=self.name, outcome="ok" if outcome == "results" else "error")
+        return outcome, record
+
+    def _write(self, number: int, outcome: str, record: Dict[str, Any]):
+        self.files[self._shard_name(outcome, number % self.shards)].write(json.dumps(record) + "\n")
+        self.stats["done"] += 1
+        self.stats[outcome] += 1
+
+    # --- Shards and checkpoint ---
+    def _shard_name(self, kind: str, shard: int) -> str:
+        return f"{kind}-{shard:05d}.jsonl"
+
+    def _open(self, offsets: Dict[str, int]):
+        for kind in ("results", "errors"):
+            for shard in range(self.shards):
+                name = self._shard_name(kind, shard)
+                path = os.path.join(self.output_dir, name)
+                f = open(path, "a+")
+                f.truncate(offsets.get(name, 0)) # Drop what was written after the last checkpoint
+                f.seek(0, os.SEEK_END)
+                self.files[name] = f
+
+    def _close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def _resume(self, input_path: str) -> Dict[str, Any]:
+        path = os.path.join(self.output_dir, CHECKPOINT)
+        if not os.path.exists(path):
+            return {"done_below": 0, "done": [], "offsets": {}}
+        with open(path) as f:
+            state = json.load(f)
+        if state["input"] != os.path.abspath(input_path) or state["shards"] != self.shards:
+            raise ValueError(f"{self.output_dir} holds a checkpoint for {state['input']} with {state['shards']} shards; "
+                             "use another output directory")
+        return state
+
+    def _checkpoint(self, input_path: str, done_below: int, done: set, start: float, complete: bool = False):
+        offsets = {}
+        for name, f in self.files.items():
+            f.flush()
+            os.fsync(f.fileno()) # The sizes we record must really be on disk
+            offsets[name] = f.tell()
+        state = {"input": os.path.abspath(input_path), "shards": self.shards, "done_below": done_below,
+                 "done": sorted(done), "offsets": offsets, "complete": complete}
+        path = os.path.join(self.output_dir, CHECKPOINT)
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path) # Atomic: a crash leaves the old checkpoint or the new one
+        self.stats["seconds"] = time.perf_counter() - start
+        self.stats["items_per_sec"] = self.stats["done"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+        print(f"[Job {self.name}] {self.stats['done']} done ({self.stats['errors']} errors), "
+              f"{self.stats['items_per_sec']:.1f} items/s", file=sys.stderr)
+
+    def report(self) -> Dict[str, float]:
+        return dict(self.stats)
+
+# --- Batch Files (OpenAI Batch API format) ---
+def batch_body(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """`parse` arguments as the JSON body the SDK would send (Pydantic response_format -> strict json_schema)."""
+    body = dict(kwargs)
+    response_format = body.get("response_format")
+    if isinstance(response_format, type):
+        body["response_format"] = {"type": "json_schema", "json_schema": {
+            "name": response_format.__name__, "schema": _strict(response_format.model_json_schema()), "strict": True}}
+    return body
+
+def _strict(schema: Any) -> Any:
+    """Structured Outputs' strict mode: every object lists all its properties as required, and no others."""
+    if isinstance(schema, list):
+        return [_strict(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    schema = {key: _strict(value) for key, value in schema.items()}
+    if schema.get("type") == "object" and "properties" in schema:
+        schema["required"] = list(schema["properties"])
+        schema["additionalProperties"] = False
+    return schema
+
+def write_batch(input_path: str, output_path: str, request_of: Callable[[str], Dict[str, Any]],
+                field: str, id_field: str = "id") -> int:
+    """Writes one Batch API request per input item. Returns how many were written."""
+    count = 0
+    with open(output_path, "w") as out:
+        for number, item in read_items(input_path, field):
+            out.write(json.dumps({"custom_id": str(item.get(id_field, number)), "method": "POST",
+                                  "url": "/v1/chat/completions", "body": batch_body(request_of(item[field]))}) + "\n")
+            count += 1
+    return count
+
+def batch_result_task(model) -> Callable[[Dict[str, Any]], Any]:
+    """A task validating one batch answer against `model` (the boundary: provider output is untrusted)."""
+    def run(item: Dict[str, Any]) -> Any:
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            error = item.get("error") or response.get("body", {}).get("error", {})
+            raise RuntimeError(f"HTTP {response.get('status_code')}: {error.get('message', error)}")
+        content = response["body"]["choices"][0]["message"]["content"]
+        return model.model_validate_json(content).model_dump(mode="json")
+    return run
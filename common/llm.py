@@ -0,0 +1,315 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import functools
+from typing import Any, Dict, List, Optional, Tuple
+from common.scheduling import PriorityScheduler, DeadlineExceeded
+from common.hedging import HedgePolicy
+from common.metrics import METRICS, MetricsRegistry
+
+# --- One Shared LLM Client for Every Agent ---
+# Every day's script built its own OpenAI client (or mock) and called it synchronously.
+# In one process the Agent, the Router and the Orchestrator then compete blindly for the
+# same provider limits, and the first burst ends in 429 errors.
+#
+# LLMClient is the single point every LLM call goes through:
+# 1. Rate limiting: two token buckets, requests-per-minute (RPM) and tokens-per-minute (TPM).
+#    A call waits for its tokens BEFORE it is sent, so we run close to the limit instead of past it.
+# 2. Connection pooling: at most `max_connections` calls in flight, over one pooled HTTP client.
+# 3. Retries: 429, 5xx, timeouts and connection errors are retried with exponential backoff
+#    and jitter (honouring Retry-After). Everything else fails immediately.
+# 4. Timeouts: one place to set them (`timeout`), for every call.
+# 5. Scheduling: free slots go to interactive calls before planning and background ones,
+#    with fair turns per caller and optional deadlines (see scheduling.py).
+# 6. Hedging: a call slower than its call site's p95 gets a duplicate; the first answer wins (see hedging.py).
+# 7. Metrics: tokens, cost and latency of every call, tagged by component, model and site (see metrics.py).
+#
+# It is async inside (one event loop in a background thread), but keeps the old sync shape,
+# so existing code doesn't change:
+#     client.chat.completions.create(...)         # sync, as before
+#     client.beta.chat.completions.parse(...)     # sync, as before
+#     await client.acreate(...) / await client.aparse(...)   # from async code
+#
+# The backend is anything with that same shape: AsyncOpenAI (see `openai_backend`), or one of
+# the per-day mock clients (sync mocks run in worker threads).
+
+class UpstreamError(Exception):
+    """An error response from the provider (mocks raise this to simulate 429s and 5xx)."""
+    def __init__(self, status_code: int, message: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}: {message}" if message else f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Timeouts and dropped connections (asyncio's and the openai SDK's)
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+
+def retry_after(error: Exception) -> Optional[float]:
+    if getattr(error, "retry_after", None) is not None:
+        return error.retry_after
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+def estimate_prompt_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough prompt size (~4 characters per token)."""
+    return sum(len(str(m.get("content") or "") if isinstance(m, dict) else str(getattr(m, "content", "") or ""))
+               for m in kwargs.get("messages", [])) // 4
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough prompt + completion size, used to reserve TPM."""
+    return estimate_prompt_tokens(kwargs) + kwargs.get("max_tokens", 256)
+
+def usage_of(response, kwargs: Dict[str, Any]) -> Tuple[int, int]:
+    """(prompt, completion) tokens: from `response.usage`, or estimated for mocks that don't report it."""
+    usage = getattr(response, "usage", None)
+    if getattr(usage, "prompt_tokens", None) is not None:
+        return usage.prompt_tokens, usage.completion_tokens
+    try:
+        message = response.choices[0].message
+    except (AttributeError, IndexError, TypeError):
+        return estimate_prompt_tokens(kwargs), 0
+    output = getattr(message, "content", None) or getattr(message, "parsed", None) or getattr(message, "tool_calls", None)
+    return estimate_prompt_tokens(kwargs), len(str(output or "")) // 4
+
+def cached_tokens_of(response) -> Optional[int]:
+    """Prompt tokens the provider served from its prefix cache (None if the response doesn't say)."""
+    details = getattr(getattr(response, "usage", None), "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None)
+
+# --- Token Buckets ---
+class TokenBucket:
+    """`rate_per_minute` tokens, refilled continuously. Waiters are served in arrival order."""
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Waits until `amount` tokens are available and takes them. Returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        async with self.lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+        return time.monotonic() - start
+
+    def adjust(self, amount: float):
+        """Gives back (positive) or charges (negative) tokens once the real usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+# --- The Background Event Loop ---
+class _LoopThread:
+    """One event loop per process, in a daemon thread. All clients and buckets live on it."""
+    def __init__(self):
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def get(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True, name="llm-client-loop").start()
+            return self.loop
+
+_loop_thread = _LoopThread()
+
+# --- The Client ---
+class LLMClient:
+    def __init__(self, backend, rpm: int = 500, tpm: int = 200_000, max_connections: int = 64,
+                 max_retries: int = 4, timeout: float = 60.0, backoff: float = 0.5, max_backoff: float = 20.0,
+                 class_caps: Optional[Dict[str, float]] = None, hedge_budget: float = 0.05):
+        self.backend = backend
+        self.priority = "planning" # Defaults for calls made through this client (see `with_priority`)
+        self.caller: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self.site: Optional[str] = None # Call site to hedge as (see `with_hedging`); None: no hedging
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.loop = _loop_thread.get()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.scheduler = PriorityScheduler(max_connections, class_caps) # Connection slots, by priority
+        self.hedging = HedgePolicy(hedge_budget) # Latencies per call site + the shared hedge budget
+        self.metrics: MetricsRegistry = METRICS
+        self.stats = {"calls": 0, "retries": 0, "errors": 0, "throttled_seconds": 0.0}
+        self._bind()
+
+    def _bind(self):
+        # The familiar sync shape: client.chat.completions.create / client.beta.chat.completions.parse
+        self.chat = _Namespace(completions=_Namespace(create=functools.partial(self._sync, "create")))
+        self.beta = _Namespace(chat=_Namespace(completions=_Namespace(parse=functools.partial(self._sync, "parse"))))
+
+    def _view(self, **overrides) -> "LLMClient":
+        client = object.__new__(LLMClient)
+        client.__dict__.update(self.__dict__)
+        client.__dict__.update(overrides)
+        client._bind()
+        return client
+
+    def with_backend(self, backend) -> "LLMClient":
+        """Another backend behind the SAME limits (e.g. a different mock per component)."""
+        return self._view(backend=backend)
+
+    def with_priority(self, priority: str, caller: Optional[str] = None, deadline: Optional[float] = None) -> "LLMClient":
+        """
+        The same client, but its calls are scheduled as `priority` ("interactive", "planning",
+        "background") on behalf of `caller`, and dropped if not sent within `deadline` seconds.
+        Each call can also override these with priority=/caller=/deadline= keyword arguments.
+        """
+        return self._view(priority=priority, caller=caller or self.caller, deadline=deadline)
+
+    def with_hedging(self, site: Optional[str] = None) -> "LLMClient":
+        """The same client, but calls slower than `site`'s p95 latency are hedged (site defaults to the caller)."""
+        return self._view(site=site or self.caller or self.priority)
+
+    async def acreate(self, **kwargs):
+        return await self._submit("create", kwargs)
+
+    async def aparse(self, **kwargs):
+        return await self._submit("parse", kwargs)
+
+    def _sync(self, method: str, **kwargs):
+        if threading.current_thread().name == "llm-client-loop":
+            raise RuntimeError("Blocking LLM call on the client's own event loop; use `await client.acreate()`")
+        return asyncio.run_coroutine_threadsafe(self._call(method, kwargs), self.loop).result()
+
+    async def _submit(self, method: str, kwargs: Dict[str, Any]):
+        # Callers may have their own event loop: the call itself always runs on ours
+        if asyncio.get_running_loop() is self.loop:
+            return await self._call(method, kwargs)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._call(method, kwargs), self.loop))
+
+    def _backend_method(self, method: str):
+        if method == "create":
+            return self.backend.chat.completions.create
+        return self.backend.beta.chat.completions.parse
+
+    async def _call(self, method: str, kwargs: Dict[str, Any]):
+        call = self._backend_method(method)
+        priority = kwargs.pop("priority", self.priority)
+        caller = kwargs.pop("caller", self.caller)
+        deadline = kwargs.pop("deadline", self.deadline)
+        expires = time.monotonic() + deadline if deadline else None
+        site = kwargs.pop("site", self.site)
+        model = kwargs.get("model", "unknown")
+        copies = [] # With hedging, a second copy of the request may run: each copy is metered (and billed)
+
+        async def attempt():
+            start = time.monotonic()
+            copies.append(start)
+            hedged = len(copies) > 1
+            try:
+                response = await self._attempts(call, kwargs, priority, caller, expires)
+            except asyncio.CancelledError:
+                if len(copies) > 1: # The copy that lost a hedge race: its prompt was sent all the same
+                    self.metrics.record_llm_call(caller or priority, model, site, time.monotonic() - start,
+                                                 estimate_prompt_tokens(kwargs), 0, hedged=hedged)
+                raise
+            except Exception as e:
+                self.metrics.record_llm_call(caller or priority, model, site, time.monotonic() - start,
+                                             estimate_prompt_tokens(kwargs), 0, error=type(e).__name__, hedged=hedged)
+                raise
+            self.metrics.record_llm_call(caller or priority, model, site, time.monotonic() - start, *usage_of(response, kwargs),
+                                         cached_tokens=cached_tokens_of(response) or 0, hedged=hedged)
+            return response
+        return await (attempt() if site is None else self.hedging.run(site, attempt))
+
+    async def _attempts(self, call, kwargs: Dict[str, Any], priority: str, caller: Optional[str], expires: Optional[float]):
+        reserved = estimate_tokens(kwargs)
+        for attempt in range(self.max_retries + 1):
+            await self.scheduler.acquire(priority, caller, expires) # Raises DeadlineExceeded if it is too late
+            charged = False
+            try:
+                self.stats["throttled_seconds"] += await self.requests.acquire(1)
+                self.stats["throttled_seconds"] += await self.tokens.acquire(reserved)
+                charged = True
+                self.stats["calls"] += 1
+                timeout = self.timeout if expires is None else max(0.0, min(self.timeout, expires - time.monotonic()))
+                if asyncio.iscoroutinefunction(call):
+                    response = await asyncio.wait_for(call(**kwargs), timeout)
+                else:
+                    response = await asyncio.wait_for(asyncio.to_thread(call, **kwargs), timeout)
+            except Exception as e:
+                self.scheduler.release(priority) # Don't hold a slot while backing off
+                if charged: # A failed attempt reports no usage: give its TPM reservation back
+                    self.tokens.adjust(reserved)
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self.stats["errors"] += 1
+                    raise
+                self.stats["retries"] += 1
+                self.metrics.inc("llm_retries_total", component=caller or priority, reason=type(e).__name__)
+                delay = retry_after(e) or random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.scheduler.release(priority) # Cancelled
+                if charged:
+                    self.tokens.adjust(reserved)
+                raise
+            self.scheduler.release(priority)
+            # Settle the TPM reservation against what the call really used
+            usage = getattr(response, "usage", None)
+            if getattr(usage, "total_tokens", None) is not None:
+                self.tokens.adjust(reserved - usage.total_tokens)
+            return response
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+# --- Building Clients ---
+def openai_backend(api_key: Optional[str] = None, base_url: Optional[str] = None, max_connections: int = 64,
+                   timeout: float = 60.0):
+    """AsyncOpenAI over one pooled HTTP client. Retries are left to LLMClient (max_retries=0)."""
+    import httpx
+    from openai import AsyncOpenAI
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=timeout,
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+def mock_backend(in_process_mock):
+    """
+    The in-process mock, unless MOCK_LLM_URL points at a local mock server
+    (python common/mock_server.py): then calls go over real HTTP.
+    """
+    url = os.getenv("MOCK_LLM_URL")
+    return openai_backend(api_key="mock", base_url=url) if url else in_process_mock
+
+_shared: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+def shared_client(backend, **options) -> LLMClient:
+    """
+    The process-wide client. The first call sets the limits (`options`); later calls with
+    another backend get a client that shares those limits.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = LLMClient(backend, **options)
+            return _shared
+    return _shared if _shared.backend is backend else _shared.with_backend(backend)
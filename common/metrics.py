@@ -0,0 +1,241 @@
+import io
+import sys
+import time
+import pstats
+import bisect
+import cProfile
+import threading
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# --- Where Do the Tokens, Dollars and Seconds Go? ---
+# The router, the planner, agent turns, self-correction retries and structured extraction
+# all spend tokens and time, but nothing recorded how much. MetricsRegistry does:
+#
+# 1. Counters and histograms, tagged with labels (component, model, call site, tool...).
+#    Every LLM call through LLMClient is recorded automatically; tools use `track(...)`.
+# 2. Cheap: recording is one lock and a few dict updates; histograms are fixed buckets,
+#    so memory doesn't grow with the number of calls.
+# 3. Export: Prometheus text format (`prometheus()`) for scraping, or JSON (`to_json()`).
+# 4. Profiling on demand: wrap one request in `profiled(...)` to get a cProfile report
+#    (deterministic) or a sampling profile (low overhead, sees where a thread waits).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Dollars per 1M tokens: (input, output). Unknown models are counted at zero cost.
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-2024-08-06": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+CACHED_INPUT_DISCOUNT = 0.5 # Prompt tokens served from the provider's prefix cache cost half
+
+def cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    prompt = prompt_tokens - cached_tokens * CACHED_INPUT_DISCOUNT
+    return (prompt * price_in + completion_tokens * price_out) / 1_000_000
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (what Prometheus would estimate)."""
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return 0.0
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self.profiles: deque = deque(maxlen=20) # (name, report text) of recent profiled requests
+
+    def inc(self, metric: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self.lock:
+            self.counters[metric][key] += value
+
+    def observe(self, metric: str, value: float, **labels):
+        key = _labels(labels)
+        with self.lock:
+            histogram = self.histograms[metric].get(key)
+            if histogram is None:
+                histogram = self.histograms[metric][key] = Histogram()
+            histogram.observe(value)
+
+    # --- What the rest of the code records ---
+    def record_llm_call(self, component: str, model: str, site: Optional[str], seconds: float,
+                        prompt_tokens: int, completion_tokens: int, error: Optional[str] = None,
+                        cached_tokens: int = 0, hedged: bool = False):
+        hedge = "true" if hedged else None # Only a hedge's duplicate request gets the label
+        labels = _labels({"component": component, "model": model, "site": site, "hedged": hedge})
+        with self.lock:
+            counters = self.counters
+            counters["llm_calls_total"][labels] += 1
+            counters["llm_prompt_tokens_total"][labels] += prompt_tokens
+            counters["llm_cached_prompt_tokens_total"][labels] += cached_tokens
+            counters["llm_completion_tokens_total"][labels] += completion_tokens
+            counters["llm_cost_dollars_total"][labels] += cost(model, prompt_tokens, completion_tokens, cached_tokens)
+            if error:
+                counters["llm_errors_total"][_labels({"component": component, "model": model, "site": site,
+                                                           "hedged": hedge, "error": error})] += 1
+            histogram = self.histograms["llm_latency_seconds"].get(labels)
+            if histogram is None:
+                histogram = self.histograms["llm_latency_seconds"][labels] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def track(self, kind: str, name: str, component: Optional[str] = None) -> Iterator[None]:
+        """Times a tool call / agent step: `with METRICS.track("tool", "get_weather", component="agent"):`"""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.inc(f"{kind}_calls_total", name=name, component=component)
+            if error:
+                self.inc(f"{kind}_errors_total", name=name, component=component, error=error)
+            self.observe(f"{kind}_latency_seconds", time.perf_counter() - start, name=name, component=component)
+
+    # --- Export ---
+    def prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{_format(labels)} {value:g}" for labels, value in series.items()]
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "counters": {name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                             for name, series in self.counters.items()},
+                "histograms": {name: [{"labels": dict(labels), "count": h.count, "sum": h.sum,
+                                       "p50": h.quantile(0.5), "p95": h.quantile(0.95)} for labels, h in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def report(self, by: str = "component") -> List[Dict[str, Any]]:
+        """LLM spend per `by` label (component, model or site), most expensive first."""
+        rows: Dict[str, Counter] = defaultdict(Counter)
+        with self.lock:
+            for name in ("llm_calls_total", "llm_prompt_tokens_total", "llm_completion_tokens_total", "llm_cost_dollars_total"):
+                for labels, value in self.counters[name].items():
+                    rows[dict(labels).get(by, "-")][name] += value
+            for labels, histogram in self.histograms["llm_latency_seconds"].items():
+                rows[dict(labels).get(by, "-")]["seconds"] += histogram.sum
+        return sorted(({by: key, "calls": int(r["llm_calls_total"]), "prompt_tokens": int(r["llm_prompt_tokens_total"]),
+                        "completion_tokens": int(r["llm_completion_tokens_total"]), "cost": r["llm_cost_dollars_total"],
+                        "seconds": r["seconds"]} for key, r in rows.items()),
+                      key=lambda row: (-row["cost"], -row["seconds"]))
+
+    def summary(self, by: str = "component") -> str:
+        """`report()` as a small text table, for the end of a run."""
+        lines = [f"{by:<14}{'calls':>7}{'prompt':>9}{'completion':>12}{'cost $':>10}{'seconds':>9}"]
+        lines += [f"{row[by]:<14}{row['calls']:>7}{row['prompt_tokens']:>9}{row['completion_tokens']:>12}"
+                  f"{row['cost']:>10.4f}{row['seconds']:>9.2f}" for row in self.report(by)]
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.profiles.clear()
+
+def _format(labels: Labels) -> str:
+    if not labels:
+        return ""
+    # Values can come from LLM output (tool names): escape backslash first, then quotes and newlines
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+METRICS = MetricsRegistry() # The process-wide registry
+
+# --- Per-Request Profiling ---
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds; cheap enough to leave on for a whole request."""
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="sampling-profiler")
+
+    def _run(self):
+        while not self.stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno} {code.co_name}"] += 1
+
+    def report(self, top: int) -> str:
+        total = sum(self.samples.values()) or 1
+        return "\n".join(f"{count / total:6.1%}  {where}" for where, count in self.samples.most_common(top))
+
+@contextmanager
+def profiled(name: str, enabled: bool = True, mode: str = "cprofile", top: int = 15,
+             registry: MetricsRegistry = METRICS) -> Iterator[None]:
+    """
+    Profiles the enclosed request when `enabled`; the report is kept in `registry.profiles`.
+    mode="cprofile": every function call, exact but slow. mode="sample": stack samples, low overhead.
+    """
+    if not enabled:
+        yield
+        return
+    if mode == "sample":
+        sampler = SamplingProfiler(threading.get_ident())
+        sampler.thread.start()
+        try:
+            yield
+        finally:
+            sampler.stop.set()
+            sampler.thread.join()
+            registry.profiles.append((name, sampler.report(top)))
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        registry.profiles.append((name, out.getvalue()))
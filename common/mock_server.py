@@ -0,0 +1,498 @@
+import re
+import sys
+import json
+import math
+import hashlib
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- A Local, OpenAI-Compatible Mock LLM Server ---
+# Every day ships its own in-process mock (MockClient, MockRouterClient, ...) that sleeps
+# for a second and matches keywords. None of them exercise real HTTP, streaming or concurrency.
+#
+# MockLLMServer speaks the chat-completions API over real HTTP (stdlib asyncio, keep-alive):
+# - POST /v1/chat/completions: plain answers, tool calls, structured output (response_format
+#   json_schema, as used by `beta.chat.completions.parse`) and streaming (Server-Sent Events).
+# - Scriptable rules: "if the last message matches this regex, answer with this content /
+#   tool call / JSON". Without a matching rule, structured output is synthesized from the schema.
+# - Latency distributions (fixed, uniform, lognormal) so the tail looks like a real provider.
+# - Error injection: random 500s, random 429s, and a real requests-per-minute limit (429 + Retry-After).
+# - Token accounting: every response carries `usage`; GET /stats has totals per model.
+# - Batch files: `process_batch` answers a Batch API input file (one request per JSONL line)
+#   into an output file, offline, like the provider does with an uploaded batch.
+# - Prompt caching: like the real API, a prompt prefix seen before is reported as
+#   `usage.prompt_tokens_details.cached_tokens` (see PrefixCache).
+#
+# Point any OpenAI client at it:  OpenAI(base_url=server.url, api_key="mock")
+# Or run it: python common/mock_server.py --port 8000 --latency lognormal:50:0.5 --rate-limit 0.01
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0 # ~4 characters per token
+
+# --- 1. Response Rules ---
+@dataclass
+class Rule:
+    pattern: str = "" # Regex searched in the last message (case-insensitive); "" matches everything
+    content: Optional[str] = None # Plain answer
+    tool_call: Optional[Dict[str, Any]] = None # {"name": ..., "arguments": {...}}, only if the request has tools
+    json: Optional[Any] = None # Structured answer, only if the request has a response_format
+    role: str = "user" # Only match when the last message has this role
+    schema: Optional[str] = None # Only match structured requests for this schema name (e.g. "Route")
+
+    def matches(self, request: Dict[str, Any]) -> bool:
+        last = (request.get("messages") or [{}])[-1]
+        if last.get("role") != self.role:
+            return False
+        if self.tool_call and not request.get("tools"):
+            return False
+        if self.json is not None and not request.get("response_format"):
+            return False
+        if self.schema and (request.get("response_format") or {}).get("json_schema", {}).get("name") != self.schema:
+            return False
+        return re.search(self.pattern, str(last.get("content") or ""), re.I) is not None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        return cls(**data)
+
+def example_for(schema: Dict[str, Any], defs: Dict[str, Any]) -> Any:
+    """A minimal valid instance of a JSON schema (what a well-behaved model would return)."""
+    if "$ref" in schema:
+        return example_for(defs[schema["$ref"].split("/")[-1]], defs)
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return example_for(schema["anyOf"][0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: example_for(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [example_for(schema.get("items", {}), defs)]
+    return {"string": "example", "integer": 1, "number": 0.5, "boolean": True}.get(kind)
+
+# --- 2. Latency Distributions ---
+@dataclass
+class Latency:
+    kind: str = "fixed" # fixed:<ms> | uniform:<low ms>:<high ms> | lognormal:<median ms>:<sigma>
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, text: str) -> "Latency":
+        kind, *values = text.split(":")
+        values = [float(v) for v in values] + [0.0, 0.0]
+        return cls(kind, values[0], values[1])
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds."""
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b) / 1000
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(max(self.a, 1e-3)), self.b) / 1000
+        return self.a / 1000
+
+# --- Prompt Caching ---
+class PrefixCache:
+    """
+    Simulates provider prompt caching: the longest prefix of a prompt (tools, then messages)
+    that an earlier request already sent counts as cached. Like OpenAI, it is counted in
+    128-token blocks, and only for prompts of at least 1024 tokens.
+    """
+    BLOCK_CHARS = 128 * 4 # ~4 characters per token
+
+    def __init__(self, min_tokens: int = 1024, max_blocks: int = 100_000):
+        self.min_tokens = min_tokens
+        self.max_blocks = max_blocks
+        self.blocks: OrderedDict = OrderedDict() # Hash of a whole prefix (up to a block boundary) -> None, LRU
+
+    @staticmethod
+    def prompt_text(request: Dict[str, Any]) -> str:
+        compact = lambda value: json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        return compact(request.get("tools") or []) + "".join(compact(m) for m in request.get("messages", []))
+
+    def lookup(self, request: Dict[str, Any]) -> Tuple[int, int]:
+        """(prompt_tokens, cached_tokens) for a request; its prefix blocks are cached afterwards."""
+        text = self.prompt_text(request)
+        prompt_tokens = count_tokens(text)
+        cached_blocks, hit = 0, True
+        running = hashlib.sha1() # Hash of everything up to the current block: same key <=> same prefix
+        for start in range(0, len(text) - self.BLOCK_CHARS + 1, self.BLOCK_CHARS):
+            running.update(text[start:start + self.BLOCK_CHARS].encode())
+            key = running.digest()
+            if hit and key in self.blocks:
+                cached_blocks += 1
+                self.blocks.move_to_end(key)
+            else:
+                hit = False
+                self.blocks[key] = None
+        while len(self.blocks) > self.max_blocks:
+            self.blocks.popitem(last=False)
+        if prompt_tokens < self.min_tokens:
+            return prompt_tokens, 0
+        return prompt_tokens, cached_blocks * self.BLOCK_CHARS // 4
+
+# --- 3. The Server ---
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, rules: Optional[List[Rule]] = None,
+                 latency: Optional[Latency] = None, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 rpm: Optional[int] = None, chunk_delay: float = 0.0, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.rules = rules or []
+        self.latency = latency or Latency()
+        self.error_rate = error_rate # Random 500s
+        self.rate_limit_rate = rate_limit_rate # Random 429s
+        self.rpm = rpm # A real requests-per-minute limit
+        self.chunk_delay = chunk_delay # Seconds between streamed chunks
+        self.rng = random.Random(seed)
+        self.allowance = float(rpm or 0)
+        self.allowance_updated = time.monotonic()
+        self.stats: Dict[str, Any] = {"requests": 0, "status": Counter(),
+                                      "usage": defaultdict(lambda: {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})}
+        self.prefix_cache = PrefixCache()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # --- Running in a background thread (tests, demos) ---
+    def start(self) -> "MockLLMServer":
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.serve())
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True, name="mock-llm-server").start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    # --- HTTP/1.1 with keep-alive ---
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                try:
+                    lines = head.decode("latin-1").split("\r\n")
+                    method, path, _ = lines[0].split(" ", 2)
+                    headers = {k.strip().lower(): v.strip() for k, v in (l.split(":", 1) for l in lines[1:] if ":" in l)}
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(f"Invalid Content-Length: {length}")
+                except ValueError as e: # We can't tell where this request ends: answer, then close
+                    self._bad_request(writer, f"Malformed HTTP request: {e}")
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length)
+                await self._route(method, path.split("?")[0], body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass # Client went away
+        finally:
+            writer.close()
+
+    def _send(self, writer, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        self.stats["status"][status] += 1
+        data = json.dumps(payload).encode()
+        extra = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n{extra}\r\n".encode() + data)
+
+    async def _route(self, method: str, path: str, body: bytes, writer):
+        if method == "GET" and path == "/v1/models":
+            self._send(writer, 200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        elif method == "GET" and path == "/stats":
+            self._send(writer, 200, self.snapshot())
+        elif method == "POST" and path == "/v1/chat/completions":
+            try:
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("the body must be a JSON object")
+                await self._chat(request, writer)
+            except (ValueError, KeyError, TypeError) as e: # Bad JSON, or fields of the wrong shape
+                self._bad_request(writer, f"Invalid request body: {type(e).__name__}: {e}")
+        else:
+            self._send(writer, 404, {"error": {"message": f"No route for {method} {path}", "type": "invalid_request_error"}})
+        await writer.drain()
+
+    # --- Chat completions ---
+    def _admit(self) -> Optional[Tuple[int, str, Dict[str, str]]]:
+        """None if the request may proceed, otherwise (status, message, headers) of the injected error."""
+        if self.rpm:
+            now = time.monotonic()
+            self.allowance = min(self.rpm, self.allowance + (now - self.allowance_updated) * self.rpm / 60)
+            self.allowance_updated = now
+            if self.allowance < 1:
+                wait = (1 - self.allowance) * 60 / self.rpm
+                return 429, "Rate limit reached for requests", {"Retry-After": f"{wait:.3f}"}
+            self.allowance -= 1
+        return self._inject()
+
+    def _inject(self) -> Optional[Tuple[int, str, Dict[str, str]]]:
+        if self.rng.random() < self.rate_limit_rate:
+            return 429, "Rate limit reached (injected)", {"Retry-After": "0.05"}
+        if self.rng.random() < self.error_rate:
+            return 500, "The server had an error (injected)", {}
+        return None
+
+    @staticmethod
+    def _error_body(status: int, message: str) -> Dict[str, Any]:
+        kind = {400: "invalid_request_error", 429: "rate_limit_error"}.get(status, "server_error")
+        return {"error": {"message": message, "type": kind}}
+
+    def _bad_request(self, writer, message: str):
+        self._send(writer, 400, self._error_body(400, message))
+
+    def _answer(self, request: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str, Dict[str, Any]]:
+        """(model, message, finish_reason, usage) for a request, counted in the stats."""
+        message, finish_reason = self.respond(request)
+        model = request.get("model", "mock-model")
+        prompt, cached = self.prefix_cache.lookup(request)
+        completion = count_tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+        usage = {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion,
+                 "prompt_tokens_details": {"cached_tokens": cached}}
+        totals = self.stats["usage"][model]
+        totals["prompt_tokens"] += prompt
+        totals["completion_tokens"] += completion
+        totals["cached_tokens"] += cached
+        return model, message, finish_reason, usage
+
+    @staticmethod
+    def _completion(response_id: str, model: str, message: Dict[str, Any], finish_reason: str, usage) -> Dict[str, Any]:
+        return {"id": response_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}], "usage": usage}
+
+    async def _chat(self, request: Dict[str, Any], writer):
+        self.stats["requests"] += 1
+        error = self._admit()
+        if error:
+            status, message, headers = error
+            self._send(writer, status, self._error_body(status, message), headers)
+            return
+
+        model, message, finish_reason, usage = self._answer(request)
+        await asyncio.sleep(self.latency.sample(self.rng)) # Time to first token
+        response_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        if request.get("stream"):
+            await self._stream(writer, response_id, model, message, finish_reason, usage)
+            return
+        self._send(writer, 200, self._completion(response_id, model, message, finish_reason, usage))
+
+    def respond(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """The assistant message for a request: first matching rule, or a sensible default."""
+        for rule in self.rules:
+            if not rule.matches(request):
+                continue
+            if rule.tool_call:
+                call = {"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                        "function": {"name": rule.tool_call["name"], "arguments": json.dumps(rule.tool_call.get("arguments", {}))}}
+                return {"role": "assistant", "content": None, "tool_calls": [call]}, "tool_calls"
+            content = json.dumps(rule.json) if rule.json is not None else rule.content
+            return {"role": "assistant", "content": content}, "stop"
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"].get("schema", {})
+            return {"role": "assistant", "content": json.dumps(example_for(schema, schema.get("$defs", {})))}, "stop"
+        if response_format.get("type") == "json_object":
+            return {"role": "assistant", "content": "{}"}, "stop"
+        last = (request.get("messages") or [{}])[-1]
+        if last.get("role") == "tool":
+            return {"role": "assistant", "content": f"Based on the tool result: {last.get('content')}"}, "stop"
+        return {"role": "assistant", "content": f"Mock answer to: {str(last.get('content'))[:200]}"}, "stop"
+
+    async def _stream(self, writer, response_id: str, model: str, message: Dict[str, Any], finish_reason: str, usage):
+        self.stats["status"][200] += 1
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None, **extra) -> bytes:
+            event = {"id": response_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+            data = f"data: {json.dumps(event)}\n\n".encode()
+            return f"{len(data):x}\r\n".encode() + data + b"\r\n"
+
+        writer.write(chunk({"role": "assistant", "content": ""}))
+        if message.get("tool_calls"):
+            calls = [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]
+            writer.write(chunk({"tool_calls": calls}))
+        else:
+            for piece in re.findall(r"\S+\s*", message["content"] or ""): # One word per chunk
+                writer.write(chunk({"content": piece}))
+                if self.chunk_delay:
+                    await writer.drain()
+                    await asyncio.sleep(self.chunk_delay)
+        writer.write(chunk({}, finish_reason, usage=usage))
+        done = b"data: [DONE]\n\n"
+        writer.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+
+    # --- Batch files (the OpenAI Batch API's JSONL format, processed offline) ---
+    def process_batch(self, input_path: str, output_path: str) -> Dict[str, int]:
+        """
+        Answers every request line of a batch input file into a batch output file, like the
+        provider does with an uploaded batch. No HTTP and no latency: a batch is not interactive.
+        Injected errors apply per request; the requests-per-minute limit doesn't (batches have their own quota).
+        """
+        counts: Counter = Counter()
+        with open(input_path) as source, open(output_path, "w") as out:
+            for line in source:
+                if not line.strip():
+                    continue
+                result = self._batch_line(line)
+                status = (result.get("response") or {}).get("status_code")
+                counts["completed" if status == 200 else "failed"] += 1
+                out.write(json.dumps(result) + "\n")
+        return dict(counts)
+
+    def _batch_line(self, line: str) -> Dict[str, Any]:
+        request_id = f"req_{uuid.uuid4().hex[:12]}"
+        result: Dict[str, Any] = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": None, "response": None, "error": None}
+        try:
+            item = json.loads(line)
+            result["custom_id"] = item["custom_id"]
+            if item.get("url") != "/v1/chat/completions":
+                raise ValueError(f"Unsupported url: {item.get('url')}")
+            request = item["body"]
+        except (ValueError, KeyError, TypeError) as e:
+            result["error"] = {"code": "invalid_request", "message": str(e)}
+            return result
+        self.stats["requests"] += 1
+        error = self._inject()
+        if error:
+            status, message, _ = error
+            self.stats["status"][status] += 1
+            result["response"] = {"status_code": status, "request_id": request_id, "body": self._error_body(status, message)}
+            return result
+        self.stats["status"][200] += 1
+        body = self._completion(f"chatcmpl-{uuid.uuid4().hex[:12]}", *self._answer(request))
+        result["response"] = {"status_code": 200, "request_id": request_id, "body": body}
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"requests": self.stats["requests"], "status": dict(self.stats["status"]),
+                "usage": {model: dict(totals) for model, totals in self.stats["usage"].items()}}
+
+# --- 4. Load Generator (raw keep-alive connections, no client library overhead) ---
+async def _post(reader, writer, host: str, path: str, payload: Dict[str, Any]) -> int:
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(int(l.split(":")[1]) for l in lines if l.lower().startswith("content-length"))
+    await reader.readexactly(length)
+    return int(lines[0].split(" ")[1])
+
+async def load_test(host: str, port: int, requests: int = 2000, concurrency: int = 64) -> Dict[str, Any]:
+    status: Counter = Counter()
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+    payload = {"model": "mock-model", "messages": [{"role": "user", "content": "Tell me about agents"}]}
+
+    async def worker():
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in remaining:
+            start = time.perf_counter()
+            status[await _post(reader, writer, host, "/v1/chat/completions", payload)] += 1
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"requests": requests, "seconds": elapsed, "rps": requests / elapsed, "status": dict(status),
+            "p50_ms": latencies[len(latencies) // 2] * 1000, "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000}
+
+# --- 5. Rules Reproducing the Per-Day Mocks ---
+DEFAULT_RULES = [
+    Rule(pattern="weather", tool_call={"name": "get_weather", "arguments": {"location": "Tokyo"}}),
+    Rule(pattern="calculate|math", tool_call={"name": "calculate", "arguments": {"expression": "10 * 22"}}),
+    Rule(pattern="code|python|function", schema="Route",
+         json={"agent": "coding_agent", "reasoning": "User asked for code.", "confidence": 0.95}),
+    Rule(pattern="weather|rain|temperature", schema="Route",
+         json={"agent": "weather_agent", "reasoning": "User asked about weather.", "confidence": 0.98}),
+    Rule(schema="Route", json={"agent": "general_agent", "reasoning": "General conversation.", "confidence": 0.80}),
+    # A synthesized CalendarEvent wouldn't pass its `priority` pattern
+    Rule(schema="CalendarEvent", json={"event_name": "Q4 Marketing Strategy review", "date": "2025-10-24",
+                                       "participants": ["Alice", "Bob", "Charlie"], "priority": "High",
+                                       "summary": "Review the Q4 marketing strategy."}),
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rules", help="JSON file with a list of rules (pattern, content, tool_call, json, role, schema)")
+    parser.add_argument("--latency", default="fixed:0", help="fixed:<ms> | uniform:<lo>:<hi> | lognormal:<median>:<sigma>")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--load", type=int, default=0, help="Run a load test with this many requests, then exit")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch", help="Process this batch input file (OpenAI Batch API JSONL), then exit")
+    parser.add_argument("--batch-output", help="Where to write the batch results (default: <input>.output.jsonl)")
+    args = parser.parse_args()
+
+    rules = DEFAULT_RULES
+    if args.rules:
+        with open(args.rules) as f:
+            rules = [Rule.from_dict(r) for r in json.load(f)]
+    server = MockLLMServer(port=0 if args.load else args.port, rules=rules, latency=Latency.parse(args.latency),
+                           error_rate=args.error_rate, rate_limit_rate=args.rate_limit, rpm=args.rpm)
+
+    if args.batch:
+        output = args.batch_output or args.batch.rsplit(".jsonl", 1)[0] + ".output.jsonl"
+        start = time.perf_counter()
+        counts = server.process_batch(args.batch, output)
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        print(f"Batch: {counts} in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} requests/s) -> {output}")
+        sys.exit(0)
+
+    if args.load:
+        server.start()
+        result = asyncio.run(load_test(server.host, server.port, args.load, args.concurrency))
+        print(f"{result['requests']} requests in {result['seconds']:.2f}s = {result['rps']:.0f} req/s "
+              f"(p50 {result['p50_ms']:.1f}ms, p99 {result['p99_ms']:.1f}ms) {result['status']}")
+        print(f"Token usage: {server.snapshot()['usage']}")
+        sys.exit(0)
+
+    print(f"Mock LLM server on {server.url}")
+    async def main():
+        await server.serve()
+        await server.server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
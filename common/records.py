@@ -0,0 +1,185 @@
+import copy
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+
+# --- Validate at the Boundary, Trust Inside ---
+# A Pydantic model validates every time one is built. That is exactly right for data from
+# outside (LLM output, HTTP responses, files on disk), but most of our objects are built
+# by our own code from values that are already known to be good: a ScrapedPage per page,
+# a Delta per Blackboard change, a Patch per agent turn, a cached Plan per cache hit...
+#
+# `record(Model)` builds a compact twin of a model:
+# - A plain class with `__slots__` (no per-object __dict__) and the model's field names and defaults.
+#   Building one just assigns attributes: nothing is checked.
+# - `Record.validate(data)` is the boundary: the model's full validation, once, then a record.
+# - `Record.from_model(model)` / `record.to_model()` convert both ways without re-validating
+#   (`to_model` uses `model_construct`). Nested models become nested records and back.
+#
+#   Delta = record(DeltaModel)
+#   delta = Delta(version=3, agent="Writer", field="draft_content", op="set", value="...")  # trusted, fast
+#   delta = Delta.validate(json.loads(line))                                                 # untrusted, checked
+#
+# Benchmark (construction time and memory per object): python common/records.py
+
+_MISSING = object()
+_records: Dict[Type[BaseModel], type] = {} # Model -> its record class
+
+class Record:
+    __slots__ = ()
+    model: Type[BaseModel]
+    fields: tuple = ()
+
+    @classmethod
+    def validate(cls, data: Any) -> "Record":
+        """Full validation (the model's), for data from outside."""
+        return cls.from_model(cls.model.model_validate(data))
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "Record":
+        return cls(**{name: _to_record(getattr(model, name)) for name in cls.fields})
+
+    def to_model(self) -> BaseModel:
+        return self.model.model_construct(**{name: _to_model(getattr(self, name)) for name in self.fields})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: _as_plain(getattr(self, name)) for name in self.fields}
+
+    def replace(self, **changes) -> "Record":
+        return type(self)(**{name: changes.get(name, getattr(self, name)) for name in self.fields})
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.fields)
+
+    __hash__ = None # Mutable, like the models
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields)})"
+
+    def __reduce__(self):
+        # Record classes are generated, so pickle (e.g. to a worker process) goes through the model
+        return _rebuild, (self.model, {name: getattr(self, name) for name in self.fields})
+
+def _rebuild(model: Type[BaseModel], values: Dict[str, Any]) -> Record:
+    return record(model)(**values)
+
+def record(model: Type[BaseModel], name: Optional[str] = None) -> type:
+    """The record class for `model` (built once, then cached)."""
+    if model in _records:
+        return _records[model]
+    fields = tuple(model.model_fields)
+    defaults = {}
+    params, body = [], []
+    for field_name, info in model.model_fields.items():
+        if info.default_factory is not None:
+            defaults[field_name] = info.default_factory
+            params.append(f"{field_name}=_MISSING")
+            body.append(f"self.{field_name} = _defaults[{field_name!r}]() if {field_name} is _MISSING else {field_name}")
+        elif not info.is_required():
+            defaults[field_name] = info.default
+            params.append(f"{field_name}=_MISSING")
+            # Mutable defaults are copied, as Pydantic does
+            body.append(f"self.{field_name} = _copy(_defaults[{field_name!r}]) if {field_name} is _MISSING else {field_name}")
+        else:
+            params.append(field_name)
+            body.append(f"self.{field_name} = {field_name}")
+    # Like namedtuple and dataclasses: a generated __init__ is a few attribute stores, nothing else
+    source = f"def __init__(self, *, {', '.join(params)}):\n    " + "\n    ".join(body or ["pass"])
+    namespace = {"_MISSING": _MISSING, "_defaults": defaults, "_copy": copy.copy}
+    exec(source, namespace)
+    cls = type(name or f"{model.__name__}Record", (Record,), {
+        "__slots__": fields, "__init__": namespace["__init__"], "model": model, "fields": fields,
+        "__module__": model.__module__,
+    })
+    _records[model] = cls
+    return cls
+
+def _to_record(value):
+    if isinstance(value, BaseModel):
+        return record(type(value)).from_model(value)
+    if isinstance(value, list):
+        return [_to_record(item) for item in value] # A fresh list: the record never shares the model's
+    if isinstance(value, dict):
+        return {key: _to_record(item) for key, item in value.items()}
+    return value
+
+def _to_model(value):
+    if isinstance(value, Record):
+        return value.to_model()
+    if isinstance(value, list):
+        return [_to_model(item) for item in value] # A fresh list: the model never shares the record's
+    if isinstance(value, dict):
+        return {key: _to_model(item) for key, item in value.items()}
+    return value
+
+def _as_plain(value):
+    if isinstance(value, Record):
+        return value.as_dict()
+    if isinstance(value, list):
+        return [_as_plain(item) for item in value]
+    return value
+
+# --- Microbenchmark: per-object construction time and memory ---
+if __name__ == "__main__":
+    import timeit
+    import tracemalloc
+    from enum import Enum
+    from typing import List
+    from pydantic import HttpUrl
+
+    # Copies of the days' models, so the benchmark doesn't need their dependencies (aiohttp...)
+    class ScrapedPage(BaseModel):
+        url: HttpUrl
+        status_code: int
+        content_length: int
+        title: Optional[str] = None
+
+    class AgentType(str, Enum):
+        CODING = "coding_agent"
+        RESEARCHER = "researcher"
+
+    class Route(BaseModel):
+        agent: AgentType
+        reasoning: str
+        confidence: float
+
+    class Step(BaseModel):
+        id: int
+        description: str
+        assigned_agent: AgentType
+        dependencies: List[int] = []
+
+    class Delta(BaseModel):
+        version: int
+        agent: str
+        field: str
+        op: str
+        value: Any
+
+    cases = [
+        (ScrapedPage, dict(url="https://www.python.org/", status_code=200, content_length=51234, title="Welcome to Python.org...")),
+        (Route, dict(agent=AgentType.CODING, reasoning="User asked for code.", confidence=0.95)),
+        (Step, dict(id=2, description="Write a blog post summarizing the research", assigned_agent=AgentType.RESEARCHER, dependencies=[1])),
+        (Delta, dict(version=42, agent="Researcher", field="research_notes", op="append", value=["Notes about typing."])),
+    ]
+
+    def per_object_bytes(make, n=10_000) -> float:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        objects = [make() for _ in range(n)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        del objects
+        return (size - n * 8) / n # Minus the list slot holding each object
+
+    print(f"{'model':<12}{'pydantic µs':>13}{'record µs':>11}{'speedup':>9}{'pydantic B':>12}{'record B':>10}")
+    for model, data in cases:
+        Fast = record(model)
+        n = 50_000
+        slow = min(timeit.repeat(lambda: model(**data), number=n, repeat=3)) / n * 1e6
+        fast = min(timeit.repeat(lambda: Fast(**data), number=n, repeat=3)) / n * 1e6
+        slow_bytes = per_object_bytes(lambda: model(**data))
+        fast_bytes = per_object_bytes(lambda: Fast(**data))
+        print(f"{model.__name__:<12}{slow:>13.2f}{fast:>11.2f}{slow / fast:>8.1f}x{slow_bytes:>12.0f}{fast_bytes:>10.0f}")
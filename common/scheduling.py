@@ -0,0 +1,163 @@
+import math
+import time
+import asyncio
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+# --- Priority-Aware, Fair Scheduling of LLM Calls ---
+# One process can run the router, the planner and many worker agents at once. Without
+# scheduling, a burst of 100 background research calls takes every connection, and the
+# user waiting on `route_request` queues behind all of them.
+#
+# PriorityScheduler decides which call gets the next free slot (connection):
+# 1. Priority classes: interactive (routing, chat) > planning > background (research, coding retries).
+#    A free slot always goes to the highest class that is waiting.
+# 2. Per-class caps: background may use at most half the slots and planning three quarters,
+#    so there is always headroom for an interactive call that arrives mid-burst.
+# 3. Fair share: inside a class, callers take turns (round-robin), so one chatty agent
+#    can't starve the others.
+# 4. Deadlines: a call that can no longer finish in time is dropped while still queued
+#    (DeadlineExceeded) instead of wasting a slot.
+# 5. Metrics: queue wait per class (p50/p99), so you can see interactive latency hold up under load.
+
+PRIORITIES = ["interactive", "planning", "background"] # Highest first
+DEFAULT_CAPS = {"interactive": 1.0, "planning": 0.75, "background": 0.5} # Share of slots each class may use
+
+class DeadlineExceeded(Exception):
+    """The call's deadline passed before it could be sent."""
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class PriorityScheduler:
+    def __init__(self, capacity: int, caps: Optional[Dict[str, float]] = None, window: int = 1024):
+        self.capacity = capacity
+        shares = {**DEFAULT_CAPS, **(caps or {})}
+        self.caps = {cls: max(1, math.ceil(shares[cls] * capacity)) for cls in PRIORITIES}
+        self.running = 0
+        self.running_by_class: Counter = Counter()
+        # Class -> caller -> waiting futures. The OrderedDict order is the round-robin turn order.
+        self.queues: Dict[str, "OrderedDict[str, Deque]"] = {cls: OrderedDict() for cls in PRIORITIES}
+        self.waits: Dict[str, Deque[float]] = {cls: deque(maxlen=window) for cls in PRIORITIES}
+        self.dropped: Counter = Counter()
+
+    def _can_start(self, priority: str) -> bool:
+        return self.running < self.capacity and self.running_by_class[priority] < self.caps[priority]
+
+    def _start(self, priority: str, waited: float):
+        self.running += 1
+        self.running_by_class[priority] += 1
+        self.waits[priority].append(waited)
+
+    async def acquire(self, priority: str = "planning", caller: Optional[str] = None, expires: Optional[float] = None):
+        """Waits for a slot. `expires` is a time.monotonic() deadline."""
+        if priority not in self.queues:
+            raise ValueError(f"Unknown priority class '{priority}' (expected one of {PRIORITIES})")
+        if expires is not None and time.monotonic() >= expires:
+            self.dropped[priority] += 1
+            raise DeadlineExceeded(f"{priority} call expired before it was queued")
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (waiter, time.monotonic(), expires)
+        self.queues[priority].setdefault(caller or "", deque()).append(entry)
+        self._dispatch() # Starts us right away if a slot is free and nobody is ahead of us
+        try:
+            timeout = None if expires is None else max(0.0, expires - time.monotonic())
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.exception():
+                return # Granted at the same moment the deadline fired: keep the slot
+            self._remove(priority, caller or "", entry)
+            self.dropped[priority] += 1
+            raise DeadlineExceeded(f"{priority} call expired after waiting in the queue") from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.exception():
+                self.release(priority) # We were given a slot but will never use it
+            else:
+                self._remove(priority, caller or "", entry)
+            raise
+
+    def _remove(self, priority: str, caller: str, entry):
+        queue = self.queues[priority].get(caller)
+        if queue and entry in queue:
+            queue.remove(entry)
+            if not queue:
+                del self.queues[priority][caller]
+
+    def release(self, priority: str):
+        self.running -= 1
+        self.running_by_class[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        now = time.monotonic()
+        for priority in PRIORITIES:
+            callers = self.queues[priority]
+            while callers and self._can_start(priority):
+                caller, queue = next(iter(callers.items()))
+                waiter, queued_at, expires = queue.popleft()
+                # The caller's turn is used: move it to the back of the line
+                del callers[caller]
+                if queue:
+                    callers[caller] = queue
+                if waiter.done():
+                    continue
+                if expires is not None and now >= expires:
+                    self.dropped[priority] += 1
+                    waiter.set_exception(DeadlineExceeded(f"{priority} call expired in the queue"))
+                    continue
+                self._start(priority, now - queued_at)
+                waiter.set_result(None)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Queue-wait metrics per class (seconds)."""
+        return {
+            cls: {
+                "queued": sum(len(q) for q in self.queues[cls].values()),
+                "running": self.running_by_class[cls],
+                "p50_wait": percentile(self.waits[cls], 0.50),
+                "p99_wait": percentile(self.waits[cls], 0.99),
+                "dropped": self.dropped[cls],
+            }
+            for cls in PRIORITIES
+        }
+
+# --- Demo: interactive calls during a background burst ---
+if __name__ == "__main__":
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from common.llm import LLMClient
+
+    class SlowBackend:
+        """Every call takes 50ms, like a fast upstream model."""
+        def __init__(self):
+            self.chat = self
+            self.completions = self
+
+        async def create(self, model, messages):
+            await asyncio.sleep(0.05)
+            return messages[-1]["content"]
+
+    async def main():
+        client = LLMClient(SlowBackend(), rpm=100_000, tpm=10_000_000, max_connections=8)
+        research = client.with_priority("background")
+        router = client.with_priority("interactive", caller="router")
+
+        async def route(i):
+            await asyncio.sleep(i * 0.05) # The user keeps typing while research runs
+            start = time.perf_counter()
+            await router.acreate(model="m", messages=[{"role": "user", "content": f"query {i}"}])
+            return time.perf_counter() - start
+
+        burst = [research.acreate(model="m", messages=[{"role": "user", "content": "research"}], caller=f"researcher-{i % 4}")
+                 for i in range(400)]
+        latencies = await asyncio.gather(*(route(i) for i in range(20)), *burst)
+        interactive = sorted(latencies[:20])
+        print(f"Interactive latency: p50 {interactive[10] * 1000:.0f}ms, max {interactive[-1] * 1000:.0f}ms")
+        for cls, metrics in client.scheduler.report().items():
+            print(f"  {cls:<12} p50 wait {metrics['p50_wait'] * 1000:6.1f}ms  p99 wait {metrics['p99_wait'] * 1000:7.1f}ms")
+
+    asyncio.run(main())
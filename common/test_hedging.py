@@ -0,0 +1,63 @@
+import time
+import asyncio
+from common.hedging import HedgePolicy
+from common.llm import LLMClient
+
+class FlakyLatencyBackend:
+    """The first copy of every 25th request is stuck for 0.3s (a 4% tail); everything else takes 10ms."""
+    def __init__(self):
+        self.count = 0
+        self.seen = set()
+        self.chat = self
+        self.completions = self
+
+    async def create(self, model, messages):
+        self.count += 1
+        request = messages[0]["content"]
+        stuck = request % 25 == 24 and request not in self.seen
+        self.seen.add(request)
+        await asyncio.sleep(0.3 if stuck else 0.01)
+        return "ok"
+
+async def timed_calls(client, n):
+    latencies = []
+    for i in range(n):
+        start = time.monotonic()
+        assert await client.acreate(model="m", messages=[{"role": "user", "content": i}]) == "ok"
+        latencies.append(time.monotonic() - start)
+    return latencies
+
+class TestHedging:
+    def test_hedge_cuts_the_tail(self):
+        """Test that a call stuck past the site's p95 is answered by its duplicate"""
+        backend = FlakyLatencyBackend()
+        client = LLMClient(backend, rpm=100_000, hedge_budget=0.5).with_hedging("router")
+        latencies = asyncio.run(timed_calls(client, 100))
+        assert max(latencies[20:]) < 0.15 # Calls 25, 50, 75 and 100 are stuck, but hedged at ~p95
+        report = client.hedging.report()["router"]
+        assert report["hedge_wins"] == 4
+
+    def test_budget_caps_extra_load(self):
+        """Test that hedges stop when they would exceed the budget"""
+        policy = HedgePolicy(budget=0.05, min_samples=1)
+        policy.record("planner", 0.001)
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def scenario():
+            for _ in range(100):
+                await policy.run("planner", slow)
+        asyncio.run(scenario())
+        stats = policy.stats["planner"]
+        assert stats["calls"] == 100
+        assert stats["hedges"] <= 1 + 100 * 0.05
+
+    def test_no_hedging_without_history(self):
+        """Test that a call site is not hedged before it has enough latency samples"""
+        backend = FlakyLatencyBackend()
+        client = LLMClient(backend).with_hedging("planner")
+        asyncio.run(timed_calls(client, 10))
+        assert backend.count == 10
+        assert client.hedging.report()["planner"]["hedges"] == 0
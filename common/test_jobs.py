@@ -0,0 +1,126 @@
+import os
+import json
+import glob
+import pytest
+from typing import List
+from pydantic import BaseModel
+from common.jobs import JobRunner, write_batch, batch_result_task, batch_body, CHECKPOINT
+from common.mock_server import MockLLMServer, DEFAULT_RULES
+
+class Crash(BaseException):
+    """Stands for the process dying: not caught like a task error"""
+
+class Route(BaseModel):
+    agent: str
+    reasoning: str
+    confidence: float
+
+class Plan(BaseModel):
+    steps: List[Route]
+    note: str = ""
+
+def routing_request(query):
+    return {"model": "gpt-4o", "messages": [{"role": "user", "content": query}], "response_format": Route}
+
+def write_input(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"item-{i}", "text": f"text {i}"}) + "\n")
+
+def output(directory, kind="results"):
+    records = []
+    for path in sorted(glob.glob(os.path.join(directory, f"{kind}-*.jsonl"))):
+        with open(path) as f:
+            records += [json.loads(line) for line in f]
+    return records
+
+class TestJobRunner:
+    def setup_method(self):
+        self.calls = []
+
+    def task(self, item):
+        self.calls.append(item["id"])
+        if item["text"].endswith("7"):
+            raise ValueError("no event in this text")
+        return {"length": len(item["text"])}
+
+    def test_results_and_errors_are_sharded(self, tmp_path):
+        """Test that every item lands once, in its shard, as a result or an error line"""
+        source, out = tmp_path / "input.jsonl", str(tmp_path / "out")
+        write_input(source, 50)
+        report = JobRunner("test", self.task, out, shards=3, concurrency=4, checkpoint_every=10).run(str(source))
+        assert (report["done"], report["results"], report["errors"]) == (50, 45, 5)
+        assert report["items_per_sec"] > 0
+        assert sorted(r["line"] for r in output(out) + output(out, "errors")) == list(range(50))
+        with open(os.path.join(out, "results-00001.jsonl")) as f:
+            assert all(json.loads(line)["line"] % 3 == 1 for line in f)
+        assert output(out, "errors")[0]["error"].startswith("ValueError")
+
+    def test_resume_after_crash_is_exactly_once(self, tmp_path):
+        """Test that a crashed job resumes after its checkpoint and every item ends up in the output once"""
+        source, out = tmp_path / "input.jsonl", str(tmp_path / "out")
+        write_input(source, 100)
+
+        def crashing(item):
+            if len(self.calls) >= 45:
+                raise Crash()
+            return self.task(item)
+        runner = JobRunner("test", crashing, out, shards=2, concurrency=1, checkpoint_every=10)
+        with pytest.raises(Crash):
+            runner.run(str(source))
+        runner._close() # Items 40-44 were written after the last checkpoint and reach the disk too
+
+        self.calls = []
+        report = JobRunner("test", self.task, out, shards=2, concurrency=4, checkpoint_every=10).run(str(source))
+        assert report["resumed"] == 40 # The last checkpoint
+        assert len(self.calls) == 60 # Everything after it (even if it had been written) runs again
+        lines = sorted(r["line"] for r in output(out) + output(out, "errors"))
+        assert lines == list(range(100))
+        with open(os.path.join(out, CHECKPOINT)) as f:
+            assert json.load(f)["complete"]
+
+    def test_checkpoint_belongs_to_its_input(self, tmp_path):
+        """Test that an output directory can't be resumed with another input"""
+        out = str(tmp_path / "out")
+        write_input(tmp_path / "a.jsonl", 5)
+        write_input(tmp_path / "b.jsonl", 5)
+        JobRunner("test", self.task, out).run(str(tmp_path / "a.jsonl"))
+        with pytest.raises(ValueError):
+            JobRunner("test", self.task, out).run(str(tmp_path / "b.jsonl"))
+
+class TestBatchFiles:
+    def test_round_trip_through_the_mock_server(self, tmp_path):
+        """Test export -> mock server batch processing -> collection with validation"""
+        source = tmp_path / "queries.jsonl"
+        source.write_text("Write a python function\nIs it raining?\n")
+        requests, answers = str(tmp_path / "requests.jsonl"), str(tmp_path / "answers.jsonl")
+        assert write_batch(str(source), requests, routing_request, "query") == 2
+        with open(requests) as f:
+            line = json.loads(f.readline())
+        assert line["custom_id"] == "0" and line["body"]["response_format"]["json_schema"]["name"] == "Route"
+
+        assert MockLLMServer(rules=DEFAULT_RULES).process_batch(requests, answers) == {"completed": 2}
+        out = str(tmp_path / "out")
+        report = JobRunner("collect", batch_result_task(Route), out, id_field="custom_id").run(answers, "query")
+        assert report["results"] == 2
+        agents = {r["id"]: r["result"]["agent"] for r in output(out)}
+        assert agents == {"0": "coding_agent", "1": "weather_agent"}
+
+    def test_response_format_is_strict_json_schema(self):
+        """Test that nested models get a strict schema too: every property required, no extra ones"""
+        body = batch_body({"model": "gpt-4o", "response_format": Plan})
+        schema = body["response_format"]["json_schema"]
+        assert (schema["name"], schema["strict"]) == ("Plan", True)
+        assert schema["schema"]["required"] == ["steps", "note"]
+        assert schema["schema"]["$defs"]["Route"]["additionalProperties"] is False
+
+    def test_failed_batch_requests_become_errors(self, tmp_path):
+        """Test that injected provider errors in a batch are collected as error lines"""
+        source = tmp_path / "queries.jsonl"
+        source.write_text("hello\n")
+        requests, answers = str(tmp_path / "requests.jsonl"), str(tmp_path / "answers.jsonl")
+        write_batch(str(source), requests, routing_request, "query")
+        assert MockLLMServer(rules=DEFAULT_RULES, error_rate=1.0).process_batch(requests, answers) == {"failed": 1}
+        report = JobRunner("collect", batch_result_task(Route), str(tmp_path / "out"), id_field="custom_id").run(answers)
+        assert report["errors"] == 1
+        assert "HTTP 500" in output(str(tmp_path / "out"), "errors")[0]["error"]
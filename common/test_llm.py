@@ -0,0 +1,105 @@
+import time
+import asyncio
+import threading
+import pytest
+from common.llm import LLMClient, TokenBucket, UpstreamError
+
+class FakeResponse:
+    def __init__(self, content, total_tokens=None):
+        self.content = content
+        self.usage = type("Usage", (), {"total_tokens": total_tokens})() if total_tokens else None
+
+class FakeBackend:
+    """Sync backend with the OpenAI shape that fails a scripted number of times."""
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+        self.chat = type("Chat", (), {"completions": self})()
+        self.beta = type("Beta", (), {"chat": self.chat})()
+
+    def create(self, model, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        return FakeResponse(messages[-1]["content"], total_tokens=10)
+
+    parse = create
+
+class AsyncBackend:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.chat = type("Chat", (), {"completions": self})()
+
+    async def create(self, model, messages):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return FakeResponse("ok")
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+class TestLLMClient:
+    def test_sync_facade_keeps_openai_shape(self):
+        """Test that existing call sites work unchanged through the shared client"""
+        client = LLMClient(FakeBackend())
+        assert client.chat.completions.create(model="m", messages=MESSAGES).content == "hi"
+        assert client.beta.chat.completions.parse(model="m", messages=MESSAGES).content == "hi"
+
+    def test_retries_429_and_5xx(self):
+        """Test that rate-limit and server errors are retried, honouring Retry-After"""
+        backend = FakeBackend([UpstreamError(429, retry_after=0.01), UpstreamError(503, retry_after=0.01)])
+        client = LLMClient(backend)
+        assert client.chat.completions.create(model="m", messages=MESSAGES).content == "hi"
+        assert backend.calls == 3
+        assert client.stats["retries"] == 2
+
+    def test_failed_attempts_refund_tpm(self):
+        """Test that retried attempts don't keep their token-per-minute reservation"""
+        failures = [UpstreamError(429, retry_after=0.01) for _ in range(4)]
+        client = LLMClient(FakeBackend(failures), tpm=60_000)
+        client.chat.completions.create(model="m", messages=MESSAGES)
+        # Only the successful call's real usage (10 tokens) is charged, not 5 reservations
+        assert client.tokens.tokens > client.tokens.capacity - 20
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 400 fails straight away"""
+        backend = FakeBackend([UpstreamError(400, "bad request")])
+        with pytest.raises(UpstreamError):
+            LLMClient(backend).chat.completions.create(model="m", messages=MESSAGES)
+        assert backend.calls == 1
+
+    def test_timeouts_are_retried_then_raised(self):
+        """Test the single timeout setting: slow calls are retried, then the timeout surfaces"""
+        client = LLMClient(FakeBackend(delay=0.3), timeout=0.05, max_retries=1, backoff=0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            client.chat.completions.create(model="m", messages=MESSAGES)
+        assert client.stats["retries"] == 1
+
+    def test_connection_cap_for_async_callers(self):
+        """Test that no more than max_connections calls are in flight"""
+        backend = AsyncBackend()
+        client = LLMClient(backend, max_connections=2)
+
+        async def burst():
+            return await asyncio.gather(*(client.acreate(model="m", messages=MESSAGES) for _ in range(6)))
+
+        assert len(asyncio.run(burst())) == 6
+        assert backend.peak == 2
+
+    def test_rpm_limit_is_shared_across_threads(self):
+        """Test that callers in many threads are paced by one requests-per-minute bucket"""
+        client = LLMClient(FakeBackend(), rpm=600)
+        client.requests = TokenBucket(600, capacity=2)
+        start = time.monotonic()
+        threads = [threading.Thread(target=client.chat.completions.create, kwargs={"model": "m", "messages": MESSAGES})
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert time.monotonic() - start >= 0.35 # 2 at once, then one every 0.1s
+        assert client.stats["throttled_seconds"] > 0
@@ -0,0 +1,131 @@
+import time
+import asyncio
+import pytest
+from common.llm import LLMClient, UpstreamError
+from common.metrics import MetricsRegistry, Histogram, profiled, cost
+
+class Usage:
+    prompt_tokens = 1000
+    completion_tokens = 200
+
+class UsageResponse:
+    usage = Usage()
+
+class UsageBackend:
+    """Sync backend that reports usage like the real API, failing a scripted number of times."""
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.chat = type("Chat", (), {"completions": self})()
+
+    def create(self, model, messages):
+        if self.failures:
+            raise self.failures.pop(0)
+        return UsageResponse()
+
+class StuckFirstBackend:
+    """Async backend whose first request is stuck (so it gets hedged), and whose duplicate answers at once."""
+    def __init__(self):
+        self.count = 0
+        self.chat = type("Chat", (), {"completions": self})()
+
+    async def create(self, model, messages):
+        self.count += 1
+        await asyncio.sleep(0.5 if self.count == 1 else 0.01)
+        return UsageResponse()
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+class TestMetricsRegistry:
+    def setup_method(self):
+        self.metrics = MetricsRegistry()
+
+    def test_counters_and_histograms_by_label(self):
+        """Test that series are kept apart by labels, whatever their order"""
+        self.metrics.inc("tool_calls_total", name="calc", component="agent")
+        self.metrics.inc("tool_calls_total", component="agent", name="calc")
+        self.metrics.inc("tool_calls_total", name="weather", component="agent")
+        for seconds in (0.002, 0.02, 0.2, 2.0):
+            self.metrics.observe("tool_latency_seconds", seconds, name="calc")
+        calls = self.metrics.counters["tool_calls_total"]
+        assert calls[(("component", "agent"), ("name", "calc"))] == 2
+        histogram = self.metrics.histograms["tool_latency_seconds"][(("name", "calc"),)]
+        assert histogram.count == 4
+        assert histogram.quantile(0.5) == 0.025
+        assert Histogram().quantile(0.95) == 0.0
+
+    def test_prometheus_text_format(self):
+        """Test the exposition format: TYPE lines, labels, cumulative buckets, _sum and _count"""
+        self.metrics.inc("llm_calls_total", component="router")
+        self.metrics.observe("llm_latency_seconds", 0.3, component="router")
+        text = self.metrics.prometheus()
+        assert "# TYPE llm_calls_total counter" in text
+        assert 'llm_calls_total{component="router"} 1' in text
+        assert 'llm_latency_seconds_bucket{component="router",le="0.25"} 0' in text
+        assert 'llm_latency_seconds_bucket{component="router",le="0.5"} 1' in text
+        assert 'llm_latency_seconds_bucket{component="router",le="+Inf"} 1' in text
+        assert 'llm_latency_seconds_count{component="router"} 1' in text
+
+    def test_label_values_are_escaped(self):
+        """Test that backslashes, quotes and newlines in label values (e.g. LLM-chosen tool names) can't break a line"""
+        self.metrics.inc("tool_calls_total", name='say "hi"\\\nbye')
+        assert 'tool_calls_total{name="say \\"hi\\"\\\\\\nbye"} 1' in self.metrics.prometheus()
+
+    def test_llm_client_records_tokens_cost_and_errors(self):
+        """Test that every call through LLMClient is accounted to its component and model"""
+        client = LLMClient(UsageBackend([UpstreamError(503, retry_after=0.01)])).with_priority("planning", caller="planner")
+        client.metrics = self.metrics
+        client.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+        [row] = self.metrics.report()
+        assert row["component"] == "planner"
+        assert (row["calls"], row["prompt_tokens"], row["completion_tokens"]) == (1, 1000, 200)
+        assert row["cost"] == pytest.approx(cost("gpt-4o", 1000, 200)) == pytest.approx(0.0045)
+        assert sum(self.metrics.counters["llm_retries_total"].values()) == 1
+
+        failing = LLMClient(UsageBackend([UpstreamError(400)])).with_priority("background", caller="coder")
+        failing.metrics = self.metrics
+        with pytest.raises(UpstreamError):
+            failing.chat.completions.create(model="gpt-4o", messages=MESSAGES)
+        errors = self.metrics.counters["llm_errors_total"]
+        assert errors[(("component", "coder"), ("error", "UpstreamError"), ("model", "gpt-4o"))] == 1
+
+    def test_hedged_duplicates_are_metered(self):
+        """Test that both copies of a hedged call are counted: the duplicate under a hedged label"""
+        client = LLMClient(StuckFirstBackend(), rpm=100_000, hedge_budget=1.0).with_hedging("router")
+        client.metrics = self.metrics
+        client.hedging.min_samples = 1
+        client.hedging.record("router", 0.01)
+
+        async def call():
+            await client.acreate(model="gpt-4o", messages=[{"role": "user", "content": "Where to? " * 50}])
+            await asyncio.sleep(0.05) # The losing copy is cancelled, and metered, in the background
+        asyncio.run(call())
+        calls = self.metrics.counters["llm_calls_total"]
+        assert calls[(("component", "planning"), ("hedged", "true"), ("model", "gpt-4o"), ("site", "router"))] == 1
+        assert calls[(("component", "planning"), ("model", "gpt-4o"), ("site", "router"))] == 1
+        assert sum(self.metrics.counters["llm_completion_tokens_total"].values()) == 200 # Only the winner answered
+        assert sum(self.metrics.counters["llm_prompt_tokens_total"].values()) > 1000 # Both prompts were sent
+
+    def test_track_counts_errors_and_reraises(self):
+        """Test that a failing tool is timed, counted as an error, and its exception still raised"""
+        with pytest.raises(ValueError):
+            with self.metrics.track("tool", "calculate", component="agent"):
+                raise ValueError("bad expression")
+        with self.metrics.track("tool", "calculate", component="agent"):
+            pass
+        labels = (("component", "agent"), ("name", "calculate"))
+        assert self.metrics.counters["tool_calls_total"][labels] == 2
+        assert self.metrics.counters["tool_errors_total"][(("component", "agent"), ("error", "ValueError"), ("name", "calculate"))] == 1
+        assert self.metrics.to_json()["histograms"]["tool_latency_seconds"][0]["count"] == 2
+
+    def test_profiled_request(self):
+        """Test that a profile is only taken when enabled, with either profiler"""
+        with profiled("off", enabled=False, registry=self.metrics):
+            sum(range(1000))
+        with profiled("cprofile", registry=self.metrics):
+            sorted(range(1000), key=lambda x: -x)
+        with profiled("sample", mode="sample", registry=self.metrics):
+            time.sleep(0.05)
+        names = [name for name, _ in self.metrics.profiles]
+        assert names == ["cprofile", "sample"]
+        assert "function calls" in self.metrics.profiles[0][1]
+        assert "sleep" in self.metrics.profiles[1][1] or "test_metrics.py" in self.metrics.profiles[1][1]
@@ -0,0 +1,96 @@
+import json
+import socket
+import http.client
+from openai import OpenAI
+from common.llm import LLMClient
+from common.mock_server import MockLLMServer, Rule, Latency, DEFAULT_RULES
+
+def post(server, payload):
+    connection = http.client.HTTPConnection(server.host, server.port, timeout=5)
+    connection.request("POST", "/v1/chat/completions", json.dumps(payload), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, dict(response.getheaders()), response.read().decode()
+
+PLAN_SCHEMA = {
+    "$defs": {"Step": {"type": "object", "properties": {
+        "id": {"type": "integer"},
+        "assigned_agent": {"enum": ["researcher", "writer", "reviewer"]},
+        "dependencies": {"type": "array", "items": {"type": "integer"}, "default": []},
+    }}},
+    "type": "object", "properties": {"steps": {"type": "array", "items": {"$ref": "#/$defs/Step"}}},
+}
+
+class TestMockLLMServer:
+    def setup_method(self):
+        self.server = MockLLMServer(rules=DEFAULT_RULES, seed=1).start()
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_completion_with_usage(self):
+        """Test a plain chat completion and its token accounting"""
+        status, _, body = post(self.server, {"model": "gpt-4o", "messages": [{"role": "user", "content": "Hello there"}]})
+        response = json.loads(body)
+        assert status == 200
+        assert response["choices"][0]["message"]["content"] == "Mock answer to: Hello there"
+        assert response["usage"]["total_tokens"] == self.server.snapshot()["usage"]["gpt-4o"]["prompt_tokens"] + \
+            self.server.snapshot()["usage"]["gpt-4o"]["completion_tokens"]
+
+    def test_tool_calls_and_structured_output(self):
+        """Test rule-driven tool calls and schema-driven structured output"""
+        tools = [{"type": "function", "function": {"name": "get_weather", "parameters": {}}}]
+        _, _, body = post(self.server, {"model": "m", "messages": [{"role": "user", "content": "Weather in Tokyo?"}], "tools": tools})
+        message = json.loads(body)["choices"][0]["message"]
+        assert message["tool_calls"][0]["function"]["name"] == "get_weather"
+        response_format = {"type": "json_schema", "json_schema": {"name": "Plan", "schema": PLAN_SCHEMA}}
+        _, _, body = post(self.server, {"model": "m", "messages": [{"role": "user", "content": "Plan it"}], "response_format": response_format})
+        plan = json.loads(json.loads(body)["choices"][0]["message"]["content"])
+        assert plan == {"steps": [{"id": 1, "assigned_agent": "researcher", "dependencies": []}]}
+
+    def test_streaming(self):
+        """Test that a streamed answer arrives as SSE chunks that add up to the full message"""
+        _, headers, body = post(self.server, {"model": "m", "stream": True, "messages": [{"role": "user", "content": "stream me"}]})
+        events = [line[6:] for line in body.splitlines() if line.startswith("data: ")]
+        assert headers["Content-Type"] == "text/event-stream"
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(e) for e in events[:-1]]
+        assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks) == "Mock answer to: stream me"
+        assert chunks[-1]["usage"]["completion_tokens"] > 0
+
+    def test_rpm_limit_returns_429(self):
+        """Test the requests-per-minute limit and its Retry-After header"""
+        self.server.rpm = self.server.allowance = 2
+        statuses = [post(self.server, {"model": "m", "messages": [{"role": "user", "content": "hi"}]}) for _ in range(3)]
+        assert [s for s, _, _ in statuses] == [200, 200, 429]
+        assert float(statuses[2][1]["Retry-After"]) > 0
+
+    def test_invalid_json_body_returns_400(self):
+        """Test that a body that isn't a JSON object gets an OpenAI-style 400, and the connection stays usable"""
+        connection = http.client.HTTPConnection(self.server.host, self.server.port, timeout=5)
+        for body in ("{not json", "[1, 2]"):
+            connection.request("POST", "/v1/chat/completions", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            assert response.status == 400
+            assert json.loads(response.read())["error"]["type"] == "invalid_request_error"
+        connection.request("POST", "/v1/chat/completions", json.dumps({"model": "m", "messages": [{"role": "user", "content": "hi"}]}))
+        assert connection.getresponse().status == 200
+
+    def test_malformed_request_line_returns_400(self):
+        """Test that a request line the server can't parse is answered with a 400 instead of a dropped connection"""
+        with socket.create_connection((self.server.host, self.server.port), timeout=5) as raw:
+            raw.sendall(b"GARBAGE\r\nContent-Length: 2\r\n\r\n{}")
+            response = raw.makefile("rb").read().decode()
+        assert response.startswith("HTTP/1.1 400")
+        assert '"invalid_request_error"' in response
+
+    def test_shared_client_retries_through_injected_errors(self):
+        """Test the whole stack: the real OpenAI SDK, the shared client's retries, injected 429s and 500s"""
+        self.server.rate_limit_rate = 0.2
+        self.server.error_rate = 0.1
+        self.server.latency = Latency("uniform", 1, 5)
+        client = LLMClient(OpenAI(base_url=self.server.url, api_key="mock", max_retries=0), backoff=0.01)
+        for i in range(20):
+            response = client.chat.completions.create(model="m", messages=[{"role": "user", "content": f"question {i}"}])
+            assert response.choices[0].message.content == f"Mock answer to: question {i}"
+        assert client.stats["retries"] > 0
+        assert client.stats["errors"] == 0
@@ -0,0 +1,56 @@
+import pickle
+import pytest
+from typing import List
+from pydantic import BaseModel, ValidationError
+from common.records import record
+
+class Step(BaseModel):
+    id: int
+    description: str
+    dependencies: List[int] = []
+
+class Plan(BaseModel):
+    steps: List[Step]
+
+class TestRecords:
+    def setup_method(self):
+        self.Step = record(Step)
+        self.Plan = record(Plan)
+
+    def test_construction_is_unchecked_and_defaults_are_copied(self):
+        """Test that records trust their input, and never share a mutable default"""
+        step = self.Step(id="not validated", description="Research cats")
+        assert step.id == "not validated"
+        step.dependencies.append(1)
+        assert self.Step(id=2, description="Write").dependencies == []
+        assert not hasattr(step, "__dict__")
+        with pytest.raises(TypeError):
+            self.Step(id=1) # Required fields are still required
+
+    def test_validate_is_the_boundary(self):
+        """Test that validate() runs the model's checks and coerces like the model"""
+        assert self.Step.validate({"id": "3", "description": "Review"}).id == 3
+        with pytest.raises(ValidationError):
+            self.Step.validate({"id": "three", "description": "Review"})
+
+    def test_nested_round_trip_without_sharing(self):
+        """Test that models convert to nested records and back, and neither direction shares lists"""
+        plan = Plan(steps=[Step(id=1, description="Research"), Step(id=2, description="Write", dependencies=[1])])
+        fast = self.Plan.from_model(plan)
+        assert type(fast.steps[1]) is self.Step
+        back = fast.to_model()
+        assert isinstance(back.steps[1], Step) and back == plan
+        back.steps[1].dependencies.append(99)
+        assert fast.steps[1].dependencies == [1]
+        plan.steps[1].dependencies.append(42) # And the other way: the source model doesn't share with the record
+        assert fast.steps[1].dependencies == [1]
+        assert fast.as_dict() == {"steps": [{"id": 1, "description": "Research", "dependencies": []},
+                                            {"id": 2, "description": "Write", "dependencies": [1]}]}
+
+    def test_replace_equality_and_pickle(self):
+        """Test the small conveniences: replace(), ==, repr and pickling (for worker processes)"""
+        step = self.Step(id=1, description="Research")
+        assert step.replace(description="Write") == self.Step(id=1, description="Write")
+        assert step != self.Step(id=2, description="Research")
+        assert repr(step) == "StepRecord(id=1, description='Research', dependencies=[])"
+        assert pickle.loads(pickle.dumps(step)) == step
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import pytest
+from common.scheduling import PriorityScheduler, DeadlineExceeded
+from common.llm import LLMClient
+
+async def hold(scheduler, priority, caller, order, seconds=0.02, expires=None):
+    await scheduler.acquire(priority, caller, expires)
+    order.append((priority, caller))
+    await asyncio.sleep(seconds)
+    scheduler.release(priority)
+
+class TestPriorityScheduler:
+    def test_higher_class_goes_first(self):
+        """Test that a waiting interactive call gets the next slot before queued background calls"""
+        async def scenario():
+            scheduler, order = PriorityScheduler(capacity=1), []
+            tasks = [asyncio.create_task(hold(scheduler, "background", f"r{i}", order)) for i in range(3)]
+            await asyncio.sleep(0.005)
+            tasks.append(asyncio.create_task(hold(scheduler, "interactive", "router", order)))
+            await asyncio.gather(*tasks)
+            return order
+        assert asyncio.run(scenario())[:2] == [("background", "r0"), ("interactive", "router")]
+
+    def test_callers_take_turns(self):
+        """Test round-robin between callers of the same class"""
+        async def scenario():
+            scheduler, order = PriorityScheduler(capacity=1), []
+            tasks = [asyncio.create_task(hold(scheduler, "background", "chatty", order, 0.005)) for _ in range(4)]
+            tasks.append(asyncio.create_task(hold(scheduler, "background", "quiet", order, 0.005)))
+            await asyncio.gather(*tasks)
+            return [caller for _, caller in order]
+        # The first call starts at once; after that the quiet caller doesn't wait behind all of chatty's calls
+        assert asyncio.run(scenario())[:4] == ["chatty", "chatty", "quiet", "chatty"]
+
+    def test_class_cap_leaves_headroom(self):
+        """Test that background work can't take every slot"""
+        async def scenario():
+            scheduler = PriorityScheduler(capacity=4)
+            tasks = [asyncio.create_task(hold(scheduler, "background", "r", [], 0.05)) for _ in range(10)]
+            await asyncio.sleep(0.01)
+            running = scheduler.running
+            start = time.monotonic()
+            await hold(scheduler, "interactive", "router", [], 0)
+            waited = time.monotonic() - start
+            await asyncio.gather(*tasks)
+            return running, waited
+        running, waited = asyncio.run(scenario())
+        assert running == 2
+        assert waited < 0.02
+
+    def test_expired_calls_are_dropped(self):
+        """Test that a queued call past its deadline fails early instead of taking a slot"""
+        async def scenario():
+            scheduler = PriorityScheduler(capacity=1)
+            blocker = asyncio.create_task(hold(scheduler, "background", "r", [], 0.1))
+            await asyncio.sleep(0.005)
+            with pytest.raises(DeadlineExceeded):
+                await scheduler.acquire("background", "late", time.monotonic() + 0.02)
+            await blocker
+            return scheduler.report()["background"]
+        report = asyncio.run(scenario())
+        assert report["dropped"] == 1
+        assert report["queued"] == 0 and report["running"] == 0
+
+class TestClientPriorities:
+    def test_deadline_per_call(self):
+        """Test that the client raises DeadlineExceeded for a call that can't be sent in time"""
+        class Slow:
+            def __init__(self):
+                self.chat = self
+                self.completions = self
+            async def create(self, model, messages):
+                await asyncio.sleep(0.2)
+                return "done"
+
+        client = LLMClient(Slow(), max_connections=1)
+        background = client.with_priority("background")
+
+        async def scenario():
+            first = asyncio.create_task(background.acreate(model="m", messages=[]))
+            await asyncio.sleep(0.02)
+            with pytest.raises(DeadlineExceeded):
+                await background.acreate(model="m", messages=[], deadline=0.05)
+            return await first
+        assert asyncio.run(scenario()) == "done"
@@ -1,9 +1,13 @@
+import os
+import sys
 import asyncio
 import aiohttp
-from pydantic import BaseModel, HttpUrl, ValidationError
+from pydantic import BaseModel, HttpUrl, TypeAdapter, ValidationError
 from typing import List, Optional
 import time
 import random
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.records import record
 
 # --- 1. Define Data Structure with Pydantic ---
 # Pydantic allows us to define the "shape" of our data. 
@@ -16,9 +20,24 @@ class ScrapedPage(BaseModel):
     
     # You can add custom validation logic here if needed
 
+# Validation happens once, at the boundary: the URLs we are given are checked up front.
+# Everything else in a page (status, length, title) we compute ourselves, so pages are
+# built as compact, unvalidated records (see common/records.py). `.to_model()` gives the model back.
+PageRecord = record(ScrapedPage, "PageRecord")
+URL = TypeAdapter(HttpUrl)
+
+def valid_urls(urls: List[str]) -> List[str]:
+    valid = []
+    for url in urls:
+        try:
+            valid.append(str(URL.validate_python(url)))
+        except ValidationError:
+            print(f"Skipping invalid URL: {url}")
+    return valid
+
 # --- 2. Async Function to Fetch Data ---
 # 'async def' defines a coroutine. It can be paused and resumed.
-async def fetch_page(session: aiohttp.ClientSession, url: str, semaphore: asyncio.Semaphore) -> Optional[ScrapedPage]:
+async def fetch_page(session: aiohttp.ClientSession, url: str, semaphore: asyncio.Semaphore) -> Optional[PageRecord]:
     # Acquire a "token" from the semaphore. If limit is reached, this waits.
     async with semaphore:
         print(f"Starting fetch for: {url}")
@@ -34,8 +53,8 @@ async def fetch_page(session: aiohttp.ClientSession, url: str, semaphore: asynci
                 async with session.get(url) as response:
                     content = await response.text()
                     
-                    # Create and validate data using our Pydantic model
-                    page_data = ScrapedPage(
+                    # Our own values from an already-validated URL: a record, no re-validation
+                    page_data = PageRecord(
                         url=url,
                         status_code=response.status,
                         content_length=len(content),
@@ -55,20 +74,22 @@ async def fetch_page(session: aiohttp.ClientSession, url: str, semaphore: asynci
                     return None
 
 # --- 3. The Main Orchestrator ---
-async def main():
-    urls = [
-        "https://www.python.org",
-        "https://www.google.com",
-        "https://www.github.com",
-        "https://pypi.org",
-        "https://docs.python.org",
-    ]
+DEFAULT_URLS = [
+    "https://www.python.org",
+    "https://www.google.com",
+    "https://www.github.com",
+    "https://pypi.org",
+    "https://docs.python.org",
+]
+
+async def main(urls: Optional[List[str]] = None, concurrency: int = 2):
+    urls = valid_urls(urls or DEFAULT_URLS)
 
     # Context manager for the HTTP session
     async with aiohttp.ClientSession() as session:
-        # Create a Semaphore to limit concurrency to 2 requests at a time
+        # Create a Semaphore to limit concurrency (2 requests at a time by default)
         # This simulates an API rate limit (e.g., only 2 LLM calls allowed at once)
-        sem = asyncio.Semaphore(2)
+        sem = asyncio.Semaphore(concurrency)
         
         tasks = []
         # Create a list of coroutine objects (tasks) but don't await them yet
@@ -88,9 +109,9 @@ async def main():
         # Filter out None results (failed requests)
         valid_results = [r for r in results if r]
         
-        print("\n--- Validated Results (Pydantic Models) ---")
+        print("\n--- Results (from validated URLs) ---")
         for res in valid_results:
-            # Pydantic models have a nice string representation
+            # Records have a readable representation too (res.to_model() gives the Pydantic model)
             print(res)
 
 # --- Entry Point ---
@@ -1,9 +1,12 @@
 import os
+import sys
 import json
+import threading
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import shared_client, openai_backend
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,28 +23,45 @@ class CalendarEvent(BaseModel):
     summary: str = Field(description="A brief 1-sentence summary of the event intent")
 
 # --- 2. The Extraction Logic ---
-def extract_event_details(text: str) -> Optional[CalendarEvent]:
-    # Initialize the OpenAI client
-    # Ensure you have OPENAI_API_KEY set in your environment or .env file
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("Error: OPENAI_API_KEY not found. Please set it in a .env file.")
-        return None
+def extraction_request(text: str) -> dict:
+    """The `parse` arguments for extracting an event from `text` (also used for offline batch files, see common/jobs.py)."""
+    return dict(
+        model="gpt-4o-2024-08-06", # Supports Structured Outputs
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant that extracts calendar event details."},
+            {"role": "user", "content": text},
+        ],
+        response_format=CalendarEvent, # Pass the Pydantic class directly!
+    )
+
+_client = None # Built on first use, then reused: one connection pool and one set of rate limits for every call
+_client_lock = threading.Lock()
+
+def default_client():
+    """The extractor's client for the real API, or None if OPENAI_API_KEY is not set."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Ensure you have OPENAI_API_KEY set in your environment or .env file
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                return None
+            # The shared client counts this call's tokens, cost and latency under "extractor"
+            _client = shared_client(openai_backend(api_key)).with_priority("background", caller="extractor")
+    return _client
 
-    client = OpenAI(api_key=api_key)
+def extract_event_details(text: str, client=None) -> Optional[CalendarEvent]:
+    if client is None:
+        client = default_client()
+        if client is None:
+            print("Error: OPENAI_API_KEY not found. Please set it in a .env file.")
+            return None
 
     print(f"Analyzing text: '{text[:50]}...'")
 
     try:
         # We use the 'parse' method which is a helper for Structured Outputs
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06", # Supports Structured Outputs
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts calendar event details."},
-                {"role": "user", "content": text},
-            ],
-            response_format=CalendarEvent, # Pass the Pydantic class directly!
-        )
+        completion = client.beta.chat.completions.parse(**extraction_request(text))
 
         # The SDK automatically validates and parses the JSON into our Pydantic model
         event_data = completion.choices[0].message.parsed
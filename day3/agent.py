@@ -1,9 +1,13 @@
 import json
 import os
+import sys
 import time
 from termcolor import colored
 from dotenv import load_dotenv
-from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import shared_client, openai_backend, mock_backend
+from common.metrics import METRICS
+from prompt import PromptLayout
 
 load_dotenv()
 
@@ -58,32 +62,28 @@ tools = [
 
 # --- 2. The Agent Class (The Core Loop) ---
 class Agent:
-    def __init__(self, name: str, client, system_prompt: str = ""):
+    def __init__(self, name: str, client, system_prompt: str = "", max_messages: int = 10):
         self.name = name
         self.client = client
         self.system_prompt = system_prompt
-        self.messages = []
-        if system_prompt:
-            self.messages.append({"role": "system", "content": system_prompt})
+        # System prompt + tools first, byte-for-byte the same on every call, so the provider's
+        # prompt cache can reuse them (and the history before the last cut). See prompt.py.
+        self.prompt = PromptLayout(system_prompt, tools, max_messages=max_messages)
+
+    @property
+    def messages(self):
+        return self.prompt.messages()
 
     def manage_memory(self):
         """
         Simple Context Window Management.
         LLMs have a limit on how much text they can read (e.g., 8k tokens).
         If we don't trim the history, the agent will eventually crash.
+        The history is cut in blocks, at the start of a turn, so the cached prompt prefix survives between cuts.
         """
-        MAX_MESSAGES = 10 
-        
-        if len(self.messages) > MAX_MESSAGES + 1: # +1 for System Prompt
-            # Always keep the System Prompt (index 0)
-            system_msg = self.messages[0]
-            
-            # Keep only the last N messages
-            recent_msgs = self.messages[-MAX_MESSAGES:]
-            
-            # Reconstruct memory
-            self.messages = [system_msg] + recent_msgs
-            print(colored(f"  [System] Memory Full. Trimmed to last {MAX_MESSAGES} messages.", "light_grey"))
+        dropped = self.prompt.trim()
+        if dropped:
+            print(colored(f"  [System] Memory Full. Dropped the oldest {dropped} messages.", "light_grey"))
 
     def run(self, user_input: str):
         """
@@ -93,7 +93,7 @@ class Agent:
         3. If LLM wants to call tool -> Execute Tool -> Append Result -> Loop back to 2
         4. If LLM returns text -> Print it -> Break loop
         """
-        self.messages.append({"role": "user", "content": user_input})
+        self.prompt.append({"role": "user", "content": user_input})
         
         # Check memory before starting the turn
         self.manage_memory()
@@ -108,16 +108,16 @@ class Agent:
             
             response = self.client.chat.completions.create(
                 model="gpt-4o",
-                messages=self.messages,
-                tools=tools,
+                **self.prompt.request(), # messages + tools, prefix-stable
                 tool_choice="auto"
             )
+            self.prompt.record(response) # Cached prompt tokens, for the session's hit rate
             
             message = response.choices[0].message
             
             # Case 1: The LLM wants to call a tool
             if message.tool_calls:
-                self.messages.append(message) # Add the "intent" to history
+                self.prompt.append(message) # Add the "intent" to history
                 
                 for tool_call in message.tool_calls:
                     func_name = tool_call.function.name
@@ -125,17 +125,18 @@ class Agent:
                     
                     print(colored(f"  --> Agent decided to call: {func_name}({args})", "yellow"))
                     
-                    # Execute the tool
+                    # Execute the tool (timed, so slow tools show up next to slow LLM calls)
                     result = ""
-                    if func_name == "get_weather":
-                        result = get_weather(args["location"])
-                    elif func_name == "calculate":
-                        result = calculate(args["expression"])
+                    with METRICS.track("tool", func_name, component="agent"):
+                        if func_name == "get_weather":
+                            result = get_weather(args["location"])
+                        elif func_name == "calculate":
+                            result = calculate(args["expression"])
                     
                     print(colored(f"  <-- Tool Output: {result}", "green"))
                     
                     # Add result to history
-                    self.messages.append({
+                    self.prompt.append({
                         "tool_call_id": tool_call.id,
                         "role": "tool",
                         "name": func_name,
@@ -145,7 +146,7 @@ class Agent:
             # Case 2: The LLM has a final answer
             else:
                 print(colored(f"\n{self.name}: {message.content}", "magenta"))
-                self.messages.append(message)
+                self.prompt.append(message)
                 return message.content
 
 # --- 3. Mock Client (For when API is out of credits) ---
@@ -156,7 +157,18 @@ class MockClient:
         def __init__(self):
             self.completions = MockClient.MockCompletions()
     class MockCompletions:
+        def __init__(self):
+            from common.mock_server import PrefixCache # Only the mock needs the mock server's cache model
+            # Reports usage with cached tokens like the real API (which only caches prompts of 1024+ tokens)
+            self.prefix_cache = PrefixCache(min_tokens=0)
+
         def create(self, model, messages, tools=None, tool_choice=None):
+            response = self.respond(messages)
+            prompt, cached = self.prefix_cache.lookup({"messages": messages, "tools": tools})
+            response.usage = MockUsage(prompt, cached)
+            return response
+
+        def respond(self, messages):
             last_msg = messages[-1]
             content = last_msg.get("content", "")
             
@@ -178,6 +190,12 @@ class MockClient:
             return MockResponse(content="I can help with weather and math.")
 
 # Helper classes for Mock
+class MockUsage:
+    def __init__(self, prompt_tokens, cached_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = 10
+        self.prompt_tokens_details = type("PromptTokensDetails", (), {"cached_tokens": cached_tokens})()
+
 class MockResponse:
     def __init__(self, content=None, tool_calls=None):
         self.choices = [MockChoice(content, tool_calls)]
@@ -208,10 +226,12 @@ if __name__ == "__main__":
     
     if api_key:
         print("Using Real OpenAI API")
-        client = OpenAI(api_key=api_key)
+        client = shared_client(openai_backend(api_key))
     else:
         print("Using MOCK Client (No API Key found)")
-        client = MockClient()
+        client = shared_client(mock_backend(MockClient())) # Same rate limits, retries and timeouts as the real API
+    # A user is waiting on every turn: top priority, a deadline, and a hedge when a call is slower than usual
+    client = client.with_priority("interactive", caller="agent", deadline=30.0).with_hedging()
 
     bot = Agent("Bot", client, system_prompt="You are a helpful assistant with access to weather and math tools.")
     
@@ -226,3 +246,9 @@ if __name__ == "__main__":
             
         except KeyboardInterrupt:
             break
+
+    stats = bot.prompt.report()
+    print(colored(f"\n[Prompt Cache] {stats['cached_tokens']}/{stats['prompt_tokens']} prompt tokens cached "
+                  f"({stats['hit_rate']:.0%}) over {stats['calls']} calls, {stats['trims']} trims", "cyan"))
+    print(colored("\n[Metrics] LLM spend by component:", "cyan"))
+    print(colored(METRICS.summary(), "light_grey"))
@@ -0,0 +1,94 @@
+import os
+import sys
+from typing import Any, Dict, List
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import cached_tokens_of
+
+# --- Prompt Layout for Provider Prefix Caching ---
+# Every loop iteration sends the system prompt, the tools and the whole history again.
+# Providers cache prompt *prefixes*: if the first N tokens are byte-for-byte what they saw
+# recently, those tokens are cheaper (about half price) and faster to process. Only the
+# unchanged start of the prompt counts, so the layout has to keep that start stable:
+#
+# 1. Stable prefix: the system prompt, then the tools serialized canonically (tools sorted
+#    by name, keys sorted). It is built once per session and never changes.
+# 2. Canonical history: SDK message objects are turned into plain dicts with a fixed shape,
+#    so the same message always serializes to the same bytes.
+# 3. Block trimming: the old manage_memory() dropped the oldest message(s) on *every* turn
+#    once the history was full, which changed the start of the history every time (no cache
+#    reuse past the tools). Here the history is only cut when it is full, by a whole block,
+#    and only at the start of a user turn (never between a tool call and its result).
+#    Between two cuts the prompt only grows at the end, so everything before is reused.
+# 4. Accounting: `usage.prompt_tokens_details.cached_tokens` is read back from every
+#    response, so each session reports its prefix-cache hit rate.
+
+def canonical(value: Any) -> Any:
+    """Same content -> same key order -> same bytes, however the dicts were built."""
+    if isinstance(value, dict):
+        return {key: canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return value
+
+def canonical_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return canonical(sorted(tools, key=lambda tool: tool.get("function", {}).get("name", "")))
+
+def canonical_message(message: Any) -> Dict[str, Any]:
+    """A chat message (dict or SDK object) as a plain dict with a fixed set of keys."""
+    if isinstance(message, dict):
+        return canonical(message)
+    result: Dict[str, Any] = {"role": getattr(message, "role", "assistant"), "content": getattr(message, "content", None)}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        result["tool_calls"] = [{"id": call.id, "type": "function",
+                                 "function": {"arguments": call.function.arguments, "name": call.function.name}}
+                                for call in tool_calls]
+    return canonical(result)
+
+class PromptLayout:
+    def __init__(self, system_prompt: str, tools: List[Dict[str, Any]], max_messages: int = 10, block: int = 4):
+        self.system = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        self.tools = canonical_tools(tools)
+        self.history: List[Dict[str, Any]] = []
+        self.max_messages = max_messages
+        self.block = block # Room made by each cut: the history is cut at most once every `block` messages
+        self.stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "unreported": 0, "trims": 0}
+
+    def append(self, message: Any):
+        self.history.append(canonical_message(message))
+
+    def messages(self) -> List[Dict[str, Any]]:
+        return self.system + self.history
+
+    def request(self) -> Dict[str, Any]:
+        """The `messages` and `tools` arguments for the next call."""
+        return {"messages": self.messages(), "tools": self.tools}
+
+    def trim(self) -> int:
+        """Cuts the oldest turns once the history is full. Returns how many messages were dropped."""
+        if len(self.history) <= self.max_messages:
+            return 0
+        # Keep at most max_messages - block, starting at a user message
+        earliest = len(self.history) - max(1, self.max_messages - self.block)
+        cut = next((i for i in range(earliest, len(self.history)) if self.history[i]["role"] == "user"), None)
+        if cut is None: # One turn longer than the budget: keep that whole turn
+            cut = max((i for i, m in enumerate(self.history) if m["role"] == "user"), default=0)
+        if cut == 0:
+            return 0
+        del self.history[:cut]
+        self.stats["trims"] += 1
+        return cut
+
+    def record(self, response):
+        self.stats["calls"] += 1
+        usage = getattr(response, "usage", None)
+        cached = cached_tokens_of(response)
+        if usage is None or cached is None:
+            self.stats["unreported"] += 1
+            return
+        self.stats["prompt_tokens"] += usage.prompt_tokens
+        self.stats["cached_tokens"] += cached
+
+    def report(self) -> Dict[str, float]:
+        prompt = self.stats["prompt_tokens"]
+        return {**self.stats, "hit_rate": self.stats["cached_tokens"] / prompt if prompt else 0.0}
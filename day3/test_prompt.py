@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import subprocess
+from prompt import PromptLayout, canonical_tools
+from agent import Agent, MockClient, tools
+from common.llm import shared_client, mock_backend
+from common.metrics import cost
+from common.mock_server import PrefixCache
+
+def turn(layout, i):
+    """One user turn with a tool call: user, assistant (tool call), tool, assistant"""
+    layout.append({"role": "user", "content": f"question {i}"})
+    layout.append({"role": "assistant", "content": None, "tool_calls": [
+        {"id": f"call_{i}", "type": "function", "function": {"name": "calculate", "arguments": "{}"}}]})
+    layout.append({"role": "tool", "tool_call_id": f"call_{i}", "name": "calculate", "content": str(i)})
+    layout.append({"role": "assistant", "content": f"answer {i}"})
+
+class TestPromptLayout:
+    def setup_method(self):
+        self.layout = PromptLayout("You are helpful.", tools, max_messages=10, block=4)
+
+    def test_tools_are_byte_stable(self):
+        """Test that the tools serialize to the same bytes whatever their order and key order"""
+        shuffled = [json.loads(json.dumps(tool, sort_keys=True)) for tool in reversed(tools)]
+        for tool in shuffled:
+            tool["function"] = dict(reversed(list(tool["function"].items())))
+        assert json.dumps(canonical_tools(shuffled)) == json.dumps(canonical_tools(tools))
+
+    def test_trim_is_block_aligned_at_a_user_message(self):
+        """Test that trimming waits for a full history, then cuts whole turns and never orphans a tool result"""
+        turn(self.layout, 0)
+        turn(self.layout, 1)
+        assert self.layout.trim() == 0 # 8 messages: not full yet
+        turn(self.layout, 2)
+        assert self.layout.trim() == 8
+        history = self.layout.history
+        assert history[0]["role"] == "user" and history[0]["content"] == "question 2"
+        assert len(history) <= self.layout.max_messages - self.layout.block
+
+    def test_prefix_only_grows_between_trims(self):
+        """Test that each request extends the previous one until the next cut"""
+        sent = []
+        for i in range(3):
+            turn(self.layout, i)
+            self.layout.trim()
+            sent.append(PrefixCache.prompt_text(self.layout.request()))
+        assert sent[1].startswith(sent[0]) # Appended only
+        assert not sent[2].startswith(sent[1]) # The cut
+        assert sent[2].startswith(PrefixCache.prompt_text({"messages": self.layout.system, "tools": self.layout.tools}))
+
+class TestPrefixCaching:
+    def test_agent_session_reuses_the_prefix(self):
+        """Test that a multi-turn session with the mock reports a cache hit rate"""
+        bot = Agent("Bot", shared_client(mock_backend(MockClient())), "You are a helpful assistant.", max_messages=10)
+        for query in ["weather in Tokyo?", "calculate 10*22", "hello", "weather?", "math please", "hi"]:
+            bot.run(query)
+        report = bot.prompt.report()
+        assert report["calls"] == 10 and report["unreported"] == 0
+        assert report["trims"] >= 1
+        assert report["hit_rate"] > 0.5
+
+    def test_unstable_prefix_is_not_cached(self):
+        """Test that a changed start of the prompt invalidates everything after it"""
+        cache = PrefixCache(min_tokens=0)
+        messages = [{"role": "system", "content": "x" * 2000}, {"role": "user", "content": "hello"}]
+        cache.lookup({"messages": messages, "tools": tools})
+        _, cached = cache.lookup({"messages": messages, "tools": tools})
+        assert cached > 0
+        _, cached = cache.lookup({"messages": messages, "tools": list(reversed(tools))})
+        assert cached == 0
+
+    def test_cached_tokens_are_cheaper(self):
+        """Test that cached prompt tokens are billed at the discounted rate"""
+        assert cost("gpt-4o", 2000, 100, cached_tokens=1000) < cost("gpt-4o", 2000, 100)
+
+    def test_agent_does_not_load_the_mock_server(self):
+        """Test that only MockClient brings in the mock server: the real agent doesn't depend on it"""
+        check = "import sys, agent; print('common.mock_server' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", check], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=60)
+        assert result.stdout.strip() == "False"
@@ -1,11 +1,16 @@
 import os
+import sys
 import json
+import time
 from enum import Enum
 from typing import Optional
 from pydantic import BaseModel, Field
 from termcolor import colored
 from dotenv import load_dotenv
-from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import shared_client, openai_backend, mock_backend
+from common.metrics import METRICS, profiled
+from speculation import SpeculativeDispatcher
 
 load_dotenv()
 
@@ -37,19 +42,35 @@ def run_general_agent(query: str):
     print(colored("  [General Agent] Thinking...", "green"))
     return "I can help you with that general query. How about we break it down?"
 
+AGENTS = {
+    AgentType.CODING: run_coding_agent,
+    AgentType.WEATHER: run_weather_agent,
+    AgentType.GENERAL: run_general_agent,
+}
+
+# Cheap local hints, used to guess the route while the LLM decides (see speculation.py)
+ROUTE_HINTS = {
+    AgentType.CODING: ("code", "python", "function", "script", "bug", "debug", "program", "sql", "regex"),
+    AgentType.WEATHER: ("weather", "rain", "raining", "temperature", "forecast", "sunny", "snow", "wind"),
+}
+
 # --- 3. The Router Function ---
+def routing_request(query: str) -> dict:
+    """The `parse` arguments for routing `query` (also used to build offline batch files, see common/jobs.py)."""
+    return dict(
+        model="gpt-4o-2024-08-06",
+        messages=[
+            {"role": "system", "content": "You are a master router. Route the user's query to the most appropriate agent."},
+            {"role": "user", "content": query},
+        ],
+        response_format=Route,
+    )
+
 def route_request(client, query: str) -> Route:
     print(colored(f"\n[Router] Analyzing: '{query}'", "cyan"))
     
     try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {"role": "system", "content": "You are a master router. Route the user's query to the most appropriate agent."},
-                {"role": "user", "content": query},
-            ],
-            response_format=Route,
-        )
+        completion = client.beta.chat.completions.parse(**routing_request(query))
         return completion.choices[0].message.parsed
     except Exception as e:
         print(colored(f"Router Error: {e}", "red"))
@@ -91,16 +112,50 @@ class MockMessage:
         self.parsed = parsed_obj
 
 # --- 5. Main Orchestrator ---
+def make_speculator(max_inflight: int = 2) -> SpeculativeDispatcher:
+    """Runs the likely agent while the router LLM call is in flight. All our agents are read-only."""
+    return SpeculativeDispatcher(AGENTS, ROUTE_HINTS, max_inflight=max_inflight)
+
+def handle_request(client, query: str, speculator: Optional[SpeculativeDispatcher] = None) -> str:
+    """Routes one query and runs the chosen agent. Returns what the user gets back."""
+    # 0. Optionally, start the most likely agent now instead of after routing
+    speculation = speculator.start(query) if speculator else None
+
+    # 1. Route
+    start = time.perf_counter()
+    decision = route_request(client, query)
+    route_seconds = time.perf_counter() - start
+    
+    print(colored(f"  -> Selected: {decision.agent.value} (Confidence: {decision.confidence})", "magenta"))
+    print(colored(f"  -> Reason: {decision.reasoning}", "light_grey"))
+    
+    # 2. Safety Check: Low Confidence
+    if decision.confidence < 0.5:
+        if speculation:
+            speculation.cancel()
+        print(colored(f"  -> STOP: Confidence too low ({decision.confidence}). Asking user for clarification.", "red"))
+        return f"I'm not sure if I should use {decision.agent.value}. Could you clarify?"
+
+    # 3. Dispatch (a correct guess has already done the work)
+    if speculation:
+        result = speculation.commit(decision.agent, route_seconds)
+        if result is not None:
+            print(colored(f"  -> Speculation hit: {decision.agent.value} ran while routing", "light_grey"))
+            return result
+    return AGENTS[decision.agent](query)
+
 if __name__ == "__main__":
     # Force Mock for now
     api_key = None # os.getenv("OPENAI_API_KEY")
     
     if api_key:
         print("Using Real OpenAI API")
-        client = OpenAI(api_key=api_key)
+        client = shared_client(openai_backend(api_key))
     else:
         print("Using MOCK Router Client")
-        client = MockRouterClient()
+        client = shared_client(mock_backend(MockRouterClient())) # Same rate limits, retries and timeouts as the real API
+    # Routing is on the user's critical path: top priority, a deadline, and a hedge when a call is slower than usual
+    client = client.with_priority("interactive", caller="router", deadline=10.0).with_hedging()
 
     # Test Queries
     queries = [
@@ -109,25 +164,27 @@ if __name__ == "__main__":
         "Tell me a joke about AI",
     ]
 
+    # python day4/router.py --profile: a cProfile report for each query (--profile=sample: a sampling profile)
+    profile = next((arg for arg in sys.argv[1:] if arg.startswith("--profile")), None)
+    mode = (profile or "").partition("=")[2] or "cprofile"
+
+    # python day4/router.py --speculate: start the likely agent while the router decides
+    speculator = make_speculator() if "--speculate" in sys.argv else None
+
     for q in queries:
-        # 1. Route
-        decision = route_request(client, q)
-        
-        print(colored(f"  -> Selected: {decision.agent.value} (Confidence: {decision.confidence})", "magenta"))
-        print(colored(f"  -> Reason: {decision.reasoning}", "light_grey"))
-        
-        # 2. Safety Check: Low Confidence
-        if decision.confidence < 0.5:
-            print(colored(f"  -> STOP: Confidence too low ({decision.confidence}). Asking user for clarification.", "red"))
-            print(f"  -> Output: I'm not sure if I should use {decision.agent.value}. Could you clarify?\n")
-            continue
-
-        # 3. Dispatch
-        if decision.agent == AgentType.CODING:
-            response = run_coding_agent(q)
-        elif decision.agent == AgentType.WEATHER:
-            response = run_weather_agent(q)
-        else:
-            response = run_general_agent(q)
-            
+        with profiled(q, enabled=profile is not None, mode=mode):
+            response = handle_request(client, q, speculator)
         print(f"  -> Output: {response}\n")
+
+    if speculator:
+        speculator.shutdown()
+        stats = speculator.report()
+        print(colored(f"[Speculation] Hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses), "
+                      f"{stats['speculated']}/{stats['predictions']} speculated, "
+                      f"saved {stats['saved_seconds']:.3f}s, wasted {stats['wasted_seconds']:.3f}s", "cyan"))
+
+    for name, report in METRICS.profiles:
+        print(colored(f"\n[Profile] {name}", "cyan"))
+        print(report)
+    print(colored("\n[Metrics] LLM spend by component:", "cyan"))
+    print(colored(METRICS.summary(), "light_grey"))
@@ -0,0 +1,182 @@
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional, Tuple
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.metrics import METRICS
+
+# --- Speculative Dispatch (Don't Wait for the Router) ---
+# The worker agent can't start until `route_request` returns, so every request pays
+# the routing LLM call *plus* the agent. But most queries are easy to guess:
+# "write a python function" is a coding query, and a query we routed before goes the same way.
+#
+# While the router LLM call is in flight, we start the agent a cheap local predictor picks:
+# 1. Hit: the router agrees -> the agent's result (or most of its work) is already there.
+# 2. Miss: the router picks another agent -> the guess is cancelled (or its result is
+#    thrown away) and the right agent runs as usual. Nothing is worse than without speculation,
+#    except the wasted work.
+#
+# The predictor uses keyword hints plus the route history (exact repeats, and words seen in
+# earlier routes). Speculation is bounded:
+# - At most `max_inflight` guesses run at once; when all slots are busy, we just don't guess.
+# - Guesses below `min_confidence` are not made.
+# - If the recent hit rate drops below `min_hit_rate`, we only guess now and then (a probe),
+#   so a bad predictor can't keep wasting the workers.
+# Only agents without side effects may be run speculatively: a wrong guess must be harmless.
+
+def words(query: str):
+    return re.findall(r"[a-z0-9]+", query.lower())
+
+class Speculation:
+    """One guess in flight. The caller settles it with commit(actual_agent) or cancel()."""
+    def __init__(self, dispatcher: "SpeculativeDispatcher", query: str, guess: Hashable, future: Optional[Future]):
+        self.dispatcher = dispatcher
+        self.query = query
+        self.guess = guess
+        self.future = future
+
+    def commit(self, agent: Hashable, route_seconds: float = 0.0):
+        """The router chose `agent`: returns the speculative result on a hit, None on a miss."""
+        self.dispatcher.learn(self.query, agent)
+        if self.future is None:
+            return None
+        if agent != self.guess:
+            self.dispatcher._settle(self, "miss")
+            return None
+        try:
+            result, agent_seconds = self.future.result()
+        except Exception:
+            self.dispatcher._settle(self, "error") # Let the caller run the agent normally
+            return None
+        # Sequential would have been route + agent: the overlap of the two is what we saved
+        self.dispatcher._settle(self, "hit", min(route_seconds, agent_seconds))
+        return result
+
+    def cancel(self):
+        """The route was not acted on (e.g. low confidence): drop the guess."""
+        if self.future is not None:
+            self.dispatcher._settle(self, "cancelled")
+
+class SpeculativeDispatcher:
+    def __init__(self, agents: Dict[Hashable, Callable[[str], str]], hints: Dict[Hashable, Tuple[str, ...]],
+                 safe: Optional[set] = None, max_inflight: int = 2, min_confidence: float = 0.6,
+                 min_hit_rate: float = 0.5, probe_every: int = 10, history: int = 1000, prior: float = 0.5):
+        self.agents = agents
+        self.hints = {agent: set(keywords) for agent, keywords in hints.items()}
+        self.safe = set(agents) if safe is None else safe # Agents allowed to run on a guess
+        self.min_confidence = min_confidence
+        self.prior = prior
+        self.min_hit_rate = min_hit_rate
+        self.probe_every = probe_every
+        self.pool = ThreadPoolExecutor(max_inflight, thread_name_prefix="speculative-agent")
+        self.slots = threading.BoundedSemaphore(max_inflight)
+        self.lock = threading.Lock()
+        self.routes: OrderedDict = OrderedDict() # Normalized query -> agent it was routed to (LRU)
+        self.history = history
+        self.word_votes: Dict[str, Counter] = defaultdict(Counter) # Word -> agents it was routed to
+        self.outcomes: deque = deque(maxlen=50) # Recent hits (True) and misses (False)
+        self.requests = 0
+        self.stats = {"predictions": 0, "speculated": 0, "hits": 0, "misses": 0, "errors": 0, "cancelled": 0,
+                      "skipped_busy": 0, "skipped_unsure": 0, "skipped_cold": 0,
+                      "saved_seconds": 0.0, "wasted_seconds": 0.0}
+
+    # --- The cheap local predictor ---
+    def predict(self, query: str) -> Tuple[Optional[Hashable], float]:
+        """(agent, confidence) without calling the LLM."""
+        key = " ".join(words(query))
+        with self.lock:
+            if key in self.routes:
+                return self.routes[key], 0.95
+            scores: Counter = Counter()
+            for word in words(query):
+                for agent, keywords in self.hints.items():
+                    if word in keywords:
+                        scores[agent] += 1.0
+                votes = self.word_votes.get(word)
+                if votes:
+                    total = sum(votes.values())
+                    for agent, count in votes.items():
+                        scores[agent] += 0.5 * count / total
+        if not scores:
+            return None, 0.0
+        agent, best = scores.most_common(1)[0]
+        # The prior stands for "none of these": one weak clue is not enough to guess on
+        return agent, best / (sum(scores.values()) + self.prior)
+
+    def learn(self, query: str, agent: Hashable):
+        key = " ".join(words(query))
+        with self.lock:
+            self.routes[key] = agent
+            self.routes.move_to_end(key)
+            if len(self.routes) > self.history:
+                self.routes.popitem(last=False)
+            for word in set(words(query)):
+                if len(word) > 2: # Skip "a", "is", "in"...: they say nothing about the route
+                    self.word_votes[word][agent] += 1
+
+    # --- Dispatch ---
+    def start(self, query: str) -> Speculation:
+        """Starts the predicted agent (if worth it and a slot is free). Call before routing."""
+        guess, confidence = self.predict(query)
+        with self.lock:
+            self.requests += 1
+            self.stats["predictions"] += 1
+            reason = None
+            if guess is None or guess not in self.safe or confidence < self.min_confidence:
+                reason = "skipped_unsure"
+            elif self._cold() and self.requests % self.probe_every:
+                reason = "skipped_cold"
+            if reason:
+                self.stats[reason] += 1
+                return Speculation(self, query, guess, None)
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats["skipped_busy"] += 1
+            return Speculation(self, query, guess, None)
+        with self.lock:
+            self.stats["speculated"] += 1
+        future = self.pool.submit(self._run, guess, query)
+        return Speculation(self, query, guess, future)
+
+    def _run(self, agent: Hashable, query: str) -> Tuple[str, float]:
+        start = time.perf_counter()
+        try:
+            return self.agents[agent](query), time.perf_counter() - start
+        finally:
+            self.slots.release()
+
+    def _cold(self) -> bool:
+        recent = len(self.outcomes)
+        return recent >= 10 and sum(self.outcomes) / recent < self.min_hit_rate
+
+    def _settle(self, speculation: Speculation, outcome: str, saved_seconds: float = 0.0):
+        # A guess that never started is simply cancelled. A running one can't be interrupted
+        # (it's a thread): it finishes, its result is dropped, and its run time counts as waste.
+        if outcome != "hit":
+            if speculation.future.cancel():
+                self.slots.release() # Taken in start(), normally released by _run
+            else: # Only the agent's own run time is waste (not the router's, if the agent was already done)
+                speculation.future.add_done_callback(
+                    lambda future: self._add_waste(0.0 if future.exception() else future.result()[1]))
+        with self.lock:
+            self.stats[{"hit": "hits", "miss": "misses", "error": "errors"}.get(outcome, outcome)] += 1
+            if outcome in ("hit", "miss"):
+                self.outcomes.append(outcome == "hit")
+            self.stats["saved_seconds"] += saved_seconds
+        METRICS.inc("router_speculation_total", outcome=outcome)
+
+    def _add_waste(self, seconds: float):
+        with self.lock:
+            self.stats["wasted_seconds"] += seconds
+
+    def report(self) -> Dict[str, float]:
+        with self.lock:
+            settled = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "hit_rate": self.stats["hits"] / settled if settled else 0.0}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
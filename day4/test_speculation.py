@@ -0,0 +1,101 @@
+import time
+import threading
+from speculation import SpeculativeDispatcher
+from router import handle_request, make_speculator, MockRouterClient, AgentType
+
+HINTS = {"coding": ("python", "code"), "weather": ("rain", "weather")}
+
+class SlowAgents(dict):
+    """Agents that take `delay` seconds and record every run"""
+    def __init__(self, delay=0.0):
+        self.runs = []
+        super().__init__({name: self.agent(name, delay) for name in ("coding", "weather", "general")})
+
+    def agent(self, name, delay):
+        def run(query):
+            self.runs.append(name)
+            time.sleep(delay)
+            return f"{name}: {query}"
+        return run
+
+class TestSpeculativeDispatcher:
+    def setup_method(self):
+        self.agents = SlowAgents(delay=0.2)
+        self.dispatcher = SpeculativeDispatcher(self.agents, HINTS, max_inflight=2)
+
+    def teardown_method(self):
+        self.dispatcher.shutdown()
+
+    def test_hit_overlaps_agent_with_routing(self):
+        """Test that a correct guess runs during the router call, so the request takes max(route, agent)"""
+        start = time.perf_counter()
+        speculation = self.dispatcher.start("Write python code")
+        time.sleep(0.2) # The router LLM call
+        result = speculation.commit("coding", route_seconds=0.2)
+        assert result == "coding: Write python code"
+        assert time.perf_counter() - start < 0.35 # Not 0.4: route and agent overlapped
+        report = self.dispatcher.report()
+        assert (report["hits"], report["misses"], report["hit_rate"]) == (1, 0, 1.0)
+        assert report["saved_seconds"] > 0.15
+
+    def test_miss_is_discarded_and_counted_as_waste(self):
+        """Test that a wrong guess returns nothing, and its run time is reported as wasted"""
+        speculation = self.dispatcher.start("Write python code for my garden")
+        assert speculation.guess == "coding"
+        assert speculation.commit("general") is None
+        self.dispatcher.shutdown()
+        report = self.dispatcher.report()
+        assert report["misses"] == 1
+        assert report["wasted_seconds"] > 0.15
+
+    def test_waste_is_the_agents_run_time_only(self):
+        """Test that a guess that finished long before the router answered wastes its run time, not the router's"""
+        speculation = self.dispatcher.start("Write python code for my garden")
+        time.sleep(0.5) # A slow router: the guessed agent (0.2s) is long done
+        speculation.commit("general")
+        assert 0.15 < self.dispatcher.report()["wasted_seconds"] < 0.4
+
+    def test_bounded_by_free_slots_and_confidence(self):
+        """Test that no guess is made when every slot is busy, or when the query gives no clue"""
+        first = self.dispatcher.start("python code")
+        second = self.dispatcher.start("more python code")
+        third = self.dispatcher.start("even more python code")
+        assert first.future and second.future and third.future is None
+        assert self.dispatcher.start("Tell me a joke").future is None
+        report = self.dispatcher.report()
+        assert (report["speculated"], report["skipped_busy"], report["skipped_unsure"]) == (2, 1, 1)
+        for speculation in (first, second):
+            speculation.commit("coding")
+
+    def test_poor_hit_rate_backs_off_to_probes(self):
+        """Test that a predictor that keeps missing only gets an occasional probe"""
+        dispatcher = SpeculativeDispatcher(SlowAgents(), HINTS, max_inflight=4, min_confidence=0.0, probe_every=5)
+        for i in range(10):
+            dispatcher.start(f"python {i}").commit("weather") # Always guessed as coding
+        speculated = dispatcher.report()["speculated"]
+        assert speculated == 10
+        for i in range(10):
+            dispatcher.start(f"python {i + 10}").cancel()
+        report = dispatcher.report()
+        assert report["speculated"] - speculated == 2 # Every 5th request still probes
+        assert report["skipped_cold"] == 8
+        dispatcher.shutdown()
+
+    def test_route_history_predicts_repeats(self):
+        """Test that a query routed before is guessed the same way, even without keyword hints"""
+        assert self.dispatcher.predict("Tell me a joke about AI")[0] is None
+        self.dispatcher.learn("Tell me a joke about AI", "general")
+        assert self.dispatcher.predict("tell me a joke about AI!") == ("general", 0.95)
+
+class TestSpeculativeRouting:
+    def test_same_answers_with_and_without_speculation(self):
+        """Test that speculation changes latency, never the answer"""
+        client = MockRouterClient()
+        speculator = make_speculator()
+        queries = ["Write a Python function", "Is it raining in Seattle?", "Tell me a joke", "Fix this python bug"]
+        try:
+            for query in queries:
+                assert handle_request(client, query, speculator) == handle_request(client, query)
+        finally:
+            speculator.shutdown()
+        assert speculator.report()["hits"] == 3
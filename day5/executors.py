@@ -0,0 +1,288 @@
+import sys
+import json
+import time
+import socket
+import threading
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from termcolor import colored
+
+# --- Executor Backends (Where do the workers actually run?) ---
+# The Orchestrator only decides *what* to run. An executor decides *where*:
+# 1. InProcessExecutor: in the Orchestrator's own thread (the Day 5 default).
+# 2. ProcessPoolBackend: a pool of local processes, one per core.
+# 3. SocketWorkerBackend: worker processes on any machine that connect over TCP.
+#
+# Every backend has the same tiny interface:
+#   submit(payload) -> Future    (payload is a JSON-serializable dict)
+#   shutdown()
+# Because steps travel as plain JSON, the same payload works for all three.
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+class InProcessExecutor:
+    def __init__(self, handler: Handler):
+        self.handler = handler
+
+    def submit(self, payload: Dict[str, Any]) -> Future:
+        future = Future()
+        try:
+            future.set_result(self.handler(payload))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        pass
+
+class ProcessPoolBackend:
+    def __init__(self, handler: Handler, max_workers: Optional[int] = None):
+        # The handler must be a module-level function so it can be pickled by reference
+        self.handler = handler
+        self.pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(self, payload: Dict[str, Any]) -> Future:
+        return self.pool.submit(self.handler, payload)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+# --- Socket Protocol ---
+# Newline-delimited JSON messages over TCP (easy to debug with `nc`).
+# Worker -> Coordinator: {"type": "ready"} | {"type": "heartbeat"} | {"type": "result", "job_id", "ok", "result"/"error"}
+# Coordinator -> Worker: {"type": "step", "job_id", "payload"} | {"type": "shutdown"}
+
+def send_message(sock: socket.socket, lock: threading.Lock, message: Dict[str, Any]):
+    data = (json.dumps(message) + "\n").encode()
+    with lock:
+        sock.sendall(data)
+
+class Job:
+    def __init__(self, job_id: int, payload: Dict[str, Any]):
+        self.job_id = job_id
+        self.payload = payload
+        self.future = Future()
+        self.attempts = 0
+
+class WorkerConnection:
+    def __init__(self, worker_id: int, sock: socket.socket):
+        self.worker_id = worker_id
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.queue: deque = deque() # Jobs scheduled on this worker but not started yet
+        self.running: Optional[Job] = None
+        self.idle = False
+        self.alive = True
+        self.last_seen = time.monotonic()
+
+class SocketWorkerBackend:
+    """
+    A coordinator that hands steps to remote workers.
+    - Work stealing: each worker has its own queue; an idle worker steals from the busiest one.
+    - Heartbeats: workers ping every few seconds; silent or disconnected workers are declared dead.
+    - Requeueing: steps that were running (or queued) on a dead worker are re-scheduled elsewhere.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, heartbeat_timeout: float = 5.0, max_attempts: int = 3):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts # Give up on a step that keeps killing workers
+        self.lock = threading.RLock()
+        self.workers: Dict[int, WorkerConnection] = {}
+        self.backlog: deque = deque() # Jobs waiting for any worker
+        self.job_ids = itertools.count(1)
+        self.worker_ids = itertools.count(1)
+        self.next_worker = itertools.count() # Round-robin placement
+        self.closed = False
+        self.processes: List[multiprocessing.Process] = []
+
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()[:2]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._monitor_loop, daemon=True).start()
+
+    # --- Public Interface ---
+    def submit(self, payload: Dict[str, Any]) -> Future:
+        job = Job(next(self.job_ids), payload)
+        with self.lock:
+            if self.closed:
+                job.future.set_exception(RuntimeError("Executor is shut down"))
+                return job.future
+            self._schedule(job)
+            self._dispatch()
+        return job.future
+
+    def spawn_local_workers(self, count: int, handler: Handler, heartbeat_interval: float = 1.0):
+        """Start worker processes on this machine (handy for testing the remote protocol)."""
+        for _ in range(count):
+            process = multiprocessing.Process(
+                target=run_worker, args=(self.address[0], self.address[1], handler, heartbeat_interval), daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            # Nobody will run these any more: fail them, so callers waiting on result() wake up
+            outstanding = list(self.backlog)
+            self.backlog.clear()
+            for worker in self.workers.values():
+                outstanding += ([worker.running] if worker.running else []) + list(worker.queue)
+                worker.running = None
+                worker.queue.clear()
+            for job in outstanding:
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("Executor shut down before the step finished"))
+            for worker in self.workers.values():
+                try:
+                    send_message(worker.sock, worker.send_lock, {"type": "shutdown"})
+                except OSError:
+                    pass
+                worker.sock.close()
+        self.server.close()
+        for process in self.processes:
+            process.join(timeout=2)
+
+    # --- Scheduling (always called with self.lock held) ---
+    def _schedule(self, job: Job):
+        live = [w for w in self.workers.values() if w.alive]
+        if not live:
+            self.backlog.append(job)
+            return
+        worker = live[next(self.next_worker) % len(live)]
+        worker.queue.append(job)
+
+    def _next_job(self, worker: WorkerConnection) -> Optional[Job]:
+        if worker.queue:
+            return worker.queue.popleft()
+        if self.backlog:
+            return self.backlog.popleft()
+        # Steal from the tail of the busiest worker's queue
+        victim = max(self.workers.values(), key=lambda w: len(w.queue), default=None)
+        if victim and victim.queue:
+            return victim.queue.pop()
+        return None
+
+    def _dispatch(self):
+        for worker in list(self.workers.values()):
+            if not (worker.alive and worker.idle):
+                continue
+            job = self._next_job(worker)
+            if not job:
+                continue
+            job.attempts += 1
+            worker.idle = False
+            worker.running = job
+            try:
+                send_message(worker.sock, worker.send_lock, {"type": "step", "job_id": job.job_id, "payload": job.payload})
+            except OSError:
+                self._mark_dead(worker)
+
+    def _mark_dead(self, worker: WorkerConnection):
+        if not worker.alive:
+            return
+        worker.alive = False
+        self.workers.pop(worker.worker_id, None)
+        worker.sock.close()
+        orphans = list(worker.queue)
+        worker.queue.clear()
+        if worker.running:
+            orphans.insert(0, worker.running)
+            worker.running = None
+        if orphans and not self.closed:
+            print(colored(f"  [Coordinator] Worker {worker.worker_id} died. Requeueing {len(orphans)} step(s).", "red"))
+        for job in orphans:
+            if job.attempts >= self.max_attempts:
+                job.future.set_exception(RuntimeError(f"Step failed on {job.attempts} workers"))
+            else:
+                self._schedule(job)
+        self._dispatch()
+
+    # --- Background Threads ---
+    def _accept_loop(self):
+        while not self.closed:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            worker = WorkerConnection(next(self.worker_ids), sock)
+            with self.lock:
+                self.workers[worker.worker_id] = worker
+                # A new worker adopts any jobs that arrived while nobody was connected
+                while self.backlog:
+                    worker.queue.append(self.backlog.popleft())
+            threading.Thread(target=self._read_loop, args=(worker,), daemon=True).start()
+
+    def _read_loop(self, worker: WorkerConnection):
+        try:
+            for line in worker.sock.makefile("r"):
+                message = json.loads(line)
+                with self.lock:
+                    worker.last_seen = time.monotonic()
+                    if message["type"] == "ready":
+                        worker.idle = True
+                    elif message["type"] == "result":
+                        job = worker.running
+                        if job and job.job_id == message["job_id"] and not job.future.done():
+                            worker.running = None
+                            if message["ok"]:
+                                job.future.set_result(message["result"])
+                            else:
+                                job.future.set_exception(RuntimeError(message["error"]))
+                    self._dispatch()
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self._mark_dead(worker)
+
+    def _monitor_loop(self):
+        while not self.closed:
+            time.sleep(self.heartbeat_timeout / 2)
+            now = time.monotonic()
+            with self.lock:
+                for worker in list(self.workers.values()):
+                    if now - worker.last_seen > self.heartbeat_timeout:
+                        self._mark_dead(worker)
+
+# --- The Worker Side ---
+def run_worker(host: str, port: int, handler: Handler, heartbeat_interval: float = 1.0):
+    sock = socket.create_connection((host, port))
+    send_lock = threading.Lock()
+    stop = threading.Event()
+
+    def heartbeat():
+        # Runs in the background so the coordinator hears from us even during a long step
+        while not stop.wait(heartbeat_interval):
+            try:
+                send_message(sock, send_lock, {"type": "heartbeat"})
+            except OSError:
+                return
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    send_message(sock, send_lock, {"type": "ready"})
+
+    try:
+        for line in sock.makefile("r"):
+            message = json.loads(line)
+            if message["type"] == "shutdown":
+                break
+            if message["type"] != "step":
+                continue
+            try:
+                reply = {"type": "result", "job_id": message["job_id"], "ok": True, "result": handler(message["payload"])}
+            except Exception as e:
+                reply = {"type": "result", "job_id": message["job_id"], "ok": False, "error": f"{type(e).__name__}: {e}"}
+            send_message(sock, send_lock, reply)
+            send_message(sock, send_lock, {"type": "ready"})
+    except OSError:
+        pass
+    finally:
+        stop.set()
+        sock.close()
+
+if __name__ == "__main__":
+    # Start a remote worker: python day5/executors.py <coordinator-host> <port>
+    from orchestrator import run_step
+    run_worker(sys.argv[1], int(sys.argv[2]), run_step)
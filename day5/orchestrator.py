@@ -1,12 +1,18 @@
 import os
+import sys
 import json
 import time
 from enum import Enum
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
 from pydantic import BaseModel, Field
 from termcolor import colored
 from dotenv import load_dotenv
-from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import shared_client, openai_backend, mock_backend
+from common.metrics import METRICS
+from plan_cache import PlanCache
+from executors import InProcessExecutor, ProcessPoolBackend, SocketWorkerBackend
+from streaming import run_pipelined
 
 load_dotenv()
 
@@ -43,15 +49,79 @@ def run_reviewer(task: str, context: str) -> str:
     time.sleep(1)
     return f"APPROVED: The draft looks good. No hallucinations found."
 
+# Streaming versions: the Writer yields its draft section by section,
+# and the Reviewer checks each section as it arrives (see streaming.py).
+def stream_writer(task: str, context: str) -> Iterator[str]:
+    print(colored(f"  [Writer] Streaming draft section by section...", "blue"))
+    sections = [
+        f"DRAFT: Based on the research ({context[:30]}...), here is a summary article about the topic.",
+        "Section 1: Why multi-agent systems are growing.",
+        "Section 2: How Python became the language of agents.",
+        "Section 3: What the future of agents looks like.",
+    ]
+    for section in sections:
+        time.sleep(0.25) # Simulate generating one section
+        yield section
+
+def stream_reviewer(task: str, context: str, draft: Iterator[str]) -> str:
+    print(colored(f"  [Reviewer] Checking sections as they arrive...", "magenta"))
+    for i, section in enumerate(draft, 1):
+        time.sleep(0.25) # Simulate reviewing one section
+        print(colored(f"  [Reviewer] Section {i} checked.", "magenta"))
+    return f"APPROVED: The draft looks good. No hallucinations found."
+
+# Steps travel to the workers as plain JSON, so any executor backend (thread, process, remote host) can run them.
+def step_payload(step: Step, context: str) -> Dict[str, Any]:
+    return {"step_id": step.id, "agent": step.assigned_agent.value, "description": step.description, "context": context}
+
+def run_step(payload: Dict[str, Any]) -> str:
+    agent = AgentType(payload["agent"])
+    # Recorded in the registry of the process that runs the step (a worker, for the process/socket backends)
+    with METRICS.track("step", agent.value, component="orchestrator"):
+        if agent == AgentType.RESEARCHER:
+            return run_researcher(payload["description"])
+        elif agent == AgentType.WRITER:
+            return run_writer(payload["description"], payload["context"])
+        elif agent == AgentType.REVIEWER:
+            return run_reviewer(payload["description"], payload["context"])
+        return ""
+
+def make_executor(backend: str = "inprocess"):
+    """Where the worker agents run: "inprocess" (threads), "process" (a process pool) or "socket" (remote workers)."""
+    if backend == "process":
+        return ProcessPoolBackend(run_step)
+    if backend == "socket":
+        executor = SocketWorkerBackend()
+        executor.spawn_local_workers(2, run_step)
+        return executor
+    return InProcessExecutor(run_step)
+
 # --- 3. The Orchestrator (The Manager) ---
 class Orchestrator:
-    def __init__(self, client):
+    def __init__(self, client, plan_cache: Optional[PlanCache] = None, executor=None, streaming: bool = False):
         self.client = client
         self.context: Dict[int, str] = {} # Memory: Step ID -> Result
+        self.plan_cache = plan_cache
+        self.executor = executor or InProcessExecutor(run_step) # Where the worker agents run
+        # Overlap Writer -> Reviewer chains instead of running them back to back. The pipelined
+        # pair runs in this process, so streaming is only used with the in-process executor.
+        self.streaming = streaming and isinstance(self.executor, InProcessExecutor)
+        if streaming and not self.streaming:
+            print(colored("[Orchestrator] Streaming needs the in-process executor; running steps unpipelined.", "yellow"))
+        self.plan_key: Optional[str] = None # Cache key of the plan being executed
 
     def create_plan(self, goal: str) -> Plan:
         print(colored(f"\n[Orchestrator] Creating plan for: '{goal}'", "cyan"))
-        
+        self.plan_key = None
+
+        # Recurring goals are served from the plan cache without an LLM call
+        if self.plan_cache:
+            cached = self.plan_cache.lookup(goal)
+            if cached:
+                self.plan_key, plan = cached
+                print(colored(f"  -> Re-using cached plan template: '{self.plan_key}'", "green"))
+                return plan
+
         try:
             completion = self.client.beta.chat.completions.parse(
                 model="gpt-4o-2024-08-06",
@@ -61,40 +131,109 @@ class Orchestrator:
                 ],
                 response_format=Plan,
             )
-            return completion.choices[0].message.parsed
+            plan = completion.choices[0].message.parsed
+            if self.plan_cache and plan.steps:
+                self.plan_key = self.plan_cache.store(goal, plan)
+            return plan
         except Exception as e:
             print(colored(f"Planning Error: {e}", "red"))
             return Plan(steps=[])
 
+    def is_ready(self, step: Step, pending: List[Step], done: set, step_ids: set) -> bool:
+        dependencies = [d for d in step.dependencies if d in step_ids]
+        if dependencies:
+            return all(d in done for d in dependencies)
+        # No declared dependencies: research needs no context, so it can start right away.
+        # Other agents read "everything so far", so they wait for all earlier steps.
+        return step.assigned_agent == AgentType.RESEARCHER or step is pending[0]
+
+    def find_streaming_reviewer(self, writer: Step, pending: List[Step], done: set, step_ids: set) -> Optional[Step]:
+        """A Reviewer that only waits for this Writer can consume the draft while it is being written."""
+        for step in pending:
+            if step is writer or step.assigned_agent != AgentType.REVIEWER:
+                continue
+            dependencies = [d for d in step.dependencies if d in step_ids]
+            if writer.id in dependencies and all(d in done or d == writer.id for d in dependencies):
+                return step
+            if not dependencies and pending.index(step) == 1 and pending[0] is writer:
+                return step
+        return None
+
+    def run_streaming_pair(self, writer: Step, reviewer: Step, previous_context: str):
+        print(colored(f"\nStep {writer.id}: {writer.description} (Assigned to: {writer.assigned_agent.value})", "white"))
+        print(colored(f"Step {reviewer.id}: {reviewer.description} (Assigned to: {reviewer.assigned_agent.value}, streaming)", "white"))
+        draft, review = run_pipelined(
+            stream_writer(writer.description, previous_context),
+            lambda chunks: stream_reviewer(reviewer.description, previous_context, chunks),
+        )
+        # Both results still end up in memory, exactly like the non-streaming path
+        for step, result in ((writer, draft), (reviewer, review)):
+            self.context[step.id] = result
+            print(colored(f"  -> Result (Step {step.id}): {result}", "green"))
+
     def execute_plan(self, plan: Plan):
         print(colored("\n[Orchestrator] Executing Plan...", "cyan"))
+        completed = True
+        pending = list(plan.steps)
+        step_ids = {step.id for step in plan.steps}
+        done = set()
         
-        for step in plan.steps:
-            print(colored(f"\nStep {step.id}: {step.description} (Assigned to: {step.assigned_agent.value})", "white"))
+        while pending and completed:
+            # Every step whose dependencies are met is sent to the executor at once,
+            # so independent steps run in parallel on a process pool or remote workers.
+            ready = [step for step in pending if self.is_ready(step, pending, done, step_ids)] or [pending[0]]
             
             # Gather context from previous steps (simple concatenation for now)
             # In a real system, you'd be smarter about what context to pass.
             previous_context = "\n".join([f"Step {k}: {v}" for k, v in self.context.items()])
-            
-            result = ""
-            if step.assigned_agent == AgentType.RESEARCHER:
-                result = run_researcher(step.description)
-            elif step.assigned_agent == AgentType.WRITER:
-                result = run_writer(step.description, previous_context)
-            elif step.assigned_agent == AgentType.REVIEWER:
-                result = run_reviewer(step.description, previous_context)
-            
-            # Store result in memory
-            self.context[step.id] = result
-            print(colored(f"  -> Result: {result}", "green"))
+
+            # Streaming mode: a lone Writer step is pipelined with the Reviewer that checks it
+            reviewer = None
+            if self.streaming and len(ready) == 1 and ready[0].assigned_agent == AgentType.WRITER:
+                reviewer = self.find_streaming_reviewer(ready[0], pending, done, step_ids)
+
+            futures = []
+            if reviewer:
+                ready.append(reviewer)
+                try:
+                    self.run_streaming_pair(ready[0], reviewer, previous_context)
+                except Exception as e:
+                    print(colored(f"  -> Steps {ready[0].id}-{reviewer.id} failed: {e}", "red"))
+                    completed = False
+                else:
+                    for step in ready:
+                        done.add(step.id)
+                        pending.remove(step)
+            else:
+                for step in ready:
+                    print(colored(f"\nStep {step.id}: {step.description} (Assigned to: {step.assigned_agent.value})", "white"))
+                    futures.append((step, self.executor.submit(step_payload(step, previous_context))))
+
+            for step, future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(colored(f"  -> Step {step.id} failed: {e}", "red"))
+                    completed = False
+                    continue
+                
+                # Store result in memory
+                self.context[step.id] = result
+                done.add(step.id)
+                pending.remove(step)
+                print(colored(f"  -> Result: {result}", "green"))
 
             # --- Human in the Loop (Advanced) ---
             # For critical steps (like Review), ask the user for approval before proceeding.
-            if step.assigned_agent == AgentType.REVIEWER:
+            if completed and any(step.assigned_agent == AgentType.REVIEWER for step in ready):
                 user_approval = input(colored("\n[System] Reviewer finished. Proceed to publish? (y/n): ", "red"))
                 if user_approval.lower() != 'y':
                     print(colored("  -> Stopping execution based on user feedback.", "red"))
-                    break
+                    completed = False
+
+        # Let the plan cache know whether this template produced a good mission
+        if self.plan_cache and self.plan_key:
+            self.plan_cache.record_outcome(self.plan_key, completed)
 
         print(colored("\n[Orchestrator] Mission Complete!", "cyan"))
 
@@ -134,12 +273,17 @@ if __name__ == "__main__":
     
     if api_key:
         print("Using Real OpenAI API")
-        client = OpenAI(api_key=api_key)
+        client = shared_client(openai_backend(api_key))
     else:
         print("Using MOCK Orchestrator Client")
-        client = MockOrchestratorClient()
+        client = shared_client(mock_backend(MockOrchestratorClient())) # Same rate limits, retries and timeouts as the real API
+    client = client.with_priority("planning", caller="planner", deadline=60.0).with_hedging()
+
+    # Pick where the worker agents run: python day5/orchestrator.py [inprocess|process|socket] [--stream]
+    backend = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "inprocess"
+    executor = make_executor(backend)
 
-    manager = Orchestrator(client)
+    manager = Orchestrator(client, plan_cache=PlanCache(), executor=executor, streaming="--stream" in sys.argv)
     
     user_goal = "Research the latest trends in Multi-Agent Systems and write a verified blog post about it."
     
@@ -151,3 +295,14 @@ if __name__ == "__main__":
         manager.execute_plan(plan)
     else:
         print("Failed to generate plan.")
+
+    # 3. A goal with the same shape is planned from the cache (no LLM call)
+    start = time.perf_counter()
+    plan = manager.create_plan("Research the latest trends in Quantum Computing and write a verified blog post about it.")
+    print(colored(f"  -> Planned in {(time.perf_counter() - start) * 1000:.2f}ms: {[s.description for s in plan.steps]}", "light_grey"))
+
+    executor.shutdown()
+
+    # 4. Where the tokens, dollars and seconds went
+    print(colored("\n[Metrics] LLM spend by component:", "cyan"))
+    print(colored(METRICS.summary(), "light_grey"))
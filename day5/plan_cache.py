@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+import time
+import difflib
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.records import record
+
+# --- Plan Cache (Template Reuse for the Planner) ---
+# Most goals we hand the Orchestrator have the same "shape":
+#   "Research <topic> and write a verified blog post about it."
+# Asking the LLM to re-plan that shape every time is slow and costs money.
+# Instead we remember plans we have already made and re-use them as templates:
+# 1. Exact hit: the normalized goal was planned before -> return that plan.
+# 2. Similar hit: the goal has the same words except for a few "slots"
+#    (e.g. a different topic) -> copy the plan and swap the slot values in.
+# Templates that keep producing failed missions are evicted.
+# A template is kept as a record (see common/records.py): the plan was validated when the LLM
+# returned it, so a hit hands out a fresh copy without validating it again.
+
+def goal_words(goal: str) -> List[str]:
+    """Split a goal into words, dropping punctuation so trivial edits still hit."""
+    return re.sub(r"[^\w\s-]", " ", goal).split()
+
+def normalize_goal(goal: str) -> str:
+    return " ".join(goal_words(goal)).lower()
+
+class PlanTemplate:
+    def __init__(self, key: str, plan: BaseModel):
+        self.key = key
+        self.tokens = key.split()
+        self.plan = record(type(plan)).from_model(plan) # Never mutated: hits get copies (to_model)
+        self.uses = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def success_rate(self) -> float:
+        finished = self.successes + self.failures
+        return self.successes / finished if finished else 1.0
+
+class PlanCache:
+    def __init__(self, max_templates: int = 128, min_similarity: float = 0.6,
+                 max_params: int = 2, min_uses: int = 3, min_success_rate: float = 0.5):
+        self.templates: Dict[str, PlanTemplate] = {}
+        self.max_templates = max_templates
+        self.min_similarity = min_similarity # Token-level similarity needed to re-use a template
+        self.max_params = max_params # How many differing "slots" we are willing to fill in
+        self.min_uses = min_uses # Don't judge a template before it has been tried a few times
+        self.min_success_rate = min_success_rate
+        self.hits = 0
+        self.misses = 0
+
+    def store(self, goal: str, plan: BaseModel) -> str:
+        key = normalize_goal(goal)
+        if key not in self.templates and len(self.templates) >= self.max_templates:
+            # Evict the least recently used template
+            oldest = min(self.templates.values(), key=lambda t: t.last_used)
+            del self.templates[oldest.key]
+        self.templates[key] = PlanTemplate(key, plan)
+        return key
+
+    def lookup(self, goal: str) -> Optional[Tuple[str, BaseModel]]:
+        """
+        Returns (template_key, plan) without calling the LLM, or None on a miss.
+        """
+        key = normalize_goal(goal)
+
+        # 1. Exact match
+        template = self.templates.get(key)
+        if template:
+            return self._hit(template, template.plan.to_model())
+
+        # 2. Similar match: align the goal against each template word by word
+        tokens = key.split()
+        original = goal_words(goal) # Same words with their casing, used as slot values
+        best = None
+        for template in self.templates.values():
+            matcher = difflib.SequenceMatcher(a=template.tokens, b=tokens, autojunk=False)
+            # Cheap upper bound first, so most templates are rejected without a full diff
+            if matcher.real_quick_ratio() < self.min_similarity or matcher.quick_ratio() < self.min_similarity:
+                continue
+            ratio = matcher.ratio()
+            if ratio < self.min_similarity or (best and ratio <= best[0]):
+                continue
+            params = self._extract_params(template, original, matcher)
+            if params is not None:
+                best = (ratio, template, params)
+
+        if not best:
+            self.misses += 1
+            return None
+
+        _, template, params = best
+        plan = self._fill(template, params)
+        if plan is None: # The plan doesn't mention a slot: it would be the old goal's plan, unchanged
+            self.misses += 1
+            return None
+        return self._hit(template, plan)
+
+    def record_outcome(self, key: str, success: bool):
+        template = self.templates.get(key)
+        if not template:
+            return
+        if success:
+            template.successes += 1
+        else:
+            template.failures += 1
+
+        # Evict templates that keep leading to failed missions
+        finished = template.successes + template.failures
+        if finished >= self.min_uses and template.success_rate < self.min_success_rate:
+            del self.templates[key]
+
+    def _hit(self, template: PlanTemplate, plan: BaseModel) -> Tuple[str, BaseModel]:
+        self.hits += 1
+        template.uses += 1
+        template.last_used = time.monotonic()
+        return template.key, plan
+
+    def _extract_params(self, template: PlanTemplate, tokens: List[str],
+                        matcher: difflib.SequenceMatcher) -> Optional[List[Tuple[str, str]]]:
+        """
+        The words that differ between the two goals are the template's parameters.
+        Only pure substitutions are allowed; an insertion or deletion changes the shape of the goal.
+        """
+        params = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            if tag != "replace":
+                return None
+            params.append((" ".join(template.tokens[i1:i2]), " ".join(tokens[j1:j2])))
+        if len(params) > self.max_params:
+            return None
+        return params
+
+    def _fill(self, template: PlanTemplate, params: List[Tuple[str, str]]) -> Optional[BaseModel]:
+        """The plan with every slot value swapped, or None if some old value appears in no step."""
+        steps = []
+        substituted = set()
+        for step in template.plan.steps:
+            description = step.description
+            for old, new in params:
+                # Whole words only: "AI" must not match inside "main" or "details"
+                description, count = re.subn(rf"(?<!\w){re.escape(old)}(?!\w)", lambda _: new, description, flags=re.IGNORECASE)
+                if count:
+                    substituted.add(old)
+            steps.append(step.replace(description=description))
+        if len(substituted) < len({old for old, _ in params}):
+            return None
+        return template.plan.replace(steps=steps).to_model()
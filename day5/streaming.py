@@ -0,0 +1,59 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Tuple
+
+# --- Streaming Steps (Pipelining Writer -> Reviewer) ---
+# Normally the Reviewer waits for the Writer's *entire* draft.
+# With streaming, the Writer yields the draft one section at a time and the
+# Reviewer checks each section as soon as it arrives:
+#
+#   Writer:   [sec 1][sec 2][sec 3][sec 4]
+#   Reviewer:        [sec 1][sec 2][sec 3][sec 4]
+#
+# Total time ~ the slower of the two agents (plus one section), not their sum.
+# The two stages are connected by a *bounded* queue: if the Reviewer falls behind,
+# the Writer blocks on put() instead of piling up an unbounded backlog (backpressure).
+
+_DONE = object() # Sentinel marking the end of the stream
+
+def run_pipelined(produce: Iterable[str], consume: Callable[[Iterator[str]], str], maxsize: int = 2) -> Tuple[str, str]:
+    """
+    Runs a producer (e.g. a streaming Writer) in a background thread and feeds its
+    chunks to a consumer (e.g. a streaming Reviewer) in the calling thread.
+    Returns (full producer output, consumer output).
+    """
+    channel = queue.Queue(maxsize=maxsize)
+    chunks = []
+    errors = []
+
+    def pump():
+        try:
+            for chunk in produce:
+                chunks.append(chunk)
+                channel.put(chunk) # Blocks while the consumer is `maxsize` chunks behind
+        except Exception as e:
+            errors.append(e)
+        finally:
+            channel.put(_DONE)
+
+    def drain() -> Iterator[str]:
+        while True:
+            chunk = channel.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        if errors:
+            raise errors[0]
+
+    producer = threading.Thread(target=pump, daemon=True)
+    producer.start()
+    stream = drain()
+    try:
+        result = consume(stream)
+    finally:
+        # If the consumer stopped early, keep draining so the producer is never stuck on put()
+        for _ in stream:
+            pass
+        producer.join()
+
+    return "\n\n".join(chunks), result
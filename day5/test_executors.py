@@ -0,0 +1,56 @@
+import os
+import time
+import pytest
+from executors import InProcessExecutor, SocketWorkerBackend
+
+def echo_handler(payload):
+    time.sleep(payload.get("sleep", 0))
+    return f"done {payload['step_id']}"
+
+def crash_once_handler(payload):
+    """Kills its worker process the first time it sees a step, simulating a dead machine"""
+    marker = payload["marker"]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "survived"
+
+class TestExecutors:
+    def test_in_process(self):
+        """Test that the default backend runs the step immediately"""
+        assert InProcessExecutor(echo_handler).submit({"step_id": 1}).result() == "done 1"
+
+    def test_socket_workers_run_in_parallel(self):
+        """Test that steps spread over several workers instead of running one after another"""
+        backend = SocketWorkerBackend()
+        backend.spawn_local_workers(4, echo_handler)
+        try:
+            start = time.time()
+            futures = [backend.submit({"step_id": i, "sleep": 0.5}) for i in range(4)]
+            assert [f.result(timeout=10) for f in futures] == [f"done {i}" for i in range(4)]
+            assert time.time() - start < 1.9
+        finally:
+            backend.shutdown()
+
+    def test_dead_worker_step_is_requeued(self, tmp_path):
+        """Test that a step running on a crashed worker is retried on another worker"""
+        backend = SocketWorkerBackend()
+        backend.spawn_local_workers(2, crash_once_handler)
+        try:
+            future = backend.submit({"step_id": 1, "marker": str(tmp_path / "crashed")})
+            assert future.result(timeout=10) == "survived"
+        finally:
+            backend.shutdown()
+
+    def test_shutdown_fails_outstanding_steps(self):
+        """Test that shutting down wakes up callers of running and queued steps instead of leaving them blocked"""
+        backend = SocketWorkerBackend()
+        backend.spawn_local_workers(1, echo_handler)
+        futures = [backend.submit({"step_id": i, "sleep": 5}) for i in range(3)]
+        time.sleep(0.5) # Let the worker pick up the first step
+        backend.shutdown()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=2)
+        with pytest.raises(RuntimeError):
+            backend.submit({"step_id": 9}).result(timeout=1)
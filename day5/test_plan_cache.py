@@ -0,0 +1,67 @@
+import pytest
+from orchestrator import Orchestrator, MockOrchestratorClient, Plan, Step, AgentType
+from plan_cache import PlanCache
+
+GOAL = "Research the latest trends in Multi-Agent Systems and write a verified blog post about it."
+
+class CountingClient(MockOrchestratorClient):
+    """Mock client that counts how many times the planner LLM was called"""
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        original_parse = self.beta.chat.completions.parse
+
+        def parse(*args, **kwargs):
+            self.calls += 1
+            return original_parse(*args, **kwargs)
+        self.beta.chat.completions.parse = parse
+
+class TestPlanCache:
+    def setup_method(self):
+        self.client = CountingClient()
+        self.manager = Orchestrator(self.client, plan_cache=PlanCache())
+
+    def test_exact_goal_skips_llm(self):
+        """Test that re-planning the same goal (modulo case/punctuation) is served from the cache"""
+        first = self.manager.create_plan(GOAL)
+        second = self.manager.create_plan(GOAL.upper().rstrip("."))
+        assert self.client.calls == 1
+        assert second == first
+
+    def test_similar_goal_fills_parameters(self):
+        """Test that a goal with a different topic re-uses the template with the topic swapped in"""
+        self.manager.create_plan(GOAL)
+        plan = self.manager.create_plan(GOAL.replace("Multi-Agent Systems", "Quantum Computing"))
+        assert self.client.calls == 1
+        assert plan.steps[0].description == "Research the latest trends in Quantum Computing"
+
+    def test_different_shape_misses(self):
+        """Test that a goal with a different shape still calls the LLM"""
+        self.manager.create_plan(GOAL)
+        self.manager.create_plan("Tell me a joke")
+        assert self.client.calls == 2
+
+    def test_failing_template_is_evicted(self):
+        """Test that templates with a poor success rate are dropped"""
+        cache = PlanCache(min_uses=2)
+        plan = Plan(steps=[Step(id=1, description="Research cats", assigned_agent=AgentType.RESEARCHER)])
+        key = cache.store("Research cats", plan)
+        cache.record_outcome(key, False)
+        cache.record_outcome(key, False)
+        assert cache.lookup("Research cats") is None
+
+    def test_slots_replace_whole_words_only(self):
+        """Test that a slot value is not replaced inside other words"""
+        cache = PlanCache()
+        plan = Plan(steps=[Step(id=1, description="Research the main facts and details about AI", assigned_agent=AgentType.RESEARCHER)])
+        cache.store("Research AI and write a blog post", plan)
+        _, filled = cache.lookup("Research Rust and write a blog post")
+        assert filled.steps[0].description == "Research the main facts and details about Rust"
+
+    def test_unmentioned_slot_misses(self):
+        """Test that a template whose plan never mentions the slot is not reused for another value"""
+        cache = PlanCache()
+        plan = Plan(steps=[Step(id=1, description="Find good sources", assigned_agent=AgentType.RESEARCHER)])
+        cache.store("Research cats and write a blog post", plan)
+        assert cache.lookup("Research dogs and write a blog post") is None
+        assert cache.misses == 1
@@ -0,0 +1,68 @@
+import time
+import pytest
+import orchestrator
+from streaming import run_pipelined
+from executors import ProcessPoolBackend
+from plan_cache import PlanCache
+
+class TestStreaming:
+    def test_stages_overlap(self):
+        """Test that a write -> review chain takes about as long as its slowest stage, not the sum"""
+        def writer():
+            for i in range(4):
+                time.sleep(0.1)
+                yield f"section {i}"
+
+        def reviewer(chunks):
+            for _ in chunks:
+                time.sleep(0.1)
+            return "APPROVED"
+
+        start = time.time()
+        draft, review = run_pipelined(writer(), reviewer)
+        assert time.time() - start < 0.7 # Sequential would be 0.8s
+        assert draft == "section 0\n\nsection 1\n\nsection 2\n\nsection 3"
+        assert review == "APPROVED"
+
+    def test_backpressure(self):
+        """Test that the producer never runs more than the queue size ahead of the consumer"""
+        produced, consumed, max_lead = [], [], []
+
+        def writer():
+            for i in range(10):
+                produced.append(i)
+                yield str(i)
+
+        def reviewer(chunks):
+            for chunk in chunks:
+                time.sleep(0.01)
+                consumed.append(chunk)
+                max_lead.append(len(produced) - len(consumed))
+            return "done"
+
+        run_pipelined(writer(), reviewer, maxsize=2)
+        assert max(max_lead) <= 3
+
+class TestStreamingOrchestrator:
+    def test_failed_pair_fails_the_mission(self, monkeypatch):
+        """Test that a writer crashing mid-stream marks the mission failed and is reported to the plan cache"""
+        def broken_writer(description, context):
+            yield "section 0"
+            raise RuntimeError("writer crashed")
+        monkeypatch.setattr(orchestrator, "stream_writer", broken_writer)
+        monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("must not ask for approval"))
+        cache = PlanCache(min_uses=1)
+        manager = orchestrator.Orchestrator(orchestrator.MockOrchestratorClient(), plan_cache=cache, streaming=True)
+        plan = manager.create_plan("Research X and write a verified blog post")
+        manager.execute_plan(plan) # Must not raise
+        assert 2 not in manager.context
+        assert cache.templates == {} # The failure was recorded, and the template evicted
+
+    def test_streaming_needs_in_process_executor(self):
+        """Test that streaming is turned off instead of silently bypassing another executor"""
+        executor = ProcessPoolBackend(orchestrator.run_step, max_workers=1)
+        try:
+            manager = orchestrator.Orchestrator(orchestrator.MockOrchestratorClient(), executor=executor, streaming=True)
+            assert manager.streaming is False
+        finally:
+            executor.shutdown()
@@ -0,0 +1,90 @@
+import difflib
+from typing import Dict, List, Tuple
+
+# --- Feedback Compaction (Keeping Retries Cheap) ---
+# The naive loop appends every failed attempt (full code + error) to the prompt.
+# By retry 5 the LLM re-reads 4 old versions of the same function, and every round
+# costs more tokens and more latency than the one before.
+#
+# Instead, the correction context is rebuilt from scratch every round:
+# - Only the NEWEST candidate is sent in full.
+# - Older candidates are sent as small diffs against the newest one
+#   ("what you changed since then").
+# - Errors are deduplicated ("ZeroDivisionError ... (attempts 1, 3)").
+# - The whole correction context must fit a fixed token budget; the oldest diffs are dropped first.
+# So retry 5 costs about the same as retry 1.
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and code)."""
+    return len(text) // 4 + 1
+
+class FeedbackCompactor:
+    def __init__(self, system_prompt: str, task_description: str, token_budget: int = 800):
+        self.system_prompt = system_prompt
+        self.task_description = task_description
+        self.token_budget = token_budget # For everything after the task (diffs, errors, latest code)
+        self.attempts: List[Tuple[str, str]] = [] # (code, feedback), oldest first
+
+    def add_attempt(self, code: str, feedback: str):
+        self.attempts.append((code, feedback))
+
+    def messages(self) -> List[Dict[str, str]]:
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self.task_description},
+        ]
+        if not self.attempts:
+            return messages
+
+        latest_code, latest_feedback = self.attempts[-1]
+        fix_request = f"The code failed with this error:\n{latest_feedback}\nPlease fix it."
+        budget = self.token_budget - estimate_tokens(latest_code) - estimate_tokens(fix_request)
+
+        history = self.history_summary(budget)
+        if history:
+            messages.append({"role": "user", "content": history})
+        messages.append({"role": "assistant", "content": latest_code})
+        messages.append({"role": "user", "content": fix_request})
+        return messages
+
+    def history_summary(self, budget: int) -> str:
+        earlier = self.attempts[:-1]
+        if not earlier:
+            return ""
+        latest_code = self.attempts[-1][0]
+
+        # Deduplicated errors, e.g. "- ZeroDivisionError: division by zero (attempts 1, 3)"
+        errors: Dict[str, List[int]] = {}
+        for number, (_, feedback) in enumerate(earlier, 1):
+            errors.setdefault(feedback.splitlines()[0], []).append(number)
+        error_lines = [f"- {error} (attempts {', '.join(map(str, numbers))})" for error, numbers in errors.items()]
+
+        # Diffs against the newest attempt, newest first so the oldest are the ones dropped
+        diffs = []
+        for number in range(len(earlier), 0, -1):
+            code = earlier[number - 1][0]
+            diff = difflib.unified_diff(
+                code.strip().splitlines(), latest_code.strip().splitlines(),
+                fromfile=f"attempt {number}", tofile="latest", lineterm="", n=0,
+            )
+            diffs.append(f"Attempt {number} -> latest:\n" + "\n".join(diff))
+
+        header = "Earlier attempts that failed (do not repeat them):"
+        parts = [header, "Errors so far:", *error_lines]
+        used = sum(estimate_tokens(part) for part in parts)
+        if used > budget:
+            # Even the error list doesn't fit: keep the most recent errors only
+            while len(parts) > 3 and used > budget:
+                used -= estimate_tokens(parts.pop(2))
+            return "\n".join(parts)
+
+        kept = []
+        for diff in diffs:
+            cost = estimate_tokens(diff)
+            if used + cost > budget:
+                break
+            kept.append(diff)
+            used += cost
+        if kept:
+            parts += ["Changes since earlier attempts:", *reversed(kept)]
+        return "\n".join(parts)
@@ -0,0 +1,145 @@
+import math
+import time
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# --- The Test Harness (Correct *and* Fast) ---
+# One hard-coded input proves very little. A TestSuite describes everything we expect
+# from the generated function, declaratively:
+# 1. Cases: fixed inputs with expected outputs (the classic unit test).
+# 2. Properties: random inputs from a generator, checked against a rule
+#    (e.g. "the average is between min and max").
+# 3. Benchmark: time the function on an input, then 10x and 100x bigger. If the time
+#    grows faster than the budget allows, the code is rejected as "too slow".
+# Everything runs in one batch (one sandbox round trip) and stops at the first failure.
+# The suite must be picklable, so generators/checks are module-level functions.
+
+@dataclass
+class TestCase:
+    __test__ = False # Not a pytest test class
+    args: tuple
+    expected: Any
+
+@dataclass
+class Property:
+    generate: Callable[[random.Random], tuple] # Random input -> args
+    check: Callable[[tuple, Any], Optional[str]] # (args, result) -> error message or None
+    runs: int = 50
+
+@dataclass
+class Benchmark:
+    make_input: Callable[[int], tuple] # Size n -> args
+    base_size: int = 100
+    growth: int = 10 # Each step makes the input this much bigger
+    steps: int = 2 # 100 -> 1,000 -> 10,000
+    max_exponent: float = 1.5 # Allowed growth: time ~ n^1.5 covers O(n) and O(n log n) plus timing noise
+    budget_ms: float = 200.0 # A single call slower than this is "too slow" on its own
+
+@dataclass
+class TestSuite:
+    __test__ = False
+    function_name: str
+    version: str # Bump when the suite changes (cached results are keyed by it)
+    cases: List[TestCase] = field(default_factory=list)
+    properties: List[Property] = field(default_factory=list)
+    benchmark: Optional[Benchmark] = None
+    seed: int = 0
+
+    def __call__(self, namespace: Dict[str, Any]) -> Tuple[bool, str]:
+        """Runs every check against the candidate's namespace. Returns (Success, Output/Error)."""
+        func = namespace.get(self.function_name)
+        if func is None:
+            return False, f"Error: Function '{self.function_name}' not defined."
+
+        # 1. Fixed cases
+        for case in self.cases:
+            error = compare(case.expected, func(*case.args), case.args)
+            if error:
+                return False, error
+
+        # 2. Properties on random inputs
+        rng = random.Random(self.seed) # Same inputs every run, so results can be cached
+        for prop in self.properties:
+            for _ in range(prop.runs):
+                args = prop.generate(rng)
+                error = prop.check(args, func(*args))
+                if error:
+                    return False, f"PropertyError: {error} (input: {short(args)})"
+
+        # 3. Performance
+        if self.benchmark:
+            error = run_benchmark(func, self.benchmark)
+            if error:
+                return False, error
+
+        return True, "Tests Passed!"
+
+def short(args: tuple, limit: int = 80) -> str:
+    text = ", ".join(repr(a) for a in args)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def compare(expected: Any, result: Any, args: tuple) -> Optional[str]:
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        if not isinstance(result, (int, float)) or isinstance(result, bool):
+            return f"TypeError: Expected {type(expected).__name__}, got {type(result).__name__} ('{result}')"
+        if not math.isclose(result, expected, rel_tol=1e-9, abs_tol=1e-12):
+            return f"LogicError: Expected {expected}, got {result} (input: {short(args)})"
+        return None
+    if result != expected:
+        return f"LogicError: Expected {expected!r}, got {result!r} (input: {short(args)})"
+    return None
+
+# --- Benchmarking ---
+def time_call(func, args: tuple, min_total_s: float = 0.005, repeats: int = 3) -> float:
+    """
+    Seconds per call. Fast calls are repeated until the total is long enough to measure,
+    and the best of a few repeats is kept (the minimum is the least noisy estimate).
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        calls, start = 0, time.perf_counter()
+        while True:
+            func(*args)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_total_s:
+                break
+        best = min(best, elapsed / calls)
+        if elapsed > min_total_s * 10:
+            break # Slow call: one measurement is accurate enough (and repeats would be expensive)
+    return best
+
+def complexity_name(exponent: float) -> str:
+    if exponent < 1.3:
+        return "O(n)"
+    if exponent < 1.7:
+        return "O(n log n)"
+    if exponent < 2.5:
+        return "O(n²)"
+    return "O(n³)"
+
+def run_benchmark(func, benchmark: Benchmark) -> Optional[str]:
+    timings = []
+    size = benchmark.base_size
+    for _ in range(benchmark.steps + 1):
+        seconds = time_call(func, benchmark.make_input(size))
+        timings.append((size, seconds))
+        if seconds * 1000 > benchmark.budget_ms:
+            break # No point trying an even bigger input
+        size *= benchmark.growth
+
+    # How fast does the time grow? time ~ n^exponent, measured on the two largest inputs
+    exponent = 0.0
+    if len(timings) >= 2:
+        (n1, t1), (n2, t2) = timings[-2], timings[-1]
+        exponent = math.log(t2 / t1) / math.log(n2 / n1)
+
+    largest_n, largest_t = timings[-1]
+    if exponent > benchmark.max_exponent:
+        growth = timings[-1][1] / timings[-2][1]
+        return (f"PerformanceError: too slow: {complexity_name(exponent)} behaviour detected "
+                f"(input {benchmark.growth}x larger took {growth:.0f}x longer)")
+    if largest_t * 1000 > benchmark.budget_ms:
+        return f"PerformanceError: too slow: {largest_t * 1000:.0f}ms for n={largest_n} (budget {benchmark.budget_ms:.0f}ms)"
+    return None
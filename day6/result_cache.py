@@ -0,0 +1,132 @@
+import os
+import ast
+import sys
+import json
+import base64
+import marshal
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+# --- The Result Cache (Don't Test the Same Code Twice) ---
+# LLMs often answer a correction request with code that is identical (or only
+# differs in whitespace, comments or variable names) to something they already sent.
+# Running it again teaches us nothing, so we cache test outcomes by *what the code means*:
+# 1. Parse the code and drop everything that doesn't change behaviour
+#    (formatting, comments, docstrings, names of local variables).
+# 2. Hash that normalized AST together with the test-suite version.
+# 3. Store the compiled bytecode and the test outcome under that hash.
+# The cache is shared by every task and saved to disk, so it survives restarts.
+# Only deterministic outcomes are cached: a timeout, a crash, a memory limit or a too-slow
+# benchmark depends on how loaded the machine was, so that code is simply tested again next time.
+# On disk it is a JSON-lines journal: one header line, then one line appended per new entry.
+
+# Outcomes that depend on load, not on the code (error types from sandbox.py / harness.py)
+UNCACHEABLE = {"Timeout", "Crash", "MemoryLimit", "PerformanceError"}
+
+class _Normalizer(ast.NodeTransformer):
+    """Renames local variables inside functions to v0, v1, ... so `total` and `s` hash the same."""
+    def visit_FunctionDef(self, node):
+        params = {a.arg for a in node.args.args + node.args.kwonlyargs + node.args.posonlyargs}
+        declared = {n for stmt in ast.walk(node) if isinstance(stmt, (ast.Global, ast.Nonlocal)) for n in stmt.names}
+        mapping = {}
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                if child.id not in params and child.id not in declared and child.id not in mapping:
+                    mapping[child.id] = f"v{len(mapping)}"
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and child.id in mapping:
+                child.id = mapping[child.id]
+        # Drop the docstring
+        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(getattr(node.body[0], "value", None), ast.Constant) \
+                and isinstance(node.body[0].value.value, str) and len(node.body) > 1:
+            node.body = node.body[1:]
+        self.generic_visit(node)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+def normalize_code(code_str: str) -> str:
+    """A canonical text for the code: formatting, comments, docstrings and local names are gone."""
+    try:
+        tree = _Normalizer().visit(ast.parse(code_str))
+        return ast.dump(tree, annotate_fields=False, include_attributes=False)
+    except SyntaxError:
+        # Unparseable code can still be cached; only whitespace is normalized
+        return " ".join(code_str.split())
+
+def code_key(code_str: str, suite_version: str) -> str:
+    return hashlib.sha256(f"{suite_version}\0{normalize_code(code_str)}".encode()).hexdigest()
+
+class ResultCache:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock() # Parallel candidates share one cache
+        # Bytecode is only valid for the interpreter version that produced it
+        self.python_tag = sys.implementation.cache_tag
+        self.entries: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.file = None
+        if path:
+            self._load()
+
+    def get(self, key: str) -> Optional[Tuple[bool, str]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["success"], entry["feedback"]
+
+    def put(self, key: str, code_str: str, success: bool, feedback: str, error_type: Optional[str] = None):
+        if error_type in UNCACHEABLE:
+            return
+        try:
+            bytecode = base64.b64encode(marshal.dumps(compile(code_str, "<candidate>", "exec"))).decode()
+        except SyntaxError:
+            bytecode = None
+        with self.lock:
+            self.entries[key] = {"success": success, "feedback": feedback, "bytecode": bytecode}
+            if self.file:
+                self.file.write(json.dumps({"key": key, **self.entries[key]}) + "\n")
+                self.file.flush()
+
+    def load_code(self, key: str):
+        """Returns the cached code object, skipping parsing and compiling entirely."""
+        entry = self.entries.get(key)
+        if entry and entry["bytecode"]:
+            return marshal.loads(base64.b64decode(entry["bytecode"]))
+        return None
+
+    def _load(self):
+        lines = 0
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                header = f.readline()
+                try:
+                    valid = json.loads(header).get("python") == self.python_tag
+                except (ValueError, AttributeError):
+                    valid = False # Another interpreter's bytecode, or an old-format file: start over
+                for line in f if valid else ():
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break # A torn last line (crash mid-append)
+                    self.entries[entry.pop("key")] = entry
+                    lines += 1
+            if valid and lines == len(self.entries):
+                self.file = open(self.path, "a")
+                return
+        self._rewrite() # Start a fresh journal, or compact one with overwritten entries
+
+    def _rewrite(self):
+        # Write to a temp file and rename, so a crash never leaves a half-written cache
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"python": self.python_tag}) + "\n")
+            for key, entry in self.entries.items():
+                f.write(json.dumps({"key": key, **entry}) + "\n")
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "a")
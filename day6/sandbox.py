@@ -0,0 +1,227 @@
+import os
+import ast
+import sys
+import time
+import queue
+import signal
+import builtins
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import resource # POSIX only; limits are skipped where it is missing
+except ImportError:
+    resource = None
+
+# --- The Sandbox (Running Untrusted Code Safely) ---
+# LLM-generated code is untrusted. Running it with a bare `exec` in our own process means:
+# - an infinite loop hangs the whole agent,
+# - a memory bomb crashes it,
+# - it can `import os` and do anything we can do.
+# Instead we keep a pool of pre-forked, "warm" worker processes:
+# 1. Each run is limited in CPU time, wall-clock time and memory.
+# 2. The code only sees a restricted set of builtins and importable modules, and code that
+#    touches dunder or frame attributes (`().__class__.__base__.__subclasses__()`, `gen.gi_frame`)
+#    is rejected before it runs: those are the usual ways back to `os` from a plain object.
+#    This is a speed bump, not a jail; the real isolation is the worker process and its limits.
+# 3. A worker that hangs or dies is killed and replaced; healthy workers are
+#    recycled after N runs so leaked state never builds up.
+# Because the workers are already running, a test costs milliseconds instead of a new interpreter.
+
+# A checker receives the namespace the candidate code defined and returns (success, feedback).
+Checker = Callable[[Dict[str, Any]], Tuple[bool, str]]
+
+SAFE_BUILTINS = [
+    "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter", "float", "frozenset",
+    "int", "isinstance", "issubclass", "iter", "len", "list", "map", "max", "min", "next", "pow",
+    "range", "repr", "reversed", "round", "set", "slice", "sorted", "str", "sum", "tuple",
+    "zip", "print", "hash", "callable", "chr", "ord", "format", "Exception", "ArithmeticError",
+    "ValueError", "TypeError", "KeyError", "IndexError", "ZeroDivisionError", "StopIteration",
+    "NotImplementedError", "RuntimeError", "AssertionError", "OverflowError",
+]
+SAFE_MODULES = {
+    "math", "statistics", "functools", "itertools", "collections", "heapq", "bisect", "re",
+    "typing", "decimal", "fractions", "operator", "string", "dataclasses",
+}
+
+# Attribute prefixes that lead from any object to classes, frames, code and module globals
+FORBIDDEN_ATTRIBUTE_PREFIXES = ("__", "gi_", "cr_", "ag_", "f_", "tb_", "co_")
+
+class SandboxViolation(Exception):
+    pass
+
+def check_source(code_str: str):
+    """Rejects candidate code that reaches for dunder or frame attributes (raises SandboxViolation)."""
+    for node in ast.walk(ast.parse(code_str, "<candidate>")):
+        if isinstance(node, ast.Attribute) and node.attr.startswith(FORBIDDEN_ATTRIBUTE_PREFIXES):
+            raise SandboxViolation(f"Access to '.{node.attr}' is not allowed in the sandbox (line {node.lineno})")
+        if isinstance(node, ast.Name) and node.id.startswith("__") and node.id != "__name__":
+            raise SandboxViolation(f"Use of '{node.id}' is not allowed in the sandbox (line {node.lineno})")
+
+def _guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if name.split(".")[0] not in SAFE_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed in the sandbox")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+def restricted_builtins() -> Dict[str, Any]:
+    allowed = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    allowed["__import__"] = _guarded_import
+    return allowed
+
+@dataclass
+class ExecutionResult:
+    success: bool
+    feedback: str
+    error_type: Optional[str] = None # e.g. "ZeroDivisionError", "Timeout", "MemoryLimit"
+    duration_ms: float = 0.0
+    max_rss_kb: int = 0 # Peak memory of the worker process
+    worker_pid: Optional[int] = None
+
+class CPUTimeExceeded(Exception):
+    pass
+
+def _on_cpu_limit(signum, frame):
+    raise CPUTimeExceeded()
+
+def run_candidate(code_str: str, checker: Checker) -> Tuple[bool, str, Optional[str]]:
+    """Executes the candidate with restricted builtins and runs the checker against it."""
+    namespace = {"__builtins__": restricted_builtins(), "__name__": "candidate"}
+    try:
+        check_source(code_str)
+        exec(compile(code_str, "<candidate>", "exec"), namespace)
+        success, feedback = checker(namespace)
+        return success, feedback, None if success else feedback.split(":")[0]
+    except CPUTimeExceeded:
+        return False, "TimeoutError: CPU time limit exceeded (infinite loop?)", "Timeout"
+    except MemoryError:
+        return False, "MemoryError: Memory limit exceeded", "MemoryLimit"
+    except Exception as e:
+        return False, f"{type(e).__name__}: {str(e)}", type(e).__name__
+
+# --- The Worker Process ---
+def _virtual_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+def _worker_main(conn, cpu_seconds: int, memory_mb: int):
+    if resource:
+        # Memory: cap the address space at "what the interpreter already uses" + the budget
+        limit = _virtual_memory_bytes() + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        code_str, checker = job
+
+        if resource:
+            # CPU: RLIMIT_CPU counts the whole process lifetime, so move the soft limit forward every run
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds + 1, hard))
+
+        start = time.perf_counter()
+        success, feedback, error_type = run_candidate(code_str, checker)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+        conn.send((success, feedback, error_type, (time.perf_counter() - start) * 1000, max_rss))
+
+class SandboxWorker:
+    def __init__(self, context, cpu_seconds: int, memory_mb: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, cpu_seconds, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class SandboxPool:
+    def __init__(self, workers: int = 2, cpu_seconds: int = 2, wall_seconds: float = 5.0,
+                 memory_mb: int = 256, max_runs_per_worker: int = 50):
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds # Backstop for code that sleeps or blocks without using CPU
+        self.memory_mb = memory_mb
+        self.max_runs_per_worker = max_runs_per_worker
+        # Fork is what makes workers cheap: they start with our modules already imported
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.idle: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.recycled = 0
+        for _ in range(workers):
+            self.idle.put(self._spawn())
+
+    def _spawn(self) -> SandboxWorker:
+        return SandboxWorker(self.context, self.cpu_seconds, self.memory_mb)
+
+    def run(self, code_str: str, checker: Checker) -> ExecutionResult:
+        """Runs one candidate on a warm worker. Safe to call from several threads at once."""
+        worker = self.idle.get()
+        pid = worker.process.pid
+        try:
+            worker.conn.send((code_str, checker))
+            if not worker.conn.poll(self.wall_seconds):
+                worker.stop(kill=True)
+                worker = self._spawn()
+                return ExecutionResult(False, f"TimeoutError: Execution took longer than {self.wall_seconds}s",
+                                       "Timeout", self.wall_seconds * 1000, worker_pid=pid)
+            success, feedback, error_type, duration_ms, max_rss = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-run (e.g. killed by the hard CPU limit)
+            worker.stop(kill=True)
+            worker = self._spawn()
+            return ExecutionResult(False, "RuntimeError: The sandbox process crashed", "Crash", worker_pid=pid)
+        finally:
+            self._release(worker)
+
+        return ExecutionResult(success, feedback, error_type, duration_ms, max_rss, pid)
+
+    def _release(self, worker: SandboxWorker):
+        worker.runs += 1
+        if worker.runs >= self.max_runs_per_worker:
+            # Recycle long-lived workers so state leaked by candidates never accumulates
+            worker.stop()
+            worker = self._spawn()
+            with self.lock:
+                self.recycled += 1
+        if self.closed:
+            worker.stop()
+        else:
+            self.idle.put(worker)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
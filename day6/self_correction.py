@@ -1,9 +1,19 @@
 import os
+import sys
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from termcolor import colored
 from dotenv import load_dotenv
-from openai import OpenAI
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.llm import shared_client, mock_backend
+from common.metrics import METRICS
+from sandbox import SandboxPool, run_candidate
+from result_cache import ResultCache, code_key
+from harness import TestSuite, TestCase, Property, Benchmark
+from feedback import FeedbackCompactor, estimate_tokens
 
 load_dotenv()
 
@@ -11,6 +21,7 @@ load_dotenv()
 class MockCoderClient:
     def __init__(self):
         self.attempt = 0
+        self.lock = threading.Lock() # Candidates may be requested in parallel
         self.chat = self.MockChat(self)
 
     class MockChat:
@@ -23,12 +34,14 @@ class MockCoderClient:
             self.parent = parent
 
         def create(self, model, messages):
-            self.parent.attempt += 1
-            print(colored(f"\n[LLM] Generating code (Attempt {self.parent.attempt})...", "cyan"))
+            with self.parent.lock:
+                self.parent.attempt += 1
+                attempt = self.parent.attempt
+            print(colored(f"\n[LLM] Generating code (Attempt {attempt})...", "cyan"))
             time.sleep(1)
 
             # First attempt: Generate buggy code
-            if self.parent.attempt == 1:
+            if attempt == 1:
                 code = """
 def calculate_average(numbers):
     total = sum(numbers)
@@ -38,7 +51,7 @@ def calculate_average(numbers):
                 return MockResponse(code)
             
             # Second attempt: Fix the ZeroDivisionError but still return string
-            elif self.parent.attempt == 2:
+            elif attempt == 2:
                 code = """
 def calculate_average(numbers):
     if not numbers:
@@ -49,7 +62,20 @@ def calculate_average(numbers):
 """
                 return MockResponse(code)
 
-            # Third attempt: Correct code
+            # Third attempt: Correct answer, but re-sums the list on every iteration (O(n^2))
+            elif attempt == 3:
+                code = """
+def calculate_average(numbers):
+    if not numbers:
+        return 0.0
+    total = 0
+    for i in range(len(numbers)):
+        total = sum(numbers[:i + 1])
+    return total / len(numbers)
+"""
+                return MockResponse(code)
+
+            # Fourth attempt: Correct and fast code
             else:
                 code = """
 def calculate_average(numbers):
@@ -70,81 +96,183 @@ class MockMessage:
         self.content = content
 
 # --- 2. The Executor (The "Compiler/Tester") ---
-def execute_and_test(code_str: str):
+# The checks live in module-level functions so the suite can be sent to sandbox workers.
+def random_numbers(rng) -> tuple:
+    return ([rng.uniform(-1000, 1000) for _ in range(rng.randint(1, 50))],)
+
+def check_average(args: tuple, result) -> Optional[str]:
+    numbers = args[0]
+    if not isinstance(result, (int, float)):
+        return f"Expected a number, got {type(result).__name__}"
+    if not min(numbers) - 1e-9 <= result <= max(numbers) + 1e-9:
+        return f"Average {result} is outside the range of the numbers"
+    if abs(result - sum(numbers) / len(numbers)) > 1e-6:
+        return f"Expected {sum(numbers) / len(numbers)}, got {result}"
+    return None
+
+def numbers_of_size(n: int) -> tuple:
+    return (list(range(n)),)
+
+CALCULATE_AVERAGE_SUITE = TestSuite(
+    function_name="calculate_average",
+    version="calculate_average-v2", # Bump whenever the tests change, so cached results are ignored
+    cases=[
+        TestCase(args=([10, 20, 30],), expected=20.0),
+        TestCase(args=([5],), expected=5.0),
+        TestCase(args=([-1, 1],), expected=0.0),
+        TestCase(args=([1.5, 2.5],), expected=2.0),
+    ],
+    properties=[Property(generate=random_numbers, check=check_average)],
+    benchmark=Benchmark(make_input=numbers_of_size), # Must stay roughly linear up to 10,000 numbers
+)
+
+def execute_and_test(code_str: str, pool: Optional[SandboxPool] = None, cache: Optional[ResultCache] = None,
+                     suite: TestSuite = CALCULATE_AVERAGE_SUITE):
     """
-    Compiles the code and runs a test case.
+    Compiles the code and runs the test suite (cases, properties and a speed benchmark).
+    With a SandboxPool the code runs in a separate, resource-limited worker process.
+    With a ResultCache, code we have already tested (even reformatted) is not run again.
     Returns (Success: bool, Output/Error: str)
     """
     print(colored("  [System] Executing code...", "yellow"))
-    
+
+    if cache:
+        key = code_key(code_str, suite.version)
+        cached = cache.get(key)
+        if cached:
+            print(colored("  [System] Seen this code before. Re-using the cached result.", "light_grey"))
+            return cached
+
+    success, feedback, error_type = run_tests(code_str, pool, suite)
+    if cache:
+        cache.put(key, code_str, success, feedback, error_type) # Skips load-dependent outcomes (timeouts...)
+    return success, feedback
+
+def run_tests(code_str: str, pool: Optional[SandboxPool], suite: TestSuite):
     # --- Static Analysis (Linter) ---
     # Before running, check for obvious bad practices
     if "eval(" in code_str or "exec(" in code_str:
-        return False, "SecurityError: Use of 'eval' or 'exec' is forbidden."
+        return False, "SecurityError: Use of 'eval' or 'exec' is forbidden.", "SecurityError"
     
     if "print" in code_str and "return" not in code_str:
-        return False, "LintError: Function prints but does not return a value."
+        return False, "LintError: Function prints but does not return a value.", "LintError"
+
+    with METRICS.track("tool", "sandbox", component="coder"):
+        if pool:
+            result = pool.run(code_str, suite)
+            return result.success, result.feedback, result.error_type
+
+        # Without a pool, run in-process (no timeout or memory limit!)
+        return run_candidate(code_str, suite)
 
-    # Define a local scope to run the code in
-    local_scope = {}
+# --- 3. The Self-Correction Loop ---
+def generate_and_test(client, messages: list, pool: Optional[SandboxPool], cache: Optional[ResultCache],
+                      suite: TestSuite, stop: threading.Event) -> Tuple[str, bool, str]:
+    # 1. Ask LLM for code
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=messages
+    )
+    code = response.choices[0].message.content
+    
+    print(colored(f"  -> Generated Code:\n{code.strip()}", "white"))
+    
+    # Another candidate already passed while we were waiting for the LLM: don't bother testing
+    if stop.is_set():
+        return code, False, "Cancelled: another candidate already passed."
     
+    # 2. Test the code
+    success, feedback = execute_and_test(code, pool, cache, suite)
+    return code, success, feedback
+
+def run_attempt(client, messages: list, pool: Optional[SandboxPool], cache: Optional[ResultCache],
+                suite: TestSuite, candidates: int) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Asks for `candidates` solutions at the same time and tests them as they arrive.
+    The first one that passes wins; the others are cancelled.
+    Returns (winning code or None, [(code, feedback) of the failures]).
+    """
+    stop = threading.Event()
+    failures = []
+    executor = ThreadPoolExecutor(max_workers=candidates)
+    futures = [executor.submit(generate_and_test, client, list(messages), pool, cache, suite, stop) for _ in range(candidates)]
     try:
-        # 1. Compile and Execute the function definition
-        exec(code_str, {}, local_scope)
-        
-        # 2. Check if function exists
-        if "calculate_average" not in local_scope:
-            return False, "Error: Function 'calculate_average' not defined."
-        
-        # 3. Run Test Case
-        func = local_scope["calculate_average"]
-        test_data = [10, 20, 30]
-        result = func(test_data)
-        
-        # 4. Validate Result
-        if not isinstance(result, (int, float)):
-            return False, f"TypeError: Expected float, got {type(result).__name__} ('{result}')"
-        
-        if result != 20.0:
-            return False, f"LogicError: Expected 20.0, got {result}"
-            
-        return True, "Tests Passed!"
+        for future in as_completed(futures):
+            code, success, feedback = future.result()
+            if success:
+                stop.set()
+                print(colored(f"\n[Success] {feedback}", "green"))
+                return code, failures
+            if not stop.is_set():
+                print(colored(f"\n[Failure] {feedback}", "red"))
+                failures.append((code, feedback))
+    finally:
+        # Drop candidates that haven't started; running ones see `stop` and skip their test
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None, failures
 
-    except Exception as e:
-        return False, f"{type(e).__name__}: {str(e)}"
+def failure_rank(feedback: str) -> int:
+    """
+    How far did the candidate get? Code that ran but returned the wrong answer
+    tells the LLM more than code that didn't even compile.
+    """
+    if feedback.startswith("PerformanceError"):
+        return 4 # Correct, only too slow
+    if feedback.startswith(("TypeError: Expected", "LogicError", "PropertyError")):
+        return 3 # Ran to completion, wrong answer
+    if feedback.startswith(("SecurityError", "LintError", "SyntaxError", "Error: Function")):
+        return 1 # Never ran
+    return 2 # Crashed or timed out while running
 
-# --- 3. The Self-Correction Loop ---
-def run_coding_task(client, task_description: str):
-    messages = [
-        {"role": "system", "content": "You are a Python coding assistant. Write code that satisfies the user request."},
-        {"role": "user", "content": task_description}
-    ]
+def most_informative(failures: List[Tuple[str, str]], limit: int = 2) -> List[Tuple[str, str]]:
+    unique = {}
+    for code, feedback in failures:
+        unique.setdefault(feedback, (code, feedback)) # Identical errors teach the LLM nothing new
+    return sorted(unique.values(), key=lambda failure: failure_rank(failure[1]), reverse=True)[:limit]
+
+def run_coding_task(client, task_description: str, pool: Optional[SandboxPool] = None, candidates: int = 1,
+                    cache: Optional[ResultCache] = None, suite: TestSuite = CALCULATE_AVERAGE_SUITE):
+    # The prompt is rebuilt every round: latest code in full, older attempts as diffs (see feedback.py)
+    history = FeedbackCompactor(
+        "You are a Python coding assistant. Write code that satisfies the user request.",
+        task_description,
+    )
     
     max_retries = 5
+    start = time.time()
+    seen: Dict[str, int] = {} # Normalized code hash -> round it was first generated in
+    cycling_rounds = 0
     
     for i in range(max_retries):
-        # 1. Ask LLM for code
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages
-        )
-        code = response.choices[0].message.content
-        
-        print(colored(f"  -> Generated Code:\n{code.strip()}", "white"))
+        messages = history.messages()
+        if i:
+            print(colored(f"  -> Prompt size: ~{sum(estimate_tokens(m['content']) for m in messages)} tokens", "light_grey"))
         
-        # 2. Test the code
-        success, feedback = execute_and_test(code)
+        # 1 + 2. Generate `candidates` solutions in parallel and test them
+        code, failures = run_attempt(client, messages, pool, cache, suite, candidates)
         
-        if success:
-            print(colored(f"\n[Success] {feedback}", "green"))
+        if code:
+            print(colored(f"  -> Working code after {i + 1} round(s) in {time.time() - start:.2f}s", "green"))
             return code
         else:
-            print(colored(f"\n[Failure] {feedback}", "red"))
+            # Cycle detection: is the LLM just sending back code it already tried?
+            repeats = []
+            for code, feedback in failures:
+                key = code_key(code, suite.version)
+                if key in seen:
+                    repeats.append((code, f"{feedback}\nYou already sent this exact code in round {seen[key] + 1}. Try a different approach."))
+                else:
+                    seen[key] = i
+            cycling_rounds = cycling_rounds + 1 if failures and len(repeats) == len(failures) else 0
+            if cycling_rounds >= 2:
+                print(colored("\n[Fatal] The LLM keeps repeating code it already tried. Giving up early.", "red"))
+                return None
+            
             print(colored("  -> Feeding error back to LLM...", "magenta"))
             
-            # 3. Feed error back to LLM
-            messages.append({"role": "assistant", "content": code})
-            messages.append({"role": "user", "content": f"The code failed with this error:\n{feedback}\nPlease fix it."})
+            # 3. Feed the most informative errors back to LLM (the best one last, so it is sent in full)
+            for code, feedback in reversed(most_informative(repeats or failures)):
+                history.add_attempt(code, feedback)
             
     print(colored("\n[Fatal] Max retries reached. Could not fix code.", "red"))
     return None
@@ -152,9 +280,18 @@ def run_coding_task(client, task_description: str):
 # --- 4. Main Entry Point ---
 if __name__ == "__main__":
     # Force Mock for demonstration
-    client = MockCoderClient()
+    client = shared_client(mock_backend(MockCoderClient())).with_priority("background", caller="coder") # Parallel candidates share one rate limit
     
     task = "Write a function 'calculate_average(numbers)' that returns the average of a list of numbers."
     
     print(colored(f"Task: {task}", "blue"))
-    final_code = run_coding_task(client, task)
+    # Candidates run in warm, sandboxed worker processes (CPU, wall-clock and memory limits)
+    # Ask for 3 candidates per round; the first one that passes wins
+    # Test outcomes are cached on disk and shared by every task
+    cache = ResultCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".result_cache.jsonl"))
+    with SandboxPool(workers=3) as pool:
+        final_code = run_coding_task(client, task, pool, candidates=3, cache=cache)
+
+    # Every round's LLM calls and sandbox runs, in tokens, dollars and seconds
+    print(colored("\n[Metrics] LLM spend by component:", "cyan"))
+    print(colored(METRICS.summary(), "light_grey"))
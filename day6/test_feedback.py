@@ -0,0 +1,34 @@
+import pytest
+from feedback import FeedbackCompactor, estimate_tokens
+
+def attempt_code(i):
+    body = "\n".join(f"    step_{n} = numbers[{n}] * 2" for n in range(20))
+    return f"def calculate_average(numbers):\n{body}\n    return sum(numbers) / {i}\n"
+
+class TestFeedbackCompactor:
+    def setup_method(self):
+        self.history = FeedbackCompactor("system", "Write calculate_average", token_budget=800)
+
+    def test_only_latest_code_in_full(self):
+        """Test that older attempts appear as diffs, and only the newest candidate is sent whole"""
+        for i in range(1, 4):
+            self.history.add_attempt(attempt_code(i), f"LogicError: attempt {i}")
+        messages = self.history.messages()
+        assert messages[-2] == {"role": "assistant", "content": attempt_code(3)}
+        assert messages[-1]["content"].startswith("The code failed with this error:\nLogicError: attempt 3")
+        assert "Attempt 1 -> latest:" in messages[2]["content"]
+        assert attempt_code(1) not in messages[2]["content"]
+
+    def test_errors_are_deduplicated(self):
+        """Test that a repeated error is listed once with every attempt it happened in"""
+        for i in range(1, 5):
+            self.history.add_attempt(attempt_code(i), "ZeroDivisionError: division by zero")
+        assert "- ZeroDivisionError: division by zero (attempts 1, 2, 3)" in self.history.messages()[2]["content"]
+
+    def test_prompt_size_stays_flat(self):
+        """Test that the correction context stays within the token budget no matter how many retries"""
+        sizes = []
+        for i in range(1, 11):
+            self.history.add_attempt(attempt_code(i), f"LogicError: attempt {i}")
+            sizes.append(sum(estimate_tokens(m["content"]) for m in self.history.messages()[2:]))
+        assert max(sizes) <= 800 + 10
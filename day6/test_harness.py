@@ -0,0 +1,39 @@
+import pytest
+from self_correction import CALCULATE_AVERAGE_SUITE, execute_and_test
+
+FAST = "def calculate_average(numbers):\n    return sum(numbers) / len(numbers)\n"
+
+QUADRATIC = """
+def calculate_average(numbers):
+    total = 0
+    for i in range(len(numbers)):
+        total = sum(numbers[:i + 1])
+    return total / len(numbers)
+"""
+
+class TestHarness:
+    def test_fast_code_passes(self):
+        """Test that a correct, linear function passes cases, properties and the benchmark"""
+        assert execute_and_test(FAST) == (True, "Tests Passed!")
+
+    def test_quadratic_code_is_too_slow(self):
+        """Test that correct but O(n^2) code is rejected with performance feedback"""
+        success, feedback = execute_and_test(QUADRATIC)
+        assert not success
+        assert feedback.startswith("PerformanceError: too slow: O(n")
+
+    def test_stops_at_first_failing_case(self):
+        """Test that the first wrong case is reported with its input"""
+        code = "def calculate_average(numbers):\n    return numbers[0]\n"
+        success, feedback = execute_and_test(code)
+        assert feedback == "LogicError: Expected 20.0, got 10 (input: [10, 20, 30])"
+
+    def test_property_failure(self):
+        """Test that random inputs catch code that only works for the fixed cases"""
+        code = "def calculate_average(numbers):\n    return {(10, 20, 30): 20.0, (5,): 5.0, (-1, 1): 0.0, (1.5, 2.5): 2.0}.get(tuple(numbers), 0.0)\n"
+        success, feedback = execute_and_test(code)
+        assert feedback.startswith("PropertyError:")
+
+    def test_missing_function(self):
+        """Test that the suite reports a missing function by name"""
+        assert CALCULATE_AVERAGE_SUITE({}) == (False, "Error: Function 'calculate_average' not defined.")
@@ -0,0 +1,69 @@
+import pytest
+from result_cache import ResultCache, code_key
+from self_correction import run_coding_task, MockResponse
+
+ORIGINAL = """
+def calculate_average(numbers):
+    total = sum(numbers)
+    return total / len(numbers)
+"""
+
+REFORMATTED = '''
+def calculate_average(numbers):
+    """Average of a list"""
+    # Renamed variable, extra comment, different spacing
+    s  =  sum(numbers)
+    return s / len(numbers)
+'''
+
+class RepeatingClient:
+    """An LLM that keeps sending the same broken code, no matter what we tell it"""
+    def __init__(self):
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages):
+        self.calls += 1
+        return MockResponse("def calculate_average(numbers):\n    return 1 / 0\n")
+
+class TestResultCache:
+    def test_equivalent_code_has_same_key(self):
+        """Test that formatting, comments, docstrings and local names don't change the key"""
+        assert code_key(ORIGINAL, "v1") == code_key(REFORMATTED, "v1")
+        assert code_key(ORIGINAL, "v1") != code_key(ORIGINAL.replace("/", "*"), "v1")
+        assert code_key(ORIGINAL, "v1") != code_key(ORIGINAL, "v2")
+
+    def test_persisted_between_runs(self, tmp_path):
+        """Test that results and bytecode survive a restart"""
+        path = str(tmp_path / "cache.json")
+        key = code_key(ORIGINAL, "v1")
+        ResultCache(path).put(key, ORIGINAL, True, "Tests Passed!")
+
+        cache = ResultCache(path)
+        assert cache.get(key) == (True, "Tests Passed!")
+        namespace = {}
+        exec(cache.load_code(key), namespace)
+        assert namespace["calculate_average"]([1, 3]) == 2
+
+    def test_load_dependent_outcomes_are_not_cached(self, tmp_path):
+        """Test that timeouts and crashes are tested again, while ordinary failures are remembered"""
+        path = str(tmp_path / "cache.jsonl")
+        cache = ResultCache(path)
+        cache.put("slow", ORIGINAL, False, "TimeoutError: Execution took longer than 2s", "Timeout")
+        cache.put("crash", ORIGINAL, False, "RuntimeError: The sandbox process crashed", "Crash")
+        cache.put("wrong", ORIGINAL, False, "LogicError: expected 2", "LogicError")
+        cache.put("wrong", ORIGINAL, False, "LogicError: expected 2", "LogicError")
+        assert cache.get("slow") is None and cache.get("crash") is None
+        reloaded = ResultCache(path)
+        assert reloaded.get("wrong") == (False, "LogicError: expected 2") and reloaded.get("slow") is None
+        with open(path) as f:
+            assert len(f.readlines()) == 2 # Header + one entry: the duplicate was compacted away on load
+
+    def test_cycling_llm_stops_early(self):
+        """Test that the loop gives up when the LLM only repeats code it already tried"""
+        client = RepeatingClient()
+        cache = ResultCache()
+        assert run_coding_task(client, "Write calculate_average", cache=cache) is None
+        assert client.calls == 3 # Instead of max_retries = 5
+        assert cache.hits == 2
@@ -0,0 +1,80 @@
+import pytest
+from sandbox import SandboxPool
+from self_correction import CALCULATE_AVERAGE_SUITE, execute_and_test, run_coding_task, most_informative, MockCoderClient
+
+GOOD_CODE = """
+def calculate_average(numbers):
+    return sum(numbers) / len(numbers)
+"""
+
+class TestSandbox:
+    def setup_method(self):
+        self.pool = SandboxPool(workers=1, cpu_seconds=1, wall_seconds=3, memory_mb=64, max_runs_per_worker=3)
+
+    def teardown_method(self):
+        self.pool.close()
+
+    def test_passing_code(self):
+        """Test that correct code passes and reports structured results"""
+        result = self.pool.run(GOOD_CODE, CALCULATE_AVERAGE_SUITE)
+        assert result.success
+        assert result.error_type is None
+        assert result.worker_pid is not None
+
+    def test_infinite_loop_is_stopped(self):
+        """Test that a busy loop hits the CPU limit instead of hanging the agent"""
+        code = "def calculate_average(numbers):\n    while True:\n        pass\n"
+        result = self.pool.run(code, CALCULATE_AVERAGE_SUITE)
+        assert not result.success
+        assert result.error_type == "Timeout"
+        # The worker survives (or is replaced) and keeps serving candidates
+        assert self.pool.run(GOOD_CODE, CALCULATE_AVERAGE_SUITE).success
+
+    def test_memory_bomb_is_stopped(self):
+        """Test that allocating far more than the memory budget fails cleanly"""
+        code = "def calculate_average(numbers):\n    return len([0] * (10 ** 9))\n"
+        result = self.pool.run(code, CALCULATE_AVERAGE_SUITE)
+        assert result.error_type == "MemoryLimit"
+
+    def test_imports_are_restricted(self):
+        """Test that candidates cannot reach the operating system"""
+        code = "import os\ndef calculate_average(numbers):\n    return 20.0\n"
+        result = self.pool.run(code, CALCULATE_AVERAGE_SUITE)
+        assert result.error_type == "ImportError"
+
+    def test_object_graph_escapes_are_rejected(self):
+        """Test that candidates can't walk from a plain object to os via dunder or frame attributes"""
+        escapes = [
+            "def calculate_average(numbers):\n    return ().__class__.__base__.__subclasses__()\n",
+            "def calculate_average(numbers):\n    g = (n for n in numbers)\n    return g.gi_frame.f_back\n",
+            "def calculate_average(numbers):\n    return __builtins__\n",
+        ]
+        for code in escapes:
+            assert self.pool.run(code, CALCULATE_AVERAGE_SUITE).error_type == "SandboxViolation"
+
+    def test_workers_are_recycled(self):
+        """Test that a worker is replaced after max_runs_per_worker runs"""
+        pids = {self.pool.run(GOOD_CODE, CALCULATE_AVERAGE_SUITE).worker_pid for _ in range(4)}
+        assert len(pids) == 2
+        assert self.pool.recycled == 1
+
+    def test_execute_and_test_uses_pool(self):
+        """Test that the self-correction executor still returns (success, feedback)"""
+        assert execute_and_test(GOOD_CODE, self.pool) == (True, "Tests Passed!")
+
+class TestParallelCandidates:
+    def test_first_passing_candidate_wins(self):
+        """Test that 4 parallel candidates find working code in a single round"""
+        client = MockCoderClient()
+        code = run_coding_task(client, "Write calculate_average", candidates=4)
+        assert "return sum(numbers) / len(numbers)" in code
+        assert client.attempt == 4
+
+    def test_most_informative_failures_first(self):
+        """Test that wrong answers are fed back before crashes, and duplicates are dropped"""
+        failures = [
+            ("a", "ZeroDivisionError: division by zero"),
+            ("b", "ZeroDivisionError: division by zero"),
+            ("c", "LogicError: Expected 20.0, got 10"),
+        ]
+        assert most_informative(failures) == [("c", "LogicError: Expected 20.0, got 10"), ("a", "ZeroDivisionError: division by zero")]
@@ -0,0 +1,124 @@
+import sys
+import time
+import atexit
+import logging
+import threading
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, TextIO
+from termcolor import colored
+
+# --- Structured, Bounded, Asynchronous Logging ---
+# The original `Blackboard.log` formatted a timestamp, printed to stdout and appended a
+# string to an ever-growing list on EVERY call. In a long mission that means:
+# - memory grows forever, and
+# - every agent waits on the (slow, shared) console to log a line.
+#
+# BoardLogger instead:
+# 1. Stores structured records (monotonic time, level, agent, event, fields) in a
+#    fixed-size ring buffer: old records fall off the end, memory stays flat.
+# 2. Defers formatting: a record is just a tuple until someone actually reads it.
+# 3. Hands records to one background thread that writes them in batches (console or file).
+# 4. Drops records below the log level, and can sample noisy levels (keep 1 in N),
+#    so hot-path logging costs one comparison and one deque append.
+
+DEBUG, INFO, WARNING, ERROR = logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR
+
+class BoardLogger:
+    def __init__(self, capacity: int = 10_000, level: int = INFO, sample_every: Optional[Dict[int, int]] = None,
+                 stream: Optional[TextIO] = None, path: Optional[str] = None, color: bool = True, batch_size: int = 512):
+        self.records: deque = deque(maxlen=capacity) # The ring buffer
+        self.pending: deque = deque(maxlen=capacity) # Not yet written; overflow drops the oldest
+        self.level = level
+        self.sample_every = sample_every or {} # e.g. {DEBUG: 100} keeps 1 in 100 debug records
+        self.counters: Dict[int, int] = {}
+        self.batch_size = batch_size
+        self.color = color and path is None
+        self.stream = open(path, "a") if path else (stream or sys.stdout)
+        self.write_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0 # Records that fell out of `pending` before the writer got to them
+        # Anchor monotonic time to the wall clock once, instead of calling strftime per record
+        self.mono_anchor = time.monotonic()
+        self.wall_anchor = time.time()
+        _flusher.register(self)
+
+    def log(self, level: int, agent: str, event: str, **fields: Any):
+        if level < self.level:
+            return
+        every = self.sample_every.get(level)
+        if every:
+            count = self.counters.get(level, 0)
+            self.counters[level] = count + 1
+            if count % every:
+                return
+        record = (time.monotonic(), level, agent, event, fields)
+        self.records.append(record)
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(record)
+
+    def format(self, record) -> str:
+        mono, level, agent, event, fields = record
+        timestamp = time.strftime("%H:%M:%S", time.localtime(self.wall_anchor + mono - self.mono_anchor))
+        extra = "".join(f" {key}={value!r}" for key, value in fields.items())
+        prefix = f"{logging.getLevelName(level)} " if level != INFO else ""
+        return f"[{timestamp}] {prefix}{agent}: {event}{extra}"
+
+    def lines(self) -> List[str]:
+        """Formatted view of the ring buffer (formatting only happens here)."""
+        return [self.format(record) for record in list(self.records)]
+
+    def flush(self):
+        """Writes pending records in batches. Normally called by the background thread."""
+        with self.write_lock:
+            while self.pending:
+                batch = []
+                while self.pending and len(batch) < self.batch_size:
+                    batch.append(self.format(self.pending.popleft()))
+                text = "\n".join(batch) + "\n"
+                self.stream.write(colored(text, "white", attrs=["dark"]) if self.color else text)
+                self.written += len(batch)
+            self.stream.flush()
+
+    def close(self):
+        self.flush()
+        _flusher.unregister(self)
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+class _Flusher:
+    """One background thread that periodically flushes every live logger."""
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.loggers = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def register(self, logger: BoardLogger):
+        with self.lock:
+            self.loggers.add(logger)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="board-log-writer")
+                self.thread.start()
+
+    def unregister(self, logger: BoardLogger):
+        with self.lock:
+            self.loggers.discard(logger)
+
+    def flush_all(self):
+        with self.lock:
+            loggers = list(self.loggers)
+        for logger in loggers:
+            try:
+                logger.flush()
+            except (OSError, ValueError):
+                pass # Stream already closed
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush_all()
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush_all) # Don't lose the last records on exit
@@ -0,0 +1,129 @@
+import re
+import math
+import heapq
+import hashlib
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set
+
+# --- The Note Store (Deduplicated, Indexed Research Notes) ---
+# `research_notes` is a plain list, and the Writer used to `" ".join()` all of it.
+# With many researchers the list fills up with repeats ("Python is a language." x 5,
+# "Python is a popular language." ...) and every draft scans everything.
+#
+# NoteStore sits behind `research_notes` (the list stays the source of truth):
+# 1. Exact dedup: a sha256 of the normalized text. Seen it? Drop it.
+# 2. Near-dup detection: notes are split into overlapping word "shingles"
+#    ("python is a", "is a popular", ...). Two notes sharing most shingles (Jaccard
+#    similarity >= near_duplicate) say the same thing. A shingle index means a new
+#    note is only compared with notes that share at least one shingle.
+# 3. Inverted index: word -> {note id: count}, so keyword search touches only matching notes.
+# 4. Top-k selection: notes are scored against a query (TF-IDF), then picked greedily,
+#    skipping notes too similar to ones already picked, until `k` or the size budget is reached.
+#    Only matching notes go into the heap; notes that match nothing just fill leftover room.
+
+STOPWORDS = {"a", "an", "and", "the", "of", "to", "in", "on", "for", "is", "are", "it", "this",
+             "that", "with", "about", "as", "by", "be", "or", "at", "from", "was", "were", "its"}
+
+def words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    tokens = words(text)
+    if len(tokens) <= size:
+        return frozenset([" ".join(tokens)])
+    return frozenset(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+class NoteStore:
+    def __init__(self, shingle_size: int = 3, near_duplicate: float = 0.7):
+        self.shingle_size = shingle_size
+        self.near_duplicate = near_duplicate
+        self.notes: List[str] = [] # Note id == position in research_notes
+        self.hashes: Set[str] = set()
+        self.note_shingles: List[FrozenSet[str]] = []
+        self.shingle_index: Dict[str, Set[int]] = defaultdict(set)
+        self.term_index: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+
+    def _hash(self, text: str) -> str:
+        return hashlib.sha256(" ".join(words(text)).encode()).hexdigest()
+
+    def duplicate_of(self, text: str) -> Optional[str]:
+        """'exact' or 'near' if the store already says this, otherwise None."""
+        if self._hash(text) in self.hashes:
+            return "exact"
+        new = shingles(text, self.shingle_size)
+        candidates = set().union(*(self.shingle_index.get(s, ()) for s in new)) if new else set()
+        if any(jaccard(new, self.note_shingles[i]) >= self.near_duplicate for i in candidates):
+            return "near"
+        return None
+
+    def accept(self, notes: List[str]) -> List[str]:
+        """Indexes the notes that are new and returns them; duplicates are counted and dropped."""
+        accepted = []
+        for note in notes:
+            kind = self.duplicate_of(note)
+            if kind == "exact":
+                self.exact_duplicates += 1
+            elif kind == "near":
+                self.near_duplicates += 1
+            else:
+                self.index(note)
+                accepted.append(note)
+        return accepted
+
+    def index(self, note: str):
+        """Adds a note without any duplicate checks (e.g. notes restored from a snapshot)."""
+        note_id = len(self.notes)
+        self.notes.append(note)
+        self.hashes.add(self._hash(note))
+        note_shingles = shingles(note, self.shingle_size)
+        self.note_shingles.append(note_shingles)
+        for s in note_shingles:
+            self.shingle_index[s].add(note_id)
+        for term in words(note):
+            postings = self.term_index[term]
+            postings[note_id] = postings.get(note_id, 0) + 1
+
+    def search(self, query: str, k: int = 8, budget_chars: int = 2000, limit: Optional[int] = None,
+               redundancy: float = 0.5) -> List[str]:
+        """
+        The most relevant, non-redundant notes for `query`, at most `k` of them and
+        `budget_chars` characters in total, returned in the order they were added.
+        `limit` only considers the first `limit` notes (e.g. those in an agent's snapshot).
+        """
+        count = len(self.notes) if limit is None else min(limit, len(self.notes))
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(words(query)) - STOPWORDS:
+            postings = {i: tf for i, tf in self.term_index.get(term, {}).items() if i < count}
+            if postings:
+                idf = math.log(1 + count / len(postings))
+                for note_id, tf in postings.items():
+                    scores[note_id] += tf * idf
+
+        chosen, used = [], 0
+        def pick(note_id: int):
+            nonlocal used
+            size = len(self.notes[note_id])
+            if used + size > budget_chars:
+                return
+            if any(jaccard(self.note_shingles[note_id], self.note_shingles[c]) >= redundancy for c in chosen):
+                return
+            chosen.append(note_id)
+            used += size
+
+        # Best matches first, popped from a heap of the matching notes only (never a sort of every note)
+        ranked = [(-score, note_id) for note_id, score in scores.items()]
+        heapq.heapify(ranked)
+        while ranked and len(chosen) < k:
+            pick(heapq.heappop(ranked)[1])
+        # Notes that match nothing only fill leftover room, oldest first
+        for note_id in range(count):
+            if len(chosen) >= k or used >= budget_chars:
+                break
+            if note_id not in scores:
+                pick(note_id)
+        return [self.notes[i] for i in sorted(chosen)]
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from termcolor import colored
+from shared_state import Blackboard, Delta, ResearcherAgent, WriterAgent, ReviewerAgent
+
+# --- Durable Blackboard: Write-Ahead Log + Compacted Snapshots ---
+# If the process dies mid-mission, everything on the Blackboard is gone, and dumping the
+# whole pydantic model after every change would cost more and more as the notes grow.
+#
+# BoardJournal makes the board durable cheaply:
+# 1. Write-ahead log (WAL): every commit appends ONE small JSON line with its field deltas.
+# 2. Group commit: a background thread writes the lines that piled up and fsyncs them
+#    together, so 100 commits cost one fsync instead of 100. A crash loses at most
+#    `sync_interval` seconds of commits; call `wait_durable(version)` when you can't afford that.
+# 3. Compaction: every `snapshot_every` deltas the full board is written once to a snapshot
+#    file, a new WAL segment is started, and older segments and snapshots are deleted.
+# 4. Recovery: load the latest snapshot and replay only the WAL written after it.
+#    Restarting a large mission takes milliseconds instead of re-running every agent.
+#
+# Files in the journal directory:
+#   snapshot-<version>.json   the whole board at <version>
+#   wal-<version>.jsonl       commits after <version>, one per line
+
+def _snapshot_name(version: int) -> str:
+    return f"snapshot-{version:012d}.json"
+
+def _wal_name(version: int) -> str:
+    return f"wal-{version:012d}.jsonl"
+
+def _files(directory: str, prefix: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory) if name.startswith(prefix) and not name.endswith(".tmp"))
+
+def _file_version(name: str) -> int:
+    return int(name.split("-")[1].split(".")[0])
+
+class BoardJournal:
+    def __init__(self, directory: str, sync_interval: float = 0.05, snapshot_every: int = 500):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        os.makedirs(directory, exist_ok=True)
+        self.condition = threading.Condition()
+        self.pending: List[tuple] = [] # ("wal", version, line) or ("snapshot", version, state)
+        self.durable_version = 0
+        self.since_snapshot = 0
+        self.fsyncs = 0
+        self.closed = False
+        self.state: Optional[Blackboard] = None
+        self.wal = None
+        self.thread = threading.Thread(target=self._run, daemon=True, name="board-journal")
+
+    # --- Attaching to a board ---
+    def attach(self, state: Blackboard):
+        """Starts journaling `state`. Writes a snapshot first, so the log always has a starting point."""
+        self.state = state
+        with state._lock:
+            self.durable_version = state.version
+            self._write_snapshot(state.version, self._capture(state))
+            state.subscribe(self._on_commit)
+        self.thread.start()
+        return self
+
+    def _capture(self, state: Blackboard) -> Dict[str, Any]:
+        # Called under the board lock. Lists are copied: they keep growing after this point.
+        values = {name: list(value) if isinstance(value, list) else value
+                  for name, value in ((f, getattr(state, f)) for f in state.state_fields())}
+        return {"version": state.version, "values": values, "field_versions": dict(state._field_versions)}
+
+    def _on_commit(self, deltas: List[Delta]):
+        # Runs under the board lock on every commit: serialize and hand off, never touch the disk here
+        version = deltas[0].version
+        line = json.dumps({"v": version, "agent": deltas[0].agent,
+                           "d": [[d.field, d.op, d.value] for d in deltas]}, default=str)
+        self.since_snapshot += len(deltas)
+        with self.condition:
+            self.pending.append(("wal", version, line))
+            if self.since_snapshot >= self.snapshot_every:
+                self.since_snapshot = 0
+                self.pending.append(("snapshot", version, self._capture(self.state)))
+            self.condition.notify_all()
+
+    # --- The group-commit writer ---
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending and self.closed:
+                    return
+            time.sleep(self.sync_interval) # Let more commits pile up: they share one fsync
+            with self.condition:
+                batch, self.pending = self.pending, []
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[tuple]):
+        lines, version = [], self.durable_version
+        for kind, version, payload in batch:
+            if kind == "wal":
+                lines.append(payload)
+                continue
+            self._append_lines(lines) # Everything before the snapshot goes to the old segment
+            lines = []
+            self._write_snapshot(version, payload)
+        self._append_lines(lines)
+        with self.condition:
+            self.durable_version = version
+            self.condition.notify_all()
+
+    def _append_lines(self, lines: List[str]):
+        if not lines:
+            return
+        self.wal.write("\n".join(lines) + "\n")
+        self.wal.flush()
+        os.fsync(self.wal.fileno())
+        self.fsyncs += 1
+
+    def _write_snapshot(self, version: int, payload: Dict[str, Any]):
+        path = os.path.join(self.directory, _snapshot_name(version))
+        with open(path + ".tmp", "w") as f:
+            json.dump(payload, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path) # Atomic: a crash leaves the old snapshot or the new one
+        # Start a new segment, then drop everything the snapshot already covers
+        if self.wal:
+            self.wal.close()
+        self.wal = open(os.path.join(self.directory, _wal_name(version)), "a")
+        for name in _files(self.directory, "snapshot-") + _files(self.directory, "wal-"):
+            if _file_version(name) < version:
+                os.remove(os.path.join(self.directory, name))
+
+    # --- Waiting and closing ---
+    def wait_durable(self, version: Optional[int] = None, timeout: float = 5.0) -> bool:
+        """Blocks until commits up to `version` (default: all so far) are fsynced."""
+        target = self.state.version if version is None else version
+        with self.condition:
+            return self.condition.wait_for(lambda: self.durable_version >= target, timeout)
+
+    def close(self):
+        self.state.unsubscribe(self._on_commit)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.wal.close()
+
+    # --- Recovery ---
+    @staticmethod
+    def recover(directory: str) -> Optional[Blackboard]:
+        """Latest snapshot + replay of the WAL after it. Returns None if there is nothing to recover."""
+        if not os.path.isdir(directory):
+            return None
+        state = None
+        for name in reversed(_files(directory, "snapshot-")):
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    saved = json.load(f)
+                state = Blackboard.restore(saved["version"], saved["values"], saved["field_versions"])
+                break
+            except (OSError, ValueError, KeyError):
+                continue # Unreadable snapshot: fall back to an older one
+        if state is None:
+            return None
+
+        for name in _files(directory, "wal-"):
+            with open(os.path.join(directory, name)) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # Torn write at the end of the log: everything before it is intact
+                    if record["v"] <= state.version:
+                        continue
+                    # Read back from disk: validated, unlike the Deltas built by commit()
+                    state.replay([Delta.validate({"version": record["v"], "agent": record["agent"], "field": field,
+                                                  "op": op, "value": value}) for field, op, value in record["d"]])
+        return state
+
+# --- Demo: crash halfway, recover, finish ---
+def run_durable(goal: str, topics: List[str], directory: str = "day7/.journal"):
+    print(colored(f"\n--- Durable Mission: {len(topics)} researchers ---", "cyan"))
+    state = Blackboard(user_goal=goal)
+    journal = BoardJournal(directory, snapshot_every=3).attach(state)
+    for topic in topics[:len(topics) // 2]:
+        ResearcherAgent(topic).run(state)
+    journal.wait_durable()
+    print(colored(f"Crash! (version {state.version}, {journal.fsyncs} fsyncs so far)", "red"))
+    state.unsubscribe(journal._on_commit) # Simulated crash: no close(), nothing else gets written
+
+    start = time.perf_counter()
+    state = BoardJournal.recover(directory)
+    print(colored(f"Recovered version {state.version} in {(time.perf_counter() - start) * 1000:.1f}ms", "green"))
+    journal = BoardJournal(directory, snapshot_every=3).attach(state)
+    done = set(state.research_notes)
+    for topic in topics:
+        if f"Notes about {topic}." not in done: # Only redo the work that was lost
+            ResearcherAgent(topic).run(state)
+    WriterAgent().run(state)
+    ReviewerAgent().run(state)
+    journal.close()
+    state.flush_logs()
+    print(f"Final Output:\n{state.final_output}")
+
+if __name__ == "__main__":
+    run_durable("Write a short post about Python", ["syntax", "typing", "asyncio", "packaging", "testing", "tooling"])
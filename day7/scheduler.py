@@ -0,0 +1,85 @@
+import asyncio
+from typing import Dict, List, Set, Tuple
+from board_log import ERROR
+
+# --- The Reactive Controller (Agents Wake Up When Their Inputs Change) ---
+# `run_system` hard-codes Researcher -> Writer -> Reviewer. But each agent really only
+# cares about a few fields: the Writer needs `research_notes`, the Reviewer needs `draft_content`.
+# So instead of a fixed chain, every agent declares what it `reads` and `writes`, and:
+# 1. Every commit to the board reports which fields changed.
+# 2. Every agent that reads one of those fields is triggered.
+# 3. Triggered agents run concurrently (each in a worker thread, via asyncio).
+# 4. Bursts of updates are coalesced: an agent waits `debounce` seconds after the first
+#    trigger, so 5 new notes cause one re-draft, not 5.
+# 5. The mission ends when `final_output` is set, or at a fixed point (nobody running, nobody triggered).
+#    An agent whose run raises is logged and recorded in `failures`; the others carry on.
+# Adding another researcher adds parallelism; it does not make the chain longer.
+
+class ReactiveController:
+    def __init__(self, state, agents: List, debounce: float = 0.05, max_runs_per_agent: int = 20):
+        self.state = state
+        self.agents = agents
+        self.debounce = debounce
+        self.max_runs_per_agent = max_runs_per_agent # Safety valve against agents triggering each other forever
+        self.runs: Dict[int, int] = {id(agent): 0 for agent in agents}
+        self.failures: List[Tuple[str, Exception]] = [] # (agent name, error) of runs that raised
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.triggered = {id(agent): asyncio.Event() for agent in self.agents}
+        self.running = 0
+        self.done = asyncio.Event()
+
+        def on_commit(deltas):
+            # Called from an agent's worker thread: hop back onto the event loop
+            loop.call_soon_threadsafe(self._on_change, {delta.field for delta in deltas})
+
+        self.state.subscribe(on_commit)
+        try:
+            # Every agent gets one look at the initial board
+            for event in self.triggered.values():
+                event.set()
+            tasks = [asyncio.create_task(self._agent_loop(agent)) for agent in self.agents]
+            await self.done.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.state.unsubscribe(on_commit)
+        return self.state
+
+    def _on_change(self, fields: Set[str]):
+        if "final_output" in fields and self.state.final_output:
+            self.done.set()
+            return
+        for agent in self.agents:
+            if fields & set(agent.reads):
+                self.triggered[id(agent)].set()
+
+    async def _agent_loop(self, agent):
+        event = self.triggered[id(agent)]
+        while self.runs[id(agent)] < self.max_runs_per_agent:
+            await event.wait()
+            await asyncio.sleep(self.debounce) # Coalesce a burst of updates into one run
+            event.clear()
+            self.running += 1
+            try:
+                await asyncio.to_thread(agent.run, self.state)
+            except Exception as e: # One failing agent must not stall the mission (nobody would set `done`)
+                name = getattr(agent, "name", type(agent).__name__)
+                self.failures.append((name, e))
+                self.state.log(name, f"Run failed: {type(e).__name__}: {e}", level=ERROR)
+            finally:
+                self.running -= 1
+                self.runs[id(agent)] += 1
+                # Commits made during the run have already re-triggered their readers,
+                # so if nobody is running or triggered now, nothing can change any more.
+                self._check_fixed_point()
+        self._check_fixed_point()
+
+    def _check_fixed_point(self):
+        if self.running == 0 and not any(
+            event.is_set() and self.runs[agent_id] < self.max_runs_per_agent
+            for agent_id, event in self.triggered.items()
+        ):
+            self.done.set()
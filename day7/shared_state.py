@@ -1,11 +1,103 @@
+import os
+import sys
 import json
 import time
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel, Field
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 from termcolor import colored
+from scheduler import ReactiveController
+from board_log import BoardLogger, INFO, WARNING, ERROR
+from note_store import NoteStore
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # For the shared `common` package
+from common.records import record
 
 # --- 1. The Blackboard (Shared State) ---
 # This is the "Brain" of the system. All agents read/write to this.
+#
+# To let many agents work on one board at the same time, the board is *versioned*:
+# - Every change is recorded as a field-level Delta with a monotonically increasing version.
+# - Agents read from a cheap Snapshot (no copying of the notes list) and return a Patch.
+# - A Patch is committed with compare-and-swap: if any field the agent READ has changed
+#   since its snapshot, the commit is rejected (ConflictError) and the agent retries on fresh data.
+# Appends to list fields (like research_notes) never conflict with each other.
+
+APPEND_FIELDS = {"research_notes"} # Append-only list fields
+
+class DeltaModel(BaseModel):
+    version: int
+    agent: str
+    field: str
+    op: str # "set" or "append"
+    value: Any
+
+class PatchModel(BaseModel):
+    reads: Dict[str, int] = {} # Field -> version the agent saw (the compare-and-swap condition)
+    sets: Dict[str, Any] = {}
+    appends: Dict[str, List[Any]] = {}
+
+# Every commit builds a Patch and a Delta per changed field, all from our own code, so they are
+# compact __slots__ records (see common/records.py). The models above validate the ones read
+# back from outside, e.g. `Delta.validate(...)` when the journal is replayed from disk.
+Delta = record(DeltaModel, "Delta")
+Patch = record(PatchModel, "Patch")
+
+class ConflictError(Exception):
+    def __init__(self, fields: List[str]):
+        super().__init__(f"Fields changed since snapshot: {', '.join(fields)}")
+        self.fields = fields
+
+def effective_changes(patch: Patch, current: Callable[[str], Any], notes: NoteStore) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """The (sets, appends) of a Patch that really change the board (shared by every Blackboard implementation)."""
+    # Writing a value that is already there is not a change (and must not wake up readers)
+    sets = {f: v for f, v in patch.sets.items() if current(f) != v}
+    # Notes the store already has (exactly or nearly) are dropped
+    appends = {f: notes.accept(v) if f == "research_notes" else v for f, v in patch.appends.items()}
+    return sets, {f: v for f, v in appends.items() if v}
+
+def deltas_of(agent: str, version: int, sets: Dict[str, Any], appends: Dict[str, List[Any]]) -> List[Delta]:
+    deltas = [Delta(version=version, agent=agent, field=field, op="set", value=value) for field, value in sets.items()]
+    return deltas + [Delta(version=version, agent=agent, field=field, op="append", value=values)
+                     for field, values in appends.items()]
+
+def notify(listeners: List[Any], deltas: List[Delta]):
+    for listener in listeners:
+        listener(deltas) # Called under the commit lock, so listeners see changes in commit order
+
+class Snapshot:
+    """
+    A read-only view of the board at one version.
+    Scalar fields are immutable strings, and list fields are append-only, so a snapshot just
+    keeps references (plus the list lengths at snapshot time) instead of copying anything.
+    It also remembers which fields were read, so the Patch knows what to compare-and-swap on.
+    """
+    def __init__(self, version: int, values: Dict[str, Any], lengths: Dict[str, int], field_versions: Dict[str, int]):
+        self._version = version
+        self._values = values
+        self._lengths = lengths
+        self._field_versions = field_versions
+        self._reads = set()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name not in self._values:
+            raise AttributeError(name)
+        self._reads.add(name)
+        value = self._values[name]
+        if name in self._lengths:
+            return tuple(value[:self._lengths[name]])
+        return value
+
+    def patch(self, sets: Optional[Dict[str, Any]] = None, appends: Optional[Dict[str, List[Any]]] = None) -> Patch:
+        reads = {field: self._field_versions.get(field, 0) for field in self._reads}
+        return Patch(reads=reads, sets=sets or {}, appends=appends or {})
+
 class Blackboard(BaseModel):
     user_goal: str = ""
     research_notes: List[str] = []
@@ -14,62 +106,206 @@ class Blackboard(BaseModel):
     final_output: str = ""
     
     # Metadata
-    logs: List[str] = []
+    version: int = 0
+
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _field_versions: Dict[str, int] = PrivateAttr(default_factory=dict) # Field -> version of its last change
+    _deltas: deque = PrivateAttr(default_factory=lambda: deque(maxlen=1000)) # Recent changes, for incremental readers
+    _listeners: List[Any] = PrivateAttr(default_factory=list)
+    _logger: BoardLogger = PrivateAttr(default_factory=BoardLogger)
+    _notes: NoteStore = PrivateAttr(default_factory=NoteStore) # Dedup + index behind research_notes
+
+    def model_post_init(self, __context: Any):
+        for note in self.research_notes:
+            self._notes.index(note)
+
+    def log(self, agent: str, event: str, level: int = INFO, **fields: Any):
+        """Structured, non-blocking log entry (see board_log.py). Formatting and printing happen later."""
+        self._logger.log(level, agent, event, **fields)
+
+    @property
+    def logs(self) -> List[str]:
+        """The most recent log entries (bounded ring buffer), formatted on demand."""
+        return self._logger.lines()
+
+    def set_logger(self, logger: BoardLogger):
+        self._logger = logger
+
+    def flush_logs(self):
+        self._logger.flush()
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            values = {name: getattr(self, name) for name in self.state_fields()}
+            lengths = {name: len(values[name]) for name in APPEND_FIELDS}
+            return Snapshot(self.version, values, lengths, dict(self._field_versions))
+
+    def commit(self, agent: str, patch: Patch) -> int:
+        """Applies a Patch atomically. Raises ConflictError if anything the agent read has changed."""
+        with self._lock:
+            stale = [f for f, seen in patch.reads.items() if self._field_versions.get(f, 0) != seen]
+            if stale:
+                raise ConflictError(stale)
+            for field in patch.sets:
+                if field not in self.state_fields() or field in APPEND_FIELDS:
+                    raise ValueError(f"Cannot set field '{field}'")
+            for field in patch.appends:
+                if field not in APPEND_FIELDS:
+                    raise ValueError(f"Field '{field}' is not append-only")
+            sets, appends = effective_changes(patch, lambda field: getattr(self, field), self._notes)
+            if not sets and not appends:
+                return self.version
+
+            self.version += 1
+            for field, value in sets.items():
+                setattr(self, field, value)
+            for field, values in appends.items():
+                getattr(self, field).extend(values)
+
+            deltas = deltas_of(agent, self.version, sets, appends)
+            for delta in deltas:
+                self._field_versions[delta.field] = self.version
+                self._deltas.append(delta)
+            notify(self._listeners, deltas)
+            return self.version
+
+    def deltas_since(self, version: int) -> Optional[List[Delta]]:
+        """Changes after `version`, or None if they are too old to be kept (take a snapshot instead)."""
+        with self._lock:
+            if version < self.version and (not self._deltas or self._deltas[0].version > version + 1):
+                return None
+            return [d for d in self._deltas if d.version > version]
 
-    def log(self, message: str):
-        timestamp = time.strftime("%H:%M:%S")
-        entry = f"[{timestamp}] {message}"
-        self.logs.append(entry)
-        print(colored(entry, "white", attrs=["dark"]))
+    def relevant_notes(self, query: str, k: int = 8, budget_chars: int = 2000, limit: Optional[int] = None) -> List[str]:
+        """Top-k relevant, non-redundant research notes within a size budget (see note_store.py)."""
+        with self._lock:
+            return self._notes.search(query, k=k, budget_chars=budget_chars, limit=limit)
+
+    def subscribe(self, listener):
+        """Registers listener(deltas), called after every commit."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @classmethod
+    def restore(cls, version: int, values: Dict[str, Any], field_versions: Dict[str, int]) -> "Blackboard":
+        """Rebuilds a board from a saved snapshot (see persistence.py)."""
+        state = cls(**values, version=version)
+        state._field_versions.update(field_versions)
+        return state
+
+    def replay(self, deltas: List[Delta]):
+        """Re-applies recorded deltas during recovery: no conflict checks, no listeners."""
+        with self._lock:
+            for delta in deltas:
+                if delta.op == "append":
+                    getattr(self, delta.field).extend(delta.value)
+                    if delta.field == "research_notes":
+                        for note in delta.value:
+                            self._notes.index(note)
+                else:
+                    setattr(self, delta.field, delta.value)
+                self._field_versions[delta.field] = delta.version
+                self._deltas.append(delta)
+                self.version = max(self.version, delta.version)
+
+    @classmethod
+    def state_fields(cls) -> List[str]:
+        return [name for name in cls.model_fields if name != "version"]
 
 # --- 2. The Agents (Stateless Workers) ---
-# Notice they take the Blackboard as input and return a MODIFIED Blackboard.
+# Each agent reads a Snapshot and proposes a Patch; `run` commits it (retrying on conflicts).
+# `run` still takes the Blackboard and returns it, so agents can be chained as before.
+# `reads`/`writes` declare which fields an agent depends on and changes (used by the ReactiveController).
+
+class BlackboardAgent:
+    name = "Agent"
+    reads: List[str] = []
+    writes: List[str] = []
+    max_retries = 5
+
+    def propose(self, snapshot: Snapshot, state: Blackboard) -> Optional[Patch]:
+        raise NotImplementedError
 
-class ResearcherAgent:
     def run(self, state: Blackboard) -> Blackboard:
-        state.log("Researcher: Starting research...")
+        for attempt in range(self.max_retries):
+            snapshot = state.snapshot()
+            patch = self.propose(snapshot, state)
+            if patch is None:
+                return state
+            undeclared = (set(patch.sets) | set(patch.appends)) - set(self.writes)
+            if undeclared:
+                raise ValueError(f"{self.name} wrote undeclared fields: {', '.join(sorted(undeclared))}")
+            try:
+                state.commit(self.name, patch)
+                return state
+            except ConflictError as e:
+                state.log(self.name, "Conflict, retrying on fresh data", fields=e.fields)
+        state.log(self.name, f"Gave up after {self.max_retries} conflicts", level=ERROR)
+        return state
+
+class ResearcherAgent(BlackboardAgent):
+    name = "Researcher"
+    reads = ["user_goal"]
+    writes = ["research_notes"]
+
+    def __init__(self, topic: Optional[str] = None):
+        self.topic = topic
+
+    def propose(self, snapshot: Snapshot, state: Blackboard) -> Optional[Patch]:
+        state.log(self.name, "Starting research...")
         
         # Simulate finding info based on the goal
-        if "python" in state.user_goal.lower():
+        if self.topic:
+            info = f"Notes about {self.topic}."
+        elif "python" in snapshot.user_goal.lower():
             info = "Python is a high-level programming language."
         else:
             info = "General knowledge about the topic."
             
-        state.research_notes.append(info)
-        state.log(f"Researcher: Added note -> '{info}'")
-        return state
+        state.log(self.name, "Added note", text=info)
+        return snapshot.patch(appends={"research_notes": [info]})
 
-class WriterAgent:
-    def run(self, state: Blackboard) -> Blackboard:
-        state.log("Writer: Drafting content...")
+class WriterAgent(BlackboardAgent):
+    name = "Writer"
+    reads = ["user_goal", "research_notes"]
+    writes = ["draft_content"]
+
+    def propose(self, snapshot: Snapshot, state: Blackboard) -> Optional[Patch]:
+        state.log(self.name, "Drafting content...")
         
-        if not state.research_notes:
-            state.log("Writer: No research found! Cannot write.")
-            return state
+        if not snapshot.research_notes:
+            state.log(self.name, "No research found! Cannot write.", level=WARNING)
+            return None
             
-        # Combine notes into a draft
-        notes_text = " ".join(state.research_notes)
-        state.draft_content = f"Title: {state.user_goal}\nBody: {notes_text}\n(Drafted by AI)"
-        state.log("Writer: Draft created.")
-        return state
+        # Combine the most relevant notes (not all of them) into a draft
+        notes = state.relevant_notes(snapshot.user_goal, limit=len(snapshot.research_notes))
+        notes_text = " ".join(notes)
+        draft = f"Title: {snapshot.user_goal}\nBody: {notes_text}\n(Drafted by AI)"
+        state.log(self.name, "Draft created.")
+        return snapshot.patch(sets={"draft_content": draft})
 
-class ReviewerAgent:
-    def run(self, state: Blackboard) -> Blackboard:
-        state.log("Reviewer: Reviewing draft...")
+class ReviewerAgent(BlackboardAgent):
+    name = "Reviewer"
+    reads = ["draft_content"]
+    writes = ["review_feedback", "final_output"]
+
+    def propose(self, snapshot: Snapshot, state: Blackboard) -> Optional[Patch]:
+        state.log(self.name, "Reviewing draft...")
         
-        if not state.draft_content:
-            state.log("Reviewer: No draft to review!")
-            return state
+        if not snapshot.draft_content:
+            state.log(self.name, "No draft to review!", level=WARNING)
+            return None
             
         # Simulate a review
-        if "Python" in state.draft_content:
-            state.review_feedback = "Approved"
-            state.final_output = state.draft_content + "\n[VERIFIED]"
+        if "Python" in snapshot.draft_content:
+            sets = {"review_feedback": "Approved", "final_output": snapshot.draft_content + "\n[VERIFIED]"}
         else:
-            state.review_feedback = "Rejected: Missing key keywords."
+            sets = {"review_feedback": "Rejected: Missing key keywords."}
             
-        state.log(f"Reviewer: Feedback -> {state.review_feedback}")
-        return state
+        state.log(self.name, "Review done", feedback=sets["review_feedback"])
+        return snapshot.patch(sets=sets)
 
 # --- 3. The Controller (The Loop) ---
 def run_system(goal: str):
@@ -93,10 +329,33 @@ def run_system(goal: str):
     state = reviewer.run(state)
     
     # Final Output
+    state.flush_logs() # Write out pending log records before printing the summary
     print(colored("\n--- Final State ---", "green"))
     print(f"Goal: {state.user_goal}")
     print(f"Final Output:\n{state.final_output}")
     print(f"Logs: {len(state.logs)} entries")
+    print(f"Version: {state.version}")
+
+def run_parallel_research(goal: str, topics: List[str]):
+    """Many researchers work on one board at the same time. No notes are lost."""
+    state = Blackboard(user_goal=goal)
+    print(colored(f"\n--- Parallel Research: {len(topics)} agents ---", "cyan"))
+    with ThreadPoolExecutor(max_workers=len(topics)) as pool:
+        list(pool.map(lambda topic: ResearcherAgent(topic).run(state), topics))
+    state.flush_logs()
+    print(f"Notes: {len(state.research_notes)} (version {state.version})")
+
+def run_reactive(goal: str, topics: List[str]):
+    """No fixed chain: each agent runs whenever the fields it reads change."""
+    state = Blackboard(user_goal=goal)
+    agents = [ResearcherAgent(topic) for topic in topics] + [WriterAgent(), ReviewerAgent()]
+    print(colored(f"\n--- Reactive Mission: {len(agents)} agents ---", "cyan"))
+    asyncio.run(ReactiveController(state, agents).run())
+    state.flush_logs()
+    print(f"Final Output:\n{state.final_output}")
+    print(f"Version: {state.version}")
 
 if __name__ == "__main__":
     run_system("Write a short post about Python")
+    run_parallel_research("Write a short post about Python", ["syntax", "typing", "asyncio", "packaging"])
+    run_reactive("Write a short post about Python", ["syntax", "typing", "asyncio"])
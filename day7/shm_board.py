@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+from shared_state import (Snapshot, Patch, ConflictError, APPEND_FIELDS, ResearcherAgent, WriterAgent, ReviewerAgent,
+                          effective_changes, deltas_of, notify)
+from termcolor import colored
+from board_log import INFO
+from note_store import NoteStore
+
+# --- The Shared-Memory Blackboard (One Board, Many Processes) ---
+# A pydantic Blackboard lives inside one Python process, and the GIL means CPU-heavy
+# agents in that process share one core. To run agents in separate processes without
+# pickling the whole board on every step, the board lives in a block of shared memory
+# with a compact binary layout:
+#
+#   [header]  magic | seqlock counter | board version
+#   [table]   per text field:   offset | capacity | length | field version
+#             per list field:   offset | capacity | bytes used | item count | field version
+#   [data]    text fields: fixed-size UTF-8 slots
+#             list fields (research_notes, logs): append-only regions of [u32 length][UTF-8 bytes]
+#
+# Writers take a cross-process lock and use the same compare-and-swap commits as Blackboard
+# (same no-op filtering, same listeners: those of the committing process).
+# Readers never lock: a seqlock counter (odd while a write is in progress) tells them
+# to retry if a writer got in the way. Each process decodes only the list items it
+# hasn't seen yet, because list regions are append-only.
+
+MAGIC = b"BBv1"
+HEADER = struct.Struct("<4sQQ") # magic, seqlock, version
+TEXT_SLOT = struct.Struct("<QQQQ") # offset, capacity, length, field version
+LIST_SLOT = struct.Struct("<QQQQQ") # offset, capacity, used, count, field version
+ITEM_LEN = struct.Struct("<I")
+
+TEXT_FIELDS = ["user_goal", "draft_content", "review_feedback", "final_output"]
+LIST_FIELDS = ["research_notes", "logs"]
+
+class SharedBlackboard:
+    def __init__(self, shm: shared_memory.SharedMemory, lock, owner: bool):
+        self.shm = shm
+        self.buf = shm.buf
+        self.lock = lock
+        self.owner_pid = os.getpid() if owner else None # Only the creating process unlinks the block
+        self.dropped_logs = 0
+        # Per-process cache of decoded list items: field -> (items, bytes consumed)
+        self.cache: Dict[str, List[str]] = {name: [] for name in LIST_FIELDS}
+        self.consumed: Dict[str, int] = {name: 0 for name in LIST_FIELDS}
+        self.notes = NoteStore() # Per-process index over research_notes (retrieval and dedup)
+        self.listeners: List[Any] = [] # Per process: a listener sees the commits made from its own process
+
+    # --- Creating and attaching ---
+    @classmethod
+    def create(cls, user_goal: str = "", text_capacity: int = 64 * 1024, notes_capacity: int = 1024 * 1024,
+               logs_capacity: int = 1024 * 1024, name: Optional[str] = None) -> "SharedBlackboard":
+        capacities = [text_capacity] * len(TEXT_FIELDS) + [notes_capacity, logs_capacity]
+        table_size = TEXT_SLOT.size * len(TEXT_FIELDS) + LIST_SLOT.size * len(LIST_FIELDS)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + table_size + sum(capacities))
+        HEADER.pack_into(shm.buf, 0, MAGIC, 0, 0)
+        offset = HEADER.size + table_size
+        for field in TEXT_FIELDS:
+            TEXT_SLOT.pack_into(shm.buf, cls._slot(field), offset, text_capacity, 0, 0)
+            offset += text_capacity
+        for field, capacity in zip(LIST_FIELDS, (notes_capacity, logs_capacity)):
+            LIST_SLOT.pack_into(shm.buf, cls._slot(field), offset, capacity, 0, 0, 0)
+            offset += capacity
+        board = cls(shm, multiprocessing.Lock(), owner=True)
+        if user_goal:
+            board.commit("System", Patch(sets={"user_goal": user_goal}))
+        return board
+
+    @classmethod
+    def attach(cls, name: str, lock) -> "SharedBlackboard":
+        shm = shared_memory.SharedMemory(name=name)
+        if bytes(shm.buf[:4]) != MAGIC:
+            raise ValueError(f"Shared memory '{name}' is not a Blackboard")
+        return cls(shm, lock, owner=False)
+
+    def __getstate__(self):
+        # Sending the board to a child process only sends its name and lock, never its contents
+        return {"name": self.shm.name, "lock": self.lock}
+
+    def __setstate__(self, state):
+        attached = SharedBlackboard.attach(state["name"], state["lock"])
+        self.__dict__.update(attached.__dict__)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Layout helpers ---
+    @staticmethod
+    def _slot(field: str) -> int:
+        if field in TEXT_FIELDS:
+            return HEADER.size + TEXT_SLOT.size * TEXT_FIELDS.index(field)
+        return HEADER.size + TEXT_SLOT.size * len(TEXT_FIELDS) + LIST_SLOT.size * LIST_FIELDS.index(field)
+
+    def _header(self):
+        return HEADER.unpack_from(self.buf, 0)
+
+    def _set_header(self, seq: int, version: int):
+        HEADER.pack_into(self.buf, 0, MAGIC, seq, version)
+
+    def _field_version(self, field: str) -> int:
+        if field in TEXT_FIELDS:
+            return TEXT_SLOT.unpack_from(self.buf, self._slot(field))[3]
+        return LIST_SLOT.unpack_from(self.buf, self._slot(field))[4]
+
+    # --- Reading (lock-free, seqlock) ---
+    def _read_consistent(self, read):
+        while True:
+            _, seq, _ = self._header()
+            if seq % 2:
+                time.sleep(0) # A writer is mid-update; let it finish
+                continue
+            result = read()
+            if self._header()[1] == seq:
+                return result
+
+    def _read_all(self):
+        # Only copies raw bytes: anything read here may be torn by a writer, and is decoded
+        # only once the seqlock says it wasn't (a torn UTF-8 sequence must mean "retry", not a crash)
+        _, _, version = self._header()
+        texts, field_versions, regions = {}, {}, {}
+        for field in TEXT_FIELDS:
+            offset, capacity, length, field_version = TEXT_SLOT.unpack_from(self.buf, self._slot(field))
+            texts[field] = bytes(self.buf[offset:offset + min(length, capacity)])
+            field_versions[field] = field_version
+        for field in LIST_FIELDS:
+            offset, capacity, used, _, field_version = LIST_SLOT.unpack_from(self.buf, self._slot(field))
+            regions[field] = bytes(self.buf[offset + self.consumed[field]:offset + min(used, capacity)])
+            field_versions[field] = field_version
+        return version, texts, field_versions, regions
+
+    def _refresh(self):
+        version, texts, field_versions, regions = self._read_consistent(self._read_all)
+        for field, region in regions.items():
+            items = self._decode_items(region) # Only what this process hasn't seen yet
+            self.cache[field].extend(items)
+            self.consumed[field] += len(region)
+            if field == "research_notes":
+                for note in items:
+                    self.notes.index(note)
+        return version, {field: data.decode() for field, data in texts.items()}, field_versions
+
+    @staticmethod
+    def _decode_items(region: bytes) -> List[str]:
+        items, position = [], 0
+        while position < len(region):
+            (length,) = ITEM_LEN.unpack_from(region, position)
+            start = position + ITEM_LEN.size
+            items.append(region[start:start + length].decode())
+            position = start + length
+        return items
+
+    def snapshot(self) -> Snapshot:
+        version, texts, field_versions = self._refresh()
+        values = {**texts, "research_notes": self.cache["research_notes"]}
+        lengths = {field: len(self.cache[field]) for field in APPEND_FIELDS}
+        return Snapshot(version, values, lengths, field_versions)
+
+    def relevant_notes(self, query: str, k: int = 8, budget_chars: int = 2000, limit: Optional[int] = None) -> List[str]:
+        self._refresh()
+        return self.notes.search(query, k=k, budget_chars=budget_chars, limit=limit)
+
+    def __getattr__(self, name: str):
+        if name in TEXT_FIELDS or name == "research_notes":
+            return getattr(self.snapshot(), name)
+        raise AttributeError(name)
+
+    @property
+    def version(self) -> int:
+        return self._header()[2]
+
+    # --- Writing (cross-process lock + compare-and-swap) ---
+    def commit(self, agent: str, patch: Patch) -> int:
+        """Applies a Patch atomically, with the same no-op filtering and listeners as Blackboard.commit."""
+        with self.lock:
+            stale = [f for f, seen in patch.reads.items() if self._field_version(f) != seen]
+            if stale:
+                raise ConflictError(stale)
+            self._check_fits(patch)
+            self._refresh() # Under the lock: the note index (for dedup) holds every note committed so far
+            sets, appends = effective_changes(patch, self._read_text, self.notes)
+            if not sets and not appends:
+                return self.version
+
+            _, seq, version = self._header()
+            version += 1
+            self._set_header(seq + 1, version) # Odd: readers will retry
+            for field, value in sets.items():
+                self._write_text(field, value, version)
+            for field, values in appends.items():
+                self._append(field, values, version)
+            self._set_header(seq + 2, version) # Even again: the new state is visible
+            for field, values in appends.items(): # Already indexed by the dedup: don't decode them again
+                self.cache[field].extend(values)
+                self.consumed[field] = LIST_SLOT.unpack_from(self.buf, self._slot(field))[2]
+            notify(self.listeners, deltas_of(agent, version, sets, appends))
+            return version
+
+    def subscribe(self, listener):
+        """Registers listener(deltas), called after every commit made by this process."""
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _check_fits(self, patch: Patch):
+        for field, value in patch.sets.items():
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"Cannot set field '{field}'")
+            capacity = TEXT_SLOT.unpack_from(self.buf, self._slot(field))[1]
+            if len(value.encode()) > capacity:
+                raise ValueError(f"'{field}' does not fit in its {capacity}-byte slot")
+        for field, values in patch.appends.items():
+            if field not in APPEND_FIELDS:
+                raise ValueError(f"Field '{field}' is not append-only")
+            _, capacity, used, _, _ = LIST_SLOT.unpack_from(self.buf, self._slot(field))
+            if used + sum(ITEM_LEN.size + len(v.encode()) for v in values) > capacity:
+                raise ValueError(f"'{field}' region is full ({capacity} bytes)")
+
+    def _read_text(self, field: str) -> str:
+        """Only for writers: under the lock no other writer can tear the slot, so no seqlock is needed."""
+        offset, _, length, _ = TEXT_SLOT.unpack_from(self.buf, self._slot(field))
+        return bytes(self.buf[offset:offset + length]).decode()
+
+    def _write_text(self, field: str, value: str, version: int):
+        data = value.encode()
+        offset, capacity, _, _ = TEXT_SLOT.unpack_from(self.buf, self._slot(field))
+        self.buf[offset:offset + len(data)] = data
+        TEXT_SLOT.pack_into(self.buf, self._slot(field), offset, capacity, len(data), version)
+
+    def _append(self, field: str, values: List[str], version: int) -> bool:
+        offset, capacity, used, count, _ = LIST_SLOT.unpack_from(self.buf, self._slot(field))
+        for value in values:
+            data = value.encode()
+            if used + ITEM_LEN.size + len(data) > capacity:
+                return False
+            ITEM_LEN.pack_into(self.buf, offset + used, len(data))
+            self.buf[offset + used + ITEM_LEN.size:offset + used + ITEM_LEN.size + len(data)] = data
+            used += ITEM_LEN.size + len(data)
+            count += 1
+        LIST_SLOT.pack_into(self.buf, self._slot(field), offset, capacity, used, count, version)
+        return True
+
+    # --- Logging (append-only region; records are dropped, not grown, when it is full) ---
+    def log(self, agent: str, event: str, level: int = INFO, **fields: Any):
+        record = json.dumps([time.time(), level, agent, event, fields], default=str)
+        with self.lock:
+            _, seq, version = self._header()
+            self._set_header(seq + 1, version)
+            written = self._append("logs", [record], self._field_version("logs"))
+            self._set_header(seq + 2, version)
+        if not written:
+            self.dropped_logs += 1
+
+    @property
+    def logs(self) -> List[str]:
+        self._refresh()
+        lines = []
+        for record in self.cache["logs"]:
+            timestamp, _, agent, event, fields = json.loads(record)
+            extra = "".join(f" {key}={value!r}" for key, value in fields.items())
+            lines.append(f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}] {agent}: {event}{extra}")
+        return lines
+
+    def flush_logs(self):
+        pass # Log records are written to shared memory immediately
+
+# --- Running Agents in Separate Processes ---
+def _run_agent(agent, board: SharedBlackboard):
+    # The board arrives as (name, lock) and re-attaches to the same memory block
+    agent.run(board)
+    board.close()
+
+def run_multiprocess(goal: str, topics: List[str]):
+    """Each researcher runs in its own process; the writer and reviewer read their notes from shared memory."""
+    print(colored(f"\n--- Multi-Process Research: {len(topics)} processes ---", "cyan"))
+    with SharedBlackboard.create(user_goal=goal) as board:
+        processes = [multiprocessing.Process(target=_run_agent, args=(ResearcherAgent(topic), board)) for topic in topics]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        WriterAgent().run(board)
+        ReviewerAgent().run(board)
+        print(f"Notes: {len(board.research_notes)} (version {board.version})")
+        print(f"Final Output:\n{board.final_output}")
+        print(f"Logs: {len(board.logs)} entries")
+
+if __name__ == "__main__":
+    run_multiprocess("Write a short post about Python", ["syntax", "typing", "asyncio", "packaging"])
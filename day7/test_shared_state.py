@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import multiprocessing
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from shared_state import Blackboard, Patch, ConflictError, ResearcherAgent, WriterAgent, ReviewerAgent
+from scheduler import ReactiveController
+from board_log import BoardLogger, DEBUG, INFO
+from shm_board import SharedBlackboard, _run_agent
+from persistence import BoardJournal
+from note_store import NoteStore
+
+class TestVersionedBlackboard:
+    def setup_method(self):
+        self.state = Blackboard(user_goal="Write a short post about Python")
+
+    def test_sequential_pipeline(self):
+        """Test that the researcher -> writer -> reviewer chain still produces a verified post"""
+        for agent in (ResearcherAgent(), WriterAgent(), ReviewerAgent()):
+            self.state = agent.run(self.state)
+        assert self.state.final_output.endswith("[VERIFIED]")
+        assert self.state.version == 3
+
+    def test_stale_read_is_rejected(self):
+        """Test compare-and-swap: a patch based on old notes conflicts after new notes arrive"""
+        snapshot = self.state.snapshot()
+        draft = f"Draft from {len(snapshot.research_notes)} notes"
+        ResearcherAgent("syntax").run(self.state)
+        with pytest.raises(ConflictError):
+            self.state.commit("Writer", snapshot.patch(sets={"draft_content": draft}))
+        assert self.state.draft_content == ""
+
+    def test_snapshot_is_isolated(self):
+        """Test that a snapshot keeps showing the notes as they were, without copying them"""
+        ResearcherAgent("syntax").run(self.state)
+        snapshot = self.state.snapshot()
+        ResearcherAgent("typing").run(self.state)
+        assert snapshot.research_notes == ("Notes about syntax.",)
+        assert len(self.state.research_notes) == 2
+
+    def test_parallel_appends_are_not_lost(self):
+        """Test that many researchers appending at once never lose an update"""
+        topics = [f"topic {i}" for i in range(50)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda topic: ResearcherAgent(topic).run(self.state), topics))
+        assert sorted(self.state.research_notes) == sorted(f"Notes about {t}." for t in topics)
+        assert self.state.version == 50
+        assert len(self.state.deltas_since(40)) == 10
+
+class TestReactiveController:
+    def test_runs_until_final_output(self):
+        """Test that agents are triggered by their inputs until the post is verified"""
+        state = Blackboard(user_goal="Write a short post about Python")
+        agents = [ResearcherAgent(t) for t in ("syntax", "typing", "asyncio")] + [WriterAgent(), ReviewerAgent()]
+        asyncio.run(ReactiveController(state, agents).run())
+        assert state.final_output.endswith("[VERIFIED]")
+        assert len(state.research_notes) == 3
+
+    def test_stops_at_fixed_point(self):
+        """Test that the controller stops when nothing changes any more, even without a final output"""
+        state = Blackboard(user_goal="Write a short post about cooking")
+        controller = ReactiveController(state, [ResearcherAgent(), WriterAgent(), ReviewerAgent()])
+        asyncio.run(asyncio.wait_for(controller.run(), timeout=5))
+        assert state.review_feedback.startswith("Rejected")
+        assert state.final_output == ""
+
+    def test_failing_agent_does_not_hang(self):
+        """Test that an agent raising during its run is recorded and the controller still stops"""
+        class BrokenAgent:
+            name = "Broken"
+            reads = ["research_notes"]
+            def run(self, state):
+                raise ValueError("Broken wrote undeclared fields: final_output")
+
+        state = Blackboard(user_goal="Write a short post about cooking")
+        controller = ReactiveController(state, [BrokenAgent()])
+        asyncio.run(asyncio.wait_for(controller.run(), timeout=3))
+        assert [(name, type(e)) for name, e in controller.failures] == [("Broken", ValueError)]
+        assert any("Run failed" in line for line in state.logs)
+
+class TestBoardLogger:
+    def test_ring_buffer_is_bounded(self, tmp_path):
+        """Test that memory stays flat no matter how many records are logged"""
+        logger = BoardLogger(capacity=100, path=str(tmp_path / "board.log"))
+        for i in range(1000):
+            logger.log(INFO, "Researcher", "Added note", index=i)
+        assert len(logger.records) == 100
+        assert logger.lines()[-1].endswith("Researcher: Added note index=999")
+        logger.close()
+
+    def test_levels_and_sampling(self, tmp_path):
+        """Test that records below the level are dropped and noisy levels are sampled"""
+        logger = BoardLogger(level=DEBUG, sample_every={DEBUG: 10}, path=str(tmp_path / "board.log"))
+        for i in range(100):
+            logger.log(DEBUG, "Writer", "token")
+        logger.level = INFO
+        logger.log(DEBUG, "Writer", "ignored")
+        assert len(logger.records) == 10
+        logger.close()
+
+    def test_batched_file_output(self, tmp_path):
+        """Test that records are written to the file by flush, not by log"""
+        path = tmp_path / "board.log"
+        logger = BoardLogger(path=str(path))
+        state = Blackboard(user_goal="Write a short post about Python")
+        state.set_logger(logger)
+        ResearcherAgent().run(state)
+        logger.close()
+        assert path.read_text().splitlines()[-1].endswith("Researcher: Added note text='Python is a high-level programming language.'")
+        assert len(state.logs) == 2
+
+def _write_unicode(board, count):
+    for i in range(count):
+        draft = "é€"[i % 2] * (5000 + 50 * (i % 300)) # 2- and 3-byte characters: a torn copy splits one
+        notes = [f"Ünïcødé {i} " + " ".join(hashlib.sha1(str(i).encode()).hexdigest()[j:j + 8] for j in (0, 8, 16))]
+        board.commit("Writer", Patch(sets={"draft_content": draft}, appends={"research_notes": notes if i % 15 == 0 else []}))
+    board.close()
+
+class TestSharedBlackboard:
+    def setup_method(self):
+        self.board = SharedBlackboard.create(user_goal="Write a short post about Python", notes_capacity=4096)
+
+    def teardown_method(self):
+        self.board.close()
+
+    def test_appends_from_many_processes(self):
+        """Test that researchers in separate processes all land their notes in shared memory"""
+        topics = [f"topic {i}" for i in range(6)]
+        processes = [multiprocessing.Process(target=_run_agent, args=(ResearcherAgent(t), self.board)) for t in topics]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert sorted(self.board.research_notes) == sorted(f"Notes about {t}." for t in topics)
+        assert self.board.version == 7
+        assert len(self.board.logs) == 12
+
+    def test_same_agents_same_result(self):
+        """Test that the unchanged agents run against the shared board and hit the same conflicts"""
+        snapshot = self.board.snapshot()
+        draft = f"Draft from {len(snapshot.research_notes)} notes"
+        ResearcherAgent("syntax").run(self.board)
+        with pytest.raises(ConflictError):
+            self.board.commit("Writer", snapshot.patch(sets={"draft_content": draft}))
+        WriterAgent().run(self.board)
+        ReviewerAgent().run(self.board)
+        assert self.board.final_output.endswith("[VERIFIED]")
+
+    def test_noop_commits_are_dropped(self):
+        """Test that re-setting a value or re-adding a note changes nothing, as on the in-process board"""
+        version = self.board.commit("System", self.board.snapshot().patch(sets={"user_goal": self.board.user_goal}))
+        assert version == self.board.version == 1
+        ResearcherAgent("syntax").run(self.board)
+        ResearcherAgent("syntax").run(self.board)
+        assert self.board.research_notes == ("Notes about syntax.",)
+        assert self.board.version == 2
+
+    def test_reactive_controller_on_shared_board(self):
+        """Test that commits to the shared board notify subscribers, so the controller can drive it"""
+        agents = [ResearcherAgent(t) for t in ("syntax", "typing")] + [WriterAgent(), ReviewerAgent()]
+        asyncio.run(asyncio.wait_for(ReactiveController(self.board, agents).run(), timeout=5))
+        assert self.board.final_output.endswith("[VERIFIED]")
+
+    def test_reader_never_sees_a_torn_write(self):
+        """Test that a reader racing a writer process retries torn non-ASCII data instead of crashing"""
+        with SharedBlackboard.create(notes_capacity=64 * 1024) as board:
+            writer = multiprocessing.Process(target=_write_unicode, args=(board, 3000))
+            writer.start()
+            drafts = set()
+            while writer.is_alive():
+                snapshot = board.snapshot() # Would raise UnicodeDecodeError on a torn multibyte sequence
+                drafts.add(snapshot.draft_content)
+                assert all(note.startswith("Ünïcødé") for note in snapshot.research_notes)
+            writer.join()
+            assert writer.exitcode == 0
+            assert all(len(set(draft)) <= 1 for draft in drafts)
+            assert len(board.research_notes) == 200
+
+    def test_region_is_bounded(self):
+        """Test that appends beyond the fixed-size notes region are rejected instead of growing"""
+        with pytest.raises(ValueError):
+            for i in range(1000):
+                ResearcherAgent(f"topic {i}").run(self.board)
+        assert 0 < len(self.board.research_notes) < 1000
+
+class TestBoardJournal:
+    def setup_method(self):
+        self.state = Blackboard(user_goal="Write a short post about Python")
+
+    def test_recovers_after_crash(self, tmp_path):
+        """Test that the recovered board has the same fields, versions and conflict behaviour"""
+        journal = BoardJournal(str(tmp_path), snapshot_every=4).attach(self.state)
+        for topic in ("syntax", "typing", "asyncio", "packaging", "testing"):
+            ResearcherAgent(topic).run(self.state)
+        WriterAgent().run(self.state)
+        assert journal.wait_durable()
+        recovered = BoardJournal.recover(str(tmp_path))
+        assert recovered.research_notes == self.state.research_notes
+        assert recovered.draft_content == self.state.draft_content
+        assert recovered.version == self.state.version == 6
+        assert recovered.snapshot()._field_versions == self.state.snapshot()._field_versions
+        journal.close()
+
+    def test_group_commit_and_compaction(self, tmp_path):
+        """Test that many commits share fsyncs and old segments are removed after a snapshot"""
+        journal = BoardJournal(str(tmp_path), sync_interval=0.05, snapshot_every=50).attach(self.state)
+        for i in range(120):
+            ResearcherAgent(f"topic {i}").run(self.state)
+        journal.close()
+        assert journal.fsyncs < 20
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["snapshot-000000000100.json", "wal-000000000100.jsonl"]
+        assert len(BoardJournal.recover(str(tmp_path)).research_notes) == 120
+
+    def test_torn_write_is_ignored(self, tmp_path):
+        """Test that a half-written last line does not break recovery"""
+        journal = BoardJournal(str(tmp_path)).attach(self.state)
+        ResearcherAgent("syntax").run(self.state)
+        journal.close()
+        with open(tmp_path / "wal-000000000000.jsonl", "a") as f:
+            f.write('{"v": 2, "agent": "Resea')
+        recovered = BoardJournal.recover(str(tmp_path))
+        assert recovered.research_notes == ["Notes about syntax."]
+        assert recovered.version == 1
+
+class TestNoteStore:
+    def setup_method(self):
+        self.store = NoteStore()
+
+    def test_exact_and_near_duplicates_are_dropped(self):
+        """Test that repeats and reworded repeats never reach research_notes"""
+        state = Blackboard(user_goal="Write a short post about Python")
+        for _ in range(3):
+            ResearcherAgent().run(state)
+        state.commit("Researcher", state.snapshot().patch(appends={"research_notes": [
+            "python is a high-level programming language!",
+            "Python is a high-level programming language used everywhere.",
+            "Python has a large standard library.",
+        ]}))
+        assert state.research_notes == ["Python is a high-level programming language.", "Python has a large standard library."]
+        assert state.version == 2
+        assert (state._notes.exact_duplicates, state._notes.near_duplicates) == (3, 1)
+
+    def test_top_k_is_relevant_and_within_budget(self):
+        """Test that search ranks by keyword relevance, skips redundancy and respects k and the budget"""
+        self.store.accept([
+            "Cooking pasta takes ten minutes.",
+            "Python uses indentation for blocks.",
+            "Python asyncio runs coroutines on an event loop.",
+            "Gardening is relaxing.",
+            "The asyncio event loop in Python schedules coroutines.",
+        ])
+        assert self.store.search("python asyncio", k=2) == [
+            "Python asyncio runs coroutines on an event loop.",
+            "The asyncio event loop in Python schedules coroutines.",
+        ]
+        assert self.store.search("python asyncio", k=2, budget_chars=60) == ["Python asyncio runs coroutines on an event loop."]
+        assert self.store.search("python", limit=2) == ["Cooking pasta takes ten minutes.", "Python uses indentation for blocks."]
+
+    def test_only_matching_notes_are_ranked(self, monkeypatch):
+        """Test that ordinary words like 'write' are searchable, and a full top-k never looks at non-matching notes"""
+        self.store.accept([f"Unrelated fact number {i} about gardening." for i in range(500)] +
+                          ["Write the tests first.", "Short functions are easier to read."])
+        compared = []
+        monkeypatch.setattr("note_store.jaccard", lambda a, b: compared.append(1) or 0.0)
+        assert self.store.search("write short", k=2) == ["Write the tests first.", "Short functions are easier to read."]
+        assert len(compared) == 1 # Only the second pick is checked against the first
+
+    def test_writer_gets_relevant_notes_only(self):
+        """Test that the draft is built from the top notes, not from every note on the board"""
+        state = Blackboard(user_goal="Write a short post about Python typing")
+        notes = [f"Unrelated fact number {i} about gardening." for i in range(20)] + ["Python typing adds type hints."]
+        state.commit("Researcher", state.snapshot().patch(appends={"research_notes": notes}))
+        WriterAgent().run(state)
+        assert "Python typing adds type hints." in state.draft_content
+        assert state.draft_content.count("gardening") == 7
+        restored = Blackboard.restore(state.version, state.model_dump(exclude={"version"}), {})
+        assert restored.relevant_notes("typing", k=1) == ["Python typing adds type hints."]
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import subprocess
+import pytest
+import cli
+
+HEAVY = ["openai", "pydantic", "termcolor", "dotenv", "aiohttp", "httpx"]
+IMPORT_BUDGET_MS = 30 # cli itself (argparse not included): it must stay a thin dispatcher
+
+def python(*args, env=None, **kwargs):
+    return subprocess.run([sys.executable, *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          env=env, capture_output=True, text=True, timeout=60, **kwargs)
+
+class TestCLI:
+    def test_import_time_budget(self):
+        """Test that importing the CLI stays under budget and imports no heavy library"""
+        result = python("-X", "importtime", "-c", "import cli")
+        lines = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+        imported = {name.strip(): int(cumulative) for _, cumulative, name in lines[1:]}
+        assert not set(HEAVY) & set(imported)
+        assert imported["cli"] / 1000 < IMPORT_BUDGET_MS
+
+    def test_help_does_not_import_subsystems(self):
+        """Test that parsing arguments (even --help for a subcommand) stays lazy"""
+        check = ("import sys, cli\n"
+                 "try:\n    cli.main(['route', '--help'])\nexcept SystemExit:\n    pass\n"
+                 "print(sorted(set(sys.modules) & set(sys.argv[1:])))")
+        result = python("-c", check, *HEAVY, env={**os.environ, "MULTI_AGENT_SOCKET": "/nonexistent"})
+        assert "queries" in result.stdout
+        assert result.stdout.strip().endswith("[]")
+
+    def test_route_runs_in_process(self, capsys, monkeypatch):
+        """Test a subcommand end to end, with the mock router"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setattr(cli, "SOCKET_PATH", "/nonexistent")
+        assert cli.main(["route", "Is it raining in Seattle?"]) == 0
+        assert "weather_agent" in capsys.readouterr().out
+
+    def test_batch_route_resumes(self, tmp_path, capsys, monkeypatch):
+        """Test a bulk routing job: sharded results, items/s report, and a rerun that finds nothing left to do"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setattr(cli, "SOCKET_PATH", "/nonexistent")
+        queries = tmp_path / "queries.jsonl"
+        queries.write_text("Write a python function\nIs it raining in Seattle?\nhello\n")
+        assert cli.main(["batch", "route", str(queries), "--shards", "2"]) == 0
+        out = capsys.readouterr().out
+        assert "[Batch] 3 items" in out and "items/s" in out
+        assert (tmp_path / "queries.out" / "results-00001.jsonl").read_text().count("weather_agent") == 1
+        assert cli.main(["batch", "route", str(queries), "--shards", "2"]) == 0
+        assert "3 already done" in capsys.readouterr().out
+
+    def test_never_attaches_to_another_users_socket(self, tmp_path, monkeypatch, capsys):
+        """Test that the environment (API keys) is not sent to a socket owned by someone else"""
+        planted = tmp_path / "cli.sock"
+        planted.touch()
+        monkeypatch.setattr(cli, "SOCKET_PATH", str(planted))
+        monkeypatch.setattr(cli, "UID", os.stat(planted).st_uid + 1)
+        assert cli.attach(["route", "hello"]) is None
+        assert "not owned" in capsys.readouterr().err
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="the warm daemon needs fork and Unix sockets")
+    def test_daemon_attach(self, tmp_path):
+        """Test that invocations attach to a warm daemon: output and exit codes come back through it"""
+        socket_path = str(tmp_path / "cli.sock")
+        env = {**os.environ, "MULTI_AGENT_SOCKET": socket_path}
+        env.pop("OPENAI_API_KEY", None)
+        daemon = subprocess.Popen([sys.executable, "cli.py", "daemon"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 30
+            while not os.path.exists(socket_path + ".pid") and time.monotonic() < deadline:
+                time.sleep(0.05)
+            result = python("-c", "import cli; print(cli.attach(['route', 'Write a Python function']))", env=env)
+            assert "coding_agent" in result.stdout
+            assert result.stdout.strip().endswith("0") # attach() returns None when no daemon answers
+
+            result = python("cli.py", "route", env=env)
+            assert result.returncode == 2 # argparse error, from the daemon's child...
+            assert "usage:" in result.stderr and result.stdout == "" # ...on stderr, as in a direct run
+            result = python("cli.py", "extract", "--help", env=env)
+            assert "stdin" in result.stdout # --help never goes to the daemon
+
+            second = python("cli.py", "daemon", env=env)
+            assert second.returncode == 1 and "Already running" in second.stdout
+            assert python("-c", "import cli; print(cli.attach(['route', 'hello']))", env=env).stdout.strip().endswith("0")
+        finally:
+            assert python("cli.py", "daemon", "--stop", env=env).returncode == 0
+            daemon.wait(timeout=10)
+        assert not os.path.exists(socket_path)